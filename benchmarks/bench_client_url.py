@@ -0,0 +1,33 @@
+"""
+Micro-benchmark for building request URLs in ContainerHttpClient.
+
+Compares building each URL with hyperlink, which is what every request used
+to do, with the current URL building. Run it from the repository root:
+
+    python benchmarks/bench_client_url.py
+"""
+import timeit
+
+from seaworthy.client import ContainerHttpClient
+
+CASES = [
+    ('absolute path', '/api/v1/items', None),
+    ('relative path', 'api/v1/items', None),
+    ('url_kwargs', '/api/v1/items', {'query': (('page', '2'),)}),
+]
+
+
+def main(number=20000):
+    client = ContainerHttpClient('127.0.0.1', '8080')
+    print('{:<16}{:>12}{:>12}'.format('case', 'before', 'after'))
+    for name, path, kwargs in CASES:
+        before = timeit.timeit(
+            lambda: client._build_url(path, kwargs or {}), number=number)
+        after = timeit.timeit(
+            lambda: client._url(path, kwargs), number=number)
+        print('{:<16}{:>10.2f}us{:>10.2f}us'.format(
+            name, before / number * 1e6, after / number * 1e6))
+
+
+if __name__ == '__main__':
+    main()
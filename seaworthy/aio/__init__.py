@@ -0,0 +1,24 @@
+"""
+An asyncio API for Seaworthy, for Python 3.5 and newer.
+
+The Docker client is synchronous, so the blocking calls are run in a thread
+pool executor. This lets a single event loop set up, wait for, and watch many
+containers at once::
+
+    async def main():
+        async with AsyncDockerHelper() as helper:
+            web, db = await asyncio.gather(
+                helper.setup(web_container), helper.setup(db_container))
+            async with web.stream_logs(timeout=5) as lines:
+                async for line in lines:
+                    ...
+"""
+from .client import wait_for_port, wait_for_response
+from .definitions import AsyncContainerDefinition
+from .helpers import AsyncDockerHelper
+from .logs import stream_logs, wait_for_logs_matching
+
+__all__ = [
+    'AsyncContainerDefinition', 'AsyncDockerHelper', 'stream_logs',
+    'wait_for_logs_matching', 'wait_for_port', 'wait_for_response',
+]
@@ -0,0 +1,76 @@
+import asyncio
+import functools
+
+_END = object()
+
+
+def run_in_executor(executor, func, *args, **kwargs):
+    """
+    Run a blocking function in an executor, or the event loop's default
+    executor if ``executor`` is ``None``.
+
+    :returns: A future for the function's result.
+    """
+    loop = asyncio.get_event_loop()
+    return loop.run_in_executor(
+        executor, functools.partial(func, *args, **kwargs))
+
+
+class AsyncIterator:
+    """
+    Iterate asynchronously over a blocking iterable, getting each item in an
+    executor.
+
+    If iteration stops early, the iterable should be closed with
+    :meth:`aclose` so that a log stream, for example, isn't left open until
+    it times out. This is done automatically when it is used as an
+    asynchronous context manager::
+
+        async with stream_logs(container) as lines:
+            async for line in lines:
+                ...
+    """
+
+    def __init__(self, make_iterable, executor=None):
+        """
+        :param make_iterable:
+            A callable that returns the iterable. This is called in the
+            executor, because creating the iterable may block too.
+        :param executor: The executor to use.
+        """
+        self._make_iterable = make_iterable
+        self._executor = executor
+        self._iterator = None
+        self._closed = False
+
+    def _next(self):
+        if self._closed:
+            return _END
+        if self._iterator is None:
+            self._iterator = iter(self._make_iterable())
+        return next(self._iterator, _END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await run_in_executor(self._executor, self._next)
+        if item is _END:
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        """
+        Stop iterating, closing the iterator if it is a generator so that it
+        can clean up.
+        """
+        self._closed = True
+        close = getattr(self._iterator, 'close', None)
+        if close is not None:
+            await run_in_executor(self._executor, close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
@@ -0,0 +1,110 @@
+"""
+Asyncio counterparts of :mod:`seaworthy.client`.
+"""
+
+import asyncio
+import time
+
+import requests
+
+from seaworthy.utils import _backoff
+
+from ._executor import run_in_executor
+
+
+async def _tcp_connect(host, port, timeout):
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+async def wait_for_port(host, port, timeout, check=None, timeout_msg=None):
+    """
+    Wait for a TCP port to accept connections, retrying with jittered
+    exponential backoff. See :func:`seaworthy.client.wait_for_port`.
+    """
+    if host in ['', '0.0.0.0']:
+        host = '127.0.0.1'
+    if timeout_msg is None:
+        timeout_msg = (
+            'Timeout ({}s) waiting for {}:{} to accept connections.'.format(
+                timeout, host, port))
+
+    deadline = time.monotonic() + timeout
+    for delay in _backoff(jitter=0.5):
+        time_left = deadline - time.monotonic()
+        if await _tcp_connect(host, int(port), min(max(time_left, 0.001), 1)):
+            return
+        if check is not None:
+            check()
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError(timeout_msg)
+        await asyncio.sleep(min(delay, time_left))
+
+
+async def wait_for_response(client, timeout, path='/', check=None,
+                            expected_status=None, tcp_first=False,
+                            executor=None):
+    """
+    Try make a GET request with an HTTP client against a certain path and
+    return once any response has been received, ignoring any errors. See
+    :func:`seaworthy.client.wait_for_response`.
+
+    The client can be a :class:`~seaworthy.client.ContainerHttpClient`, in
+    which case only the requests are made in the executor, or an
+    :class:`~seaworthy.aio.http.AsyncContainerHttpClient`, in which case the
+    requests are made on the event loop. We don't hold on to a thread while
+    waiting to retry, or while waiting for the port with ``tcp_first``.
+
+    :param executor:
+        The executor to make requests in for a synchronous client. Defaults to
+        the event loop's default executor.
+    """
+    deadline = time.monotonic() + timeout
+    timeout_msg = 'Timeout waiting for HTTP response.'
+    if tcp_first:
+        url = client._base_url
+        await wait_for_port(url.host, url.port, timeout, check=check,
+                            timeout_msg=timeout_msg)
+
+    is_async = asyncio.iscoroutinefunction(client.get)
+    for delay in _backoff(jitter=0.5):
+        try:
+            time_left = deadline - time.monotonic()
+            kwargs = {
+                'timeout': max(time_left, 0.001), 'allow_redirects': False}
+            if is_async:
+                response = await client.get(path, **kwargs)
+                # We don't read the body, so give the connection back.
+                await response.release()
+                status = response.status
+            else:
+                response = await run_in_executor(
+                    executor, client.get, path, **kwargs)
+                status = response.status_code
+            if expected_status is None or status in expected_status:
+                return response
+            if not is_async:
+                # Give the connection back before retrying.
+                response.close()
+            timeout_msg = (
+                'Timeout waiting for HTTP response with status in {}, last '
+                'status was {}.'.format(sorted(expected_status), status))
+        except (requests.exceptions.Timeout, asyncio.TimeoutError):
+            # The request timed out, our time must be up
+            break
+        except Exception:
+            pass
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            break
+        if check is not None:
+            check()
+        await asyncio.sleep(min(delay, time_left))
+
+    raise TimeoutError(timeout_msg)
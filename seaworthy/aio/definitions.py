@@ -0,0 +1,118 @@
+"""
+Asyncio counterparts of :mod:`seaworthy.definitions`.
+"""
+
+from ._executor import AsyncIterator, run_in_executor
+from .client import wait_for_response
+
+
+class AsyncContainerDefinition:
+    """
+    A wrapper around a :class:`~seaworthy.definitions.ContainerDefinition`
+    with asynchronous versions of its blocking methods, which are run in an
+    executor.
+    """
+
+    def __init__(self, definition, executor=None):
+        """
+        :param definition: The container definition to wrap.
+        :param executor:
+            The executor to run the blocking methods in. Defaults to the event
+            loop's default executor.
+        """
+        self.definition = definition
+        self._executor = executor
+        self._http_clients = []
+
+    def _run(self, func, *args, **kwargs):
+        return run_in_executor(self._executor, func, *args, **kwargs)
+
+    async def setup(self, helper=None, **run_kwargs):
+        """
+        Create and start the container, and wait for it to completely start.
+        See :meth:`.ContainerDefinition.setup`.
+
+        :returns: This wrapper.
+        """
+        await self._run(self.definition.setup, helper=helper, **run_kwargs)
+        return self
+
+    async def teardown(self):
+        """
+        Stop and remove the container, and close any HTTP clients made for
+        it. See :meth:`.ContainerDefinition.teardown`.
+        """
+        while self._http_clients:
+            await self._http_clients.pop().close()
+        await self._run(self.definition.teardown)
+
+    async def __aenter__(self):
+        return await self.setup()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.teardown()
+
+    def stream_logs(self, **kwargs):
+        """
+        Stream container output. See :meth:`.ContainerDefinition.stream_logs`.
+
+        :returns:
+            An asynchronous iterator over the log lines. Use it with
+            ``async with``, or call its ``aclose()`` method, to close the
+            stream if you stop iterating early.
+        """
+        return AsyncIterator(
+            lambda: self.definition.stream_logs(**kwargs),
+            executor=self._executor)
+
+    async def wait_for_logs_matching(self, matcher, timeout=10,
+                                     encoding='utf-8', **logs_kwargs):
+        """
+        Wait for logs matching the given matcher. See
+        :meth:`.ContainerDefinition.wait_for_logs_matching`.
+        """
+        return await self._run(
+            self.definition.wait_for_logs_matching, matcher, timeout=timeout,
+            encoding=encoding, **logs_kwargs)
+
+    async def wait_for_response(self, timeout, path='/', port=None,
+                                expected_status=None):
+        """
+        Wait for the container to respond to an HTTP request once its port
+        accepts connections, and stop waiting if the container exits. See
+        :func:`.wait_for_response`.
+
+        :param port:
+            The container port to make the request to. Defaults to the first
+            published port.
+        :param expected_status:
+            A collection of status codes to wait for. By default, any
+            response will do.
+        """
+        client = self.definition.http_client(port=port)
+        return await wait_for_response(
+            client, timeout, path=path, check=self.definition.check_running,
+            expected_status=expected_status, tcp_first=True,
+            executor=self._executor)
+
+    def http_client(self, port=None, **client_kwargs):
+        """
+        Construct an asynchronous HTTP client for this container. This
+        requires aiohttp.
+
+        :param port:
+            The container port to make requests against. If ``None``, the
+            first container port is used.
+        :param client_kwargs:
+            Other keyword arguments for
+            :class:`~seaworthy.aio.http.AsyncContainerHttpClient`, such as
+            ``limit``.
+
+        The clients are closed when the container is torn down.
+        """
+        # Local import, so that aiohttp is only needed if this is used.
+        from .http import AsyncContainerHttpClient
+        client = AsyncContainerHttpClient.for_container(
+            self.definition, container_port=port, **client_kwargs)
+        self._http_clients.append(client)
+        return client
@@ -0,0 +1,86 @@
+"""
+Asyncio counterparts of :mod:`seaworthy.helpers`.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from seaworthy.helpers import DockerHelper
+
+from ._executor import run_in_executor
+from .definitions import AsyncContainerDefinition
+
+
+class AsyncDockerHelper:
+    """
+    An asynchronous :class:`~seaworthy.helpers.DockerHelper`, with a thread
+    pool executor for running the blocking Docker calls in.
+    """
+
+    def __init__(self, namespace='test', client=None, max_workers=None,
+                 **kwargs):
+        """
+        :param namespace:
+            The namespace that the names of all created resources are prefixed
+            with.
+        :param client:
+            The Docker client to use. Defaults to a client configured from the
+            environment.
+        :param max_workers:
+            The number of threads in the executor, which limits the number of
+            Docker calls that can be made at once.
+        :param kwargs:
+            Other keyword arguments for
+            :class:`~seaworthy.helpers.DockerHelper`.
+        """
+        self.sync = DockerHelper(namespace=namespace, client=client, **kwargs)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the helper's executor.
+
+        :returns: A future for the function's result.
+        """
+        return run_in_executor(self.executor, func, *args, **kwargs)
+
+    def wrap(self, definition):
+        """
+        Wrap a definition in an :class:`.AsyncContainerDefinition` that uses
+        the helper's executor.
+        """
+        if isinstance(definition, AsyncContainerDefinition):
+            return definition
+        return AsyncContainerDefinition(definition, executor=self.executor)
+
+    async def setup(self, definition, **run_kwargs):
+        """
+        Set up a definition with this helper. Many definitions can be set up
+        at the same time with :func:`asyncio.gather`.
+
+        :param definition:
+            The definition, or an :class:`.AsyncContainerDefinition`.
+        :param run_kwargs:
+            Keyword arguments for
+            :meth:`~seaworthy.definitions.ContainerDefinition.setup`.
+
+        :returns:
+            The definition wrapped in an :class:`.AsyncContainerDefinition`.
+        """
+        wrapped = self.wrap(definition)
+        return await wrapped.setup(helper=self.sync, **run_kwargs)
+
+    async def teardown(self, max_workers=None):
+        """
+        Clean up all resources when we're done with them, and shut down the
+        executor. See :meth:`.DockerHelper.teardown`.
+        """
+        try:
+            return await self.run(self.sync.teardown, max_workers=max_workers)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.teardown()
@@ -0,0 +1,196 @@
+"""
+An aiohttp-based HTTP client for interacting with containers that have
+forwarded ports, the asyncio counterpart of :mod:`seaworthy.client`.
+
+This requires aiohttp, which can be installed with the ``aio`` extra::
+
+    pip install seaworthy[aio]
+"""
+
+import aiohttp
+
+from seaworthy.client import _ContainerUrls
+
+
+class AsyncContainerHttpClient(_ContainerUrls):
+    """
+    Asynchronous HTTP client for a specific container. URLs are built in the
+    same way as for :class:`~seaworthy.client.ContainerHttpClient`, but the
+    requests are made on the event loop, so many requests can be in flight at
+    once without a thread for each of them.
+
+    The responses are :class:`aiohttp.ClientResponse` objects. A response's
+    connection is only returned to the pool once its body has been read, or
+    once it has been released with :meth:`~aiohttp.ClientResponse.release`.
+
+    In most cases, these should be obtained from
+    :meth:`.AsyncContainerDefinition.http_client` instead of being
+    instantiated directly.
+    """
+
+    def __init__(self, host, port, url_defaults=None, session=None,
+                 limit=None):
+        """
+        :param host:
+            The address for the host to connect to.
+        :param port:
+            The port for the host to connect to.
+        :param dict url_defaults:
+            Parameters to default to in the generated URLs, see
+            `~hyperlink.URL`.
+        :param session:
+            An :class:`aiohttp.ClientSession` object. If ``None``, a session
+            is created on the event loop when the first request is made.
+        :param limit:
+            The maximum number of connections to the container that can be
+            open at once. Defaults to aiohttp's default of 100. This can't be
+            used with ``session``.
+        """
+        if session is not None and limit is not None:
+            raise ValueError('limit cannot be used with a session')
+        self._session = session
+        self._limit = limit
+        self._init_urls(host, port, url_defaults)
+
+    def _get_session(self):
+        # aiohttp sessions belong to the event loop they're created on, so we
+        # can't create ours until we're running on it.
+        if self._session is None:
+            kwargs = {}
+            if self._limit is not None:
+                kwargs['limit'] = self._limit
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(**kwargs))
+        return self._session
+
+    async def __aenter__(self):
+        return self
+
+    async def close(self):
+        """
+        Closes the underlying session, if there is one.
+        """
+        if self._session is not None:
+            await self._session.close()
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def request(self, method, path=None, url_kwargs=None, **kwargs):
+        """
+        Make a request against a container.
+
+        :param method:
+            The HTTP method to use.
+        :param list path:
+            The HTTP path (either absolute or relative).
+        :param dict url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param kwargs:
+            Any other parameters to pass to
+            :meth:`aiohttp.ClientSession.request`. A number of seconds can be
+            given as the ``timeout``, as for Requests.
+        """
+        timeout = kwargs.get('timeout')
+        if isinstance(timeout, (int, float)):
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        return await self._get_session().request(
+            method, self._url(path, url_kwargs), **kwargs)
+
+    async def options(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends an OPTIONS request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('OPTIONS', path, url_kwargs, **kwargs)
+
+    async def head(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a HEAD request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('HEAD', path, url_kwargs, **kwargs)
+
+    async def get(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a GET request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('GET', path, url_kwargs, **kwargs)
+
+    async def post(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a POST request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('POST', path, url_kwargs, **kwargs)
+
+    async def put(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a PUT request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('PUT', path, url_kwargs, **kwargs)
+
+    async def patch(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a PATCH request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('PATCH', path, url_kwargs, **kwargs)
+
+    async def delete(self, path=None, url_kwargs=None, **kwargs):
+        """
+        Sends a DELETE request.
+
+        :param path:
+            The HTTP path (either absolute or relative).
+        :param url_kwargs:
+            Parameters to override in the generated URL. See `~hyperlink.URL`.
+        :param **kwargs:
+            Optional arguments that ``request`` takes.
+        :return: aiohttp.ClientResponse object
+        """
+        return await self.request('DELETE', path, url_kwargs, **kwargs)
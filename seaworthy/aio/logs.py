@@ -0,0 +1,42 @@
+"""
+Asyncio counterparts of :mod:`seaworthy.stream.logs`.
+"""
+
+from seaworthy.stream import logs
+
+from ._executor import AsyncIterator, run_in_executor
+
+
+def stream_logs(container, timeout=10.0, executor=None, **logs_kwargs):
+    """
+    Stream logs from a Docker container within a timeout. See
+    :func:`seaworthy.stream.logs.stream_logs`.
+
+    :param executor:
+        The executor to read the logs in. Defaults to the event loop's
+        default executor.
+
+    :returns:
+        An asynchronous iterator over the log lines. Use it with
+        ``async with``, or call its ``aclose()`` method, to close the
+        stream if you stop iterating early.
+    """
+    return AsyncIterator(
+        lambda: logs.stream_logs(container, timeout=timeout, **logs_kwargs),
+        executor=executor)
+
+
+async def wait_for_logs_matching(container, matcher, timeout=10,
+                                 encoding='utf-8', executor=None,
+                                 **logs_kwargs):
+    """
+    Wait for matching log line(s) from the given container. See
+    :func:`seaworthy.stream.logs.wait_for_logs_matching`.
+
+    :param executor:
+        The executor to read the logs in. Defaults to the event loop's
+        default executor.
+    """
+    return await run_in_executor(
+        executor, logs.wait_for_logs_matching, container, matcher,
+        timeout=timeout, encoding=encoding, **logs_kwargs)
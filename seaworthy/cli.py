@@ -0,0 +1,103 @@
+"""
+The ``seaworthy`` command line tool, for managing Docker resources created by
+Seaworthy outside of a test run.
+"""
+
+import argparse
+import sys
+
+from seaworthy.checks import docker_client
+from seaworthy.helpers import (
+    find_kept_alive_containers, find_stale_resources, invalidate, reap)
+
+
+def _print_result(result):
+    for record in result.records:
+        if record.failed:
+            print("Failed to remove {} '{}': {}".format(
+                record.model_name, record.name, record.error))
+        else:
+            print("Removed {} '{}' ({:.2f}s)".format(
+                record.model_name, record.name, record.duration))
+    return 1 if result.failures else 0
+
+
+def _reap(client, args):
+    if args.dry_run:
+        for model_name, resources in find_stale_resources(
+                client, namespace=args.namespace, max_age=args.max_age):
+            for resource in resources:
+                print("Would remove {} '{}'".format(model_name, resource.name))
+        return 0
+
+    result = reap(client, namespace=args.namespace, max_age=args.max_age,
+                  max_workers=args.workers)
+    return _print_result(result)
+
+
+def _invalidate(client, args):
+    if args.dry_run:
+        for container in find_kept_alive_containers(
+                client, namespace=args.namespace):
+            print("Would remove container '{}'".format(container.name))
+        return 0
+
+    result = invalidate(client, namespace=args.namespace,
+                        max_workers=args.workers)
+    return _print_result(result)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(
+        prog='seaworthy',
+        description='Manage Docker resources created by Seaworthy.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    reap_parser = subparsers.add_parser(
+        'reap', help=(
+            'Remove resources left behind by Seaworthy sessions that are no '
+            'longer running.'))
+    reap_parser.add_argument(
+        '--namespace', help='Only remove resources in this namespace.')
+    reap_parser.add_argument(
+        '--max-age', type=float, metavar='SECONDS', help=(
+            'Also remove resources from other sessions that are older than '
+            'this, whether or not those sessions are still running.'))
+    reap_parser.add_argument(
+        '--workers', type=int, default=8,
+        help='The number of resources to remove concurrently.')
+    reap_parser.add_argument(
+        '--dry-run', action='store_true',
+        help='List the resources that would be removed without removing them.')
+    reap_parser.set_defaults(func=_reap)
+
+    invalidate_parser = subparsers.add_parser(
+        'invalidate', help=(
+            'Remove containers that are kept alive between sessions, so that '
+            'they are recreated by the next session.'))
+    invalidate_parser.add_argument(
+        '--namespace', help='Only remove containers in this namespace.')
+    invalidate_parser.add_argument(
+        '--workers', type=int, default=8,
+        help='The number of containers to remove concurrently.')
+    invalidate_parser.add_argument(
+        '--dry-run', action='store_true',
+        help='List the containers that would be removed without removing '
+             'them.')
+    invalidate_parser.set_defaults(func=_invalidate)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Entry point for the ``seaworthy`` command.
+    """
+    args = _parser().parse_args(argv)
+    with docker_client() as client:
+        return args.func(client, args)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
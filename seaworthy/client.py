@@ -2,11 +2,24 @@
 A requests-based HTTP client for interacting with containers that have
 forwarded ports.
 """
+import errno
+import functools
+import re
+import select
+import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import hyperlink
 
 import requests
+from requests.adapters import DEFAULT_POOLSIZE, HTTPAdapter
+
+from seaworthy.utils import _backoff, _sleep
+
+
+# Paths with only unreserved characters don't need any encoding
+_PLAIN_PATH = re.compile(r'[A-Za-z0-9._~/-]*\Z')
 
 
 def _path_segments(url, path_str):
@@ -17,7 +30,85 @@ def _path_segments(url, path_str):
     return url.child(*path_str.split('/')).path
 
 
-class ContainerHttpClient:
+def _build_url(base_url, path, kwargs):
+    kwargs = dict(kwargs)
+    if path is not None:
+        kwargs['path'] = _path_segments(base_url, path)
+    return base_url.replace(**kwargs).to_text()
+
+
+# Shared by all clients and keyed on the base URL, so that the cache doesn't
+# hold on to the clients themselves.
+URL_CACHE_SIZE = 256
+_cached_url = functools.lru_cache(maxsize=URL_CACHE_SIZE)(_build_url)
+
+
+class _ContainerUrls:
+    """
+    The URL building for HTTP clients for a specific container, which is
+    shared by :class:`ContainerHttpClient` and
+    :class:`~seaworthy.aio.http.AsyncContainerHttpClient`.
+    """
+
+    URL_DEFAULTS = {'scheme': 'http'}
+
+    def _init_urls(self, host, port, url_defaults):
+        _url_defaults = self.URL_DEFAULTS.copy()
+        if url_defaults is not None:
+            _url_defaults.update(url_defaults)
+        self._base_url = hyperlink.URL(
+            host=host, port=int(port), **_url_defaults)
+        self._base_text = self._base_url.to_text()
+        # Paths can only be appended to the base URL's text if it has nothing
+        # after the path.
+        self._plain_base = not (
+            self._base_url.path or self._base_url.query or
+            self._base_url.fragment)
+
+    @classmethod
+    def for_container(cls, container, container_port=None, **kwargs):
+        """
+        :param container:
+            The container to make requests against.
+        :param container_port:
+            The container port to make requests against. If ``None``, the first
+            container port is used.
+        :param kwargs:
+            Other keyword arguments for the client, such as ``pool_maxsize``.
+        :returns:
+            A ContainerClient object configured to make requests to the
+            container.
+        """
+        if container_port is not None:
+            host, port = container.get_host_port(container_port)
+        else:
+            host, port = container.get_first_host_port()
+
+        return cls(host, port, **kwargs)
+
+    def _url(self, path, kwargs):
+        """
+        Build the URL for a request. Building URLs with hyperlink is slow
+        enough to matter when making many requests, so simple paths are
+        appended to the base URL's text, and other URLs are cached.
+        """
+        if not kwargs:
+            if path is None:
+                return self._base_text
+            if self._plain_base and _PLAIN_PATH.match(path):
+                sep = '' if path.startswith('/') else '/'
+                return self._base_text + sep + path
+            kwargs = ()
+        else:
+            kwargs = tuple(sorted(kwargs.items()))
+        try:
+            return _cached_url(self._base_url, path, kwargs)
+        except TypeError:
+            # Unhashable values, such as lists, can't be cached
+            return _build_url(self._base_url, path, kwargs)
+
+
+class ContainerHttpClient(_ContainerUrls):
     """
     HTTP client for a specific container.
 
@@ -26,9 +117,8 @@ class ContainerHttpClient:
     directly.
     """
 
-    URL_DEFAULTS = {'scheme': 'http'}
-
-    def __init__(self, host, port, url_defaults=None, session=None):
+    def __init__(self, host, port, url_defaults=None, session=None,
+                 pool_maxsize=None, max_retries=None):
         """
         :param host:
             The address for the host to connect to.
@@ -39,16 +129,31 @@ class ContainerHttpClient:
             `~hyperlink.URL`.
         :param session:
             A Requests' Session object (or something like it).
+        :param pool_maxsize:
+            The maximum number of connections to keep open to the container
+            for reuse. Defaults to Requests' default of 10. This is also the
+            default number of concurrent requests for :meth:`map_requests`.
+        :param max_retries:
+            The number of times to retry failed connections, or a
+            :class:`urllib3.util.retry.Retry` object. Defaults to Requests'
+            default of no retries.
+
+        ``pool_maxsize`` and ``max_retries`` can't be used with ``session``.
         """
         if session is None:
             session = requests.Session()
+            if pool_maxsize is not None or max_retries is not None:
+                adapter = HTTPAdapter(
+                    pool_maxsize=pool_maxsize or DEFAULT_POOLSIZE,
+                    max_retries=max_retries or 0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+        elif pool_maxsize is not None or max_retries is not None:
+            raise ValueError(
+                'pool_maxsize and max_retries cannot be used with a session')
         self._session = session
-
-        _url_defaults = self.URL_DEFAULTS.copy()
-        if url_defaults is not None:
-            _url_defaults.update(url_defaults)
-        self._base_url = hyperlink.URL(
-            host=host, port=int(port), **_url_defaults)
+        self._pool_maxsize = pool_maxsize or DEFAULT_POOLSIZE
+        self._init_urls(host, port, url_defaults)
 
     def __enter__(self):
         return self
@@ -62,31 +167,6 @@ class ContainerHttpClient:
     def __exit__(self, *args):
         self.close()
 
-    @classmethod
-    def for_container(cls, container, container_port=None):
-        """
-        :param container:
-            The container to make requests against.
-        :param container_port:
-            The container port to make requests against. If ``None``, the first
-            container port is used.
-        :returns:
-            A ContainerClient object configured to make requests to the
-            container.
-        """
-        if container_port is not None:
-            host, port = container.get_host_port(container_port)
-        else:
-            host, port = container.get_first_host_port()
-
-        return cls(host, port)
-
-    def _url(self, path, kwargs):
-        kwargs = kwargs if kwargs is not None else {}
-        if path is not None:
-            kwargs['path'] = _path_segments(self._base_url, path)
-        return self._base_url.replace(**kwargs).to_text()
-
     def request(self, method, path=None, url_kwargs=None, **kwargs):
         """
         Make a request against a container.
@@ -103,6 +183,37 @@ class ContainerHttpClient:
         return self._session.request(
             method, self._url(path, url_kwargs), **kwargs)
 
+    def map_requests(self, reqs, max_workers=None):
+        """
+        Make many requests against a container concurrently, reusing the
+        session's connections.
+
+        :param reqs:
+            An iterable of requests to make. Each request is either a path to
+            GET, or a dict of keyword arguments for :meth:`request`, where
+            ``method`` defaults to ``'GET'``.
+        :param max_workers:
+            The maximum number of requests to make at the same time. Defaults
+            to the client's ``pool_maxsize``, so that no more connections are
+            opened than can be kept for reuse.
+        :returns:
+            A list of the responses, in the same order as the requests.
+        :raises Exception:
+            The first exception raised by a request, in the order of the
+            requests.
+        """
+        if max_workers is None:
+            max_workers = self._pool_maxsize
+
+        def make_request(request):
+            if not isinstance(request, dict):
+                return self.request('GET', request)
+            kwargs = dict(request)
+            return self.request(kwargs.pop('method', 'GET'), **kwargs)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(make_request, reqs))
+
     def get(self, path=None, url_kwargs=None, **kwargs):
         """
         Sends a GET request.
@@ -202,32 +313,135 @@ class ContainerHttpClient:
         return self._session.delete(self._url(path, url_kwargs), **kwargs)
 
 
-def wait_for_response(client, timeout, path='/'):
+def _tcp_connect(host, port, timeout):
     """
-    Try make a GET request with an HTTP client against a certain path and
-    return once any response has been received, ignoring any errors.
+    Try to connect to a TCP port, without blocking for longer than the
+    timeout. Returns ``True`` if the connection was accepted.
+    """
+    try:
+        addrs = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError:
+        return False
+    for family, type_, proto, _, addr in addrs:
+        with socket.socket(family, type_, proto) as sock:
+            sock.setblocking(False)
+            err = sock.connect_ex(addr)
+            if err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+                _, writable, _ = select.select([], [sock], [], timeout)
+                if not writable:
+                    continue
+                err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err == 0:
+                return True
+    return False
+
+
+def wait_for_port(host, port, timeout, check=None, timeout_msg=None,
+                  stop=None):
+    """
+    Wait for a TCP port to accept connections, retrying with jittered
+    exponential backoff. Connecting is much cheaper than making a request, so
+    this is a good first step when waiting for a server to start.
+
+    :param host:
+        The host to connect to. An unspecified address, such as the
+        ``0.0.0.0`` that Docker publishes ports on, means the local host.
+    :param port: The port to connect to.
+    :param timeout: The maximum number of seconds to wait.
+    :param check:
+        A callable to call before each retry, which can raise an exception to
+        stop waiting. For example,
+        :meth:`~seaworthy.definitions.ContainerDefinition.check_running`.
+    :param timeout_msg:
+        Message to raise in the exception when a timeout occurs.
+    :param threading.Event stop:
+        An event that can be set to stop waiting, for example when the result
+        is no longer needed. We return without an error if it is set.
 
     :raises TimeoutError:
-        If a request fails to be made within the timeout period.
+        If the port doesn't accept connections within the timeout period.
     """
-    # We want time.monotonic on Pythons that have it, otherwise time.time will
-    # have to do.
-    get_time = getattr(time, 'monotonic', time.time)
+    if host in ['', '0.0.0.0']:
+        host = '127.0.0.1'
+    if timeout_msg is None:
+        timeout_msg = (
+            'Timeout ({}s) waiting for {}:{} to accept connections.'.format(
+                timeout, host, port))
+
+    deadline = time.monotonic() + timeout
+    for delay in _backoff(jitter=0.5):
+        if stop is not None and stop.is_set():
+            return
+        time_left = deadline - time.monotonic()
+        if _tcp_connect(host, int(port), min(max(time_left, 0.001), 1)):
+            return
+        if check is not None:
+            check()
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError(timeout_msg)
+        _sleep(min(delay, time_left), stop)
 
-    deadline = get_time() + timeout
-    while True:
+
+def wait_for_response(client, timeout, path='/', check=None,
+                      expected_status=None, tcp_first=False, stop=None):
+    """
+    Try make a GET request with an HTTP client against a certain path and
+    return once any response has been received, ignoring any errors. Failed
+    requests are retried with jittered exponential backoff.
+
+    :param check:
+        A callable to call before each retry, which can raise an exception to
+        stop waiting. For example,
+        :meth:`~seaworthy.definitions.ContainerDefinition.check_running`.
+    :param expected_status:
+        A collection of status codes to wait for, such as ``{200}``. Other
+        responses are retried. By default, any response will do.
+    :param tcp_first:
+        Whether to wait for the client's port to accept connections (see
+        :func:`wait_for_port`) before making any requests. This needs a
+        client that connects to its host and port over TCP.
+    :param threading.Event stop:
+        An event that can be set to stop waiting, for example when the result
+        is no longer needed. We return ``None`` if it is set.
+
+    :returns: The response.
+    :raises TimeoutError:
+        If a request fails to be made within the timeout period.
+    """
+    deadline = time.monotonic() + timeout
+    timeout_msg = 'Timeout waiting for HTTP response.'
+    if tcp_first:
+        url = client._base_url
+        wait_for_port(url.host, url.port, timeout, check=check,
+                      timeout_msg=timeout_msg, stop=stop)
+
+    for delay in _backoff(jitter=0.5):
+        if stop is not None and stop.is_set():
+            return None
         try:
-            # Don't care what the response is, as long as we get one
-            time_left = deadline - get_time()
-            client.get(
+            time_left = deadline - time.monotonic()
+            response = client.get(
                 path, timeout=max(time_left, 0.001), allow_redirects=False)
-            return
+            if (expected_status is None or
+                    response.status_code in expected_status):
+                return response
+            # Give the connection back before retrying.
+            response.close()
+            timeout_msg = (
+                'Timeout waiting for HTTP response with status in {}, last '
+                'status was {}.'.format(
+                    sorted(expected_status), response.status_code))
         except requests.exceptions.Timeout:
             # Requests timed out, our time must be up
             break
         except Exception:
-            if get_time() >= deadline:
-                break
-            time.sleep(0.1)
+            pass
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            break
+        if check is not None:
+            check()
+        _sleep(min(delay, time_left), stop)
 
-    raise TimeoutError('Timeout waiting for HTTP response.')
+    raise TimeoutError(timeout_msg)
@@ -24,9 +24,12 @@ class NginxContainer(ContainerDefinition):
 
     def wait_for_start(self):
         """
-        Wait for Nginx to return any valid HTTP response.
+        Wait for Nginx to return any valid HTTP response, once its port
+        accepts connections. If the container exits first, we stop waiting.
         """
-        wait_for_response(self.http_client(), self.wait_timeout)
+        wait_for_response(
+            self.http_client(), self.wait_timeout, check=self.check_running,
+            tcp_first=True)
 
     def exec_nginx(self, args):
         """
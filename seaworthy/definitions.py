@@ -3,13 +3,20 @@ Wrappers over Docker resource types to aid in setup/teardown of and interaction
 with Docker resources.
 """
 
+import copy
 import functools
+import itertools
+import os
+import time
 
 from docker import models
 
 from seaworthy.helpers import DockerHelper
-from seaworthy.stream.logs import stream_logs, wait_for_logs_matching
+from seaworthy.stream.hub import LogHub, LogHubOverflowError
+from seaworthy.stream.logs import (
+    _last_few_log_lines, _wait_for_lines_matching, log_mark, stream_logs)
 from seaworthy.stream.matchers import RegexMatcher, UnorderedMatcher
+from seaworthy.stream.recorder import LogRecorder
 
 
 # This is a hack to control our generated documentation. The value of the
@@ -209,9 +216,12 @@ class ContainerDefinition(_DefinitionBase):
 
     __model_type__ = models.containers.Container
     WAIT_TIMEOUT = 10.0
+    LOG_BUFFER_LINES = 10000
+    LOG_DIR = None
 
     def __init__(self, name, image, wait_patterns=None, wait_timeout=None,
-                 create_kwargs=None, helper=None):
+                 create_kwargs=None, helper=None, pool=None,
+                 wait_strategy=None, log_dir=None):
         """
         :param name:
             The name for the container. The actual name of the container is
@@ -222,34 +232,85 @@ class ContainerDefinition(_DefinitionBase):
             Regex patterns to use when checking that the container has started
             successfully.
         :param wait_timeout:
-            Number of seconds to wait for the ``wait_patterns``. Defaults to
-            ``self.WAIT_TIMEOUT``.
+            Number of seconds to wait for the ``wait_patterns`` or
+            ``wait_strategy``. Defaults to ``self.WAIT_TIMEOUT``.
         :param dict create_kwargs:
             Other kwargs to use when creating the container.
         :param seaworthy.helper.ContainerHelper helper:
             A ContainerHelper instance used to create containers.
-        """
+        :param seaworthy.pool.ContainerPool pool:
+            A pool to take started containers from on setup and to return
+            them to on teardown, instead of creating and removing a container
+            each time.
+        :param seaworthy.wait.WaitStrategy wait_strategy:
+            A strategy to use when checking that the container has started
+            successfully, such as waiting for the container's healthcheck.
+            This can't be used with ``wait_patterns``.
+        :param log_dir:
+            A directory to record the container's logs in, in a file for each
+            container that is set up. Defaults to ``self.LOG_DIR``, which is
+            ``None`` (don't record the logs). The
+            :class:`~seaworthy.stream.recorder.LogRecorder` for the last
+            container is kept in ``self.log_recorder``, and can be used to
+            search its logs even after teardown. Errors when waiting for logs
+            get the last few log lines from it rather than from Docker.
+        """
+        if wait_patterns and wait_strategy is not None:
+            raise ValueError(
+                'wait_patterns and wait_strategy cannot be used together')
         super().__init__(name, create_kwargs=create_kwargs, helper=helper)
+        self._pool = pool
 
         self._create_args = (image,)
         if wait_patterns:
             self.wait_matchers = [RegexMatcher(p) for p in wait_patterns]
         else:
             self.wait_matchers = None
+        self.wait_strategy = wait_strategy
         if wait_timeout is not None:
             self.wait_timeout = wait_timeout
         else:
             self.wait_timeout = self.WAIT_TIMEOUT
 
+        self.log_dir = log_dir if log_dir is not None else self.LOG_DIR
+        self._reset_container_state()
+
+    def _reset_container_state(self):
+        # The state that belongs to the definition's current container.
+        self._kept_alive = False
+        self.log_recorder = None
         self._http_clients = []
+        self._shared_http_clients = {}
+        self._log_hub = None
+
+    def _waiter_copy(self, container):
+        """
+        Make a copy of the definition for waiting for another container to
+        start, without sharing any of the state for this definition's own
+        container.
+        """
+        waiter = copy.copy(self)
+        waiter._reset_container_state()
+        waiter._inner = container
+        return waiter
 
-    def setup(self, helper=None, **run_kwargs):
+    def setup(self, helper=None, keep_alive=False, **run_kwargs):
         """
         Creates the container, starts it, and waits for it to completely start.
+        If the definition has a pool, a started container is taken from the
+        pool instead.
 
         :param helper:
             The resource helper to use, if one was not provided when this
             container definition was created.
+        :param keep_alive:
+            Whether to keep the container alive after the helper is torn down
+            so that later sessions can reuse it. A running container that was
+            kept alive with the same image ID and merged keyword arguments is
+            reused instead of creating a new one. Kept-alive containers can be
+            removed with the ``seaworthy invalidate`` command. This can't be
+            used with a pool, or for a container that mounts volumes created
+            by the helper.
         :param **run_kwargs: Keyword arguments passed to :meth:`.run`.
 
         :returns:
@@ -262,18 +323,87 @@ class ContainerDefinition(_DefinitionBase):
             return
 
         self.set_helper(helper)
+        if keep_alive:
+            if self._pool is not None:
+                raise ValueError(
+                    'Pooled containers cannot be kept alive.')
+            self._setup_kept_alive(run_kwargs)
+            return self
+
+        if self._pool is not None:
+            self._inner = self._pool.acquire(self, **run_kwargs)
+            self._record_logs()
+            return self
+
         self.run(**run_kwargs)
+        self._record_logs()
         self.wait_for_start()
         return self
 
+    def _setup_kept_alive(self, run_kwargs):
+        kwargs = self.merge_kwargs(self._create_kwargs, run_kwargs)
+        fetch_image = kwargs.pop('fetch_image', True)
+        fingerprint = self.helper.fingerprint(
+            *self._create_args, fetch_image=fetch_image, **kwargs)
+
+        self._inner = self.helper.get_kept_alive(
+            self.name, fingerprint, **kwargs)
+        if self._inner is not None:
+            self._kept_alive = True
+            self._record_logs()
+            return
+
+        self.run(fingerprint=fingerprint, **run_kwargs)
+        self._record_logs()
+        try:
+            self.wait_for_start()
+        except Exception:
+            self.halt()
+            raise
+        self.helper.keep_alive(self.inner())
+        self._kept_alive = True
+
     def teardown(self):
         """
-        Stop and remove the container if it exists.
+        Stop and remove the container if it exists. If the definition has a
+        pool, the container is returned to the pool instead. If the container
+        is being kept alive, it is left running.
+        """
+        self._close_clients()
+        if not self.created:
+            self._close_recorder()
+            return
+
+        if self._kept_alive:
+            self._close_recorder()
+            self._inner = None
+            self._kept_alive = False
+        elif self._pool is not None:
+            self._close_recorder()
+            self._pool.release(self)
+            self._inner = None
+        else:
+            # Keep recording while the container stops, since its shutdown
+            # logs are often the most useful ones.
+            try:
+                self.halt()
+            finally:
+                self._close_recorder(timeout=1)
+
+    def _close_recorder(self, timeout=0):
+        if self.log_recorder is not None:
+            self.log_recorder.close(timeout=timeout)
+
+    def _close_clients(self):
+        """
+        Close the HTTP clients and log hub that were used for the container.
         """
         while self._http_clients:
             self._http_clients.pop().close()
-        if self.created:
-            self.halt()
+        self._shared_http_clients.clear()
+        if self._log_hub is not None:
+            self._log_hub.close()
+            self._log_hub = None
 
     def status(self):
         """
@@ -322,15 +452,27 @@ class ContainerDefinition(_DefinitionBase):
         """
         Wait for the container to start.
 
-        By default this will wait for the log lines matching the patterns
-        passed in the ``wait_patterns`` parameter of the constructor using an
+        By default this will use the ``wait_strategy`` passed to the
+        constructor, or wait for the log lines matching the patterns passed in
+        the ``wait_patterns`` parameter of the constructor using an
         UnorderedMatcher. For more advanced checks for container startup, this
         method should be overridden.
         """
-        if self.wait_matchers:
+        if self.wait_strategy is not None:
+            self.wait_strategy.wait(self, self.wait_timeout)
+        elif self.wait_matchers:
             matcher = UnorderedMatcher(*self.wait_matchers)
             self.wait_for_logs_matching(matcher, timeout=self.wait_timeout)
 
+    def check_running(self):
+        """
+        Raise :class:`~seaworthy.events.ContainerExitedError` if the container
+        has exited since it was created, according to the Docker events seen
+        by the helper. Useful for failing fast when polling a container that
+        crashes while starting. See :meth:`.ContainerHelper.check_running`.
+        """
+        self.helper.check_running(self.inner())
+
     def halt(self, stop_timeout=5):
         """
         Stop the container and remove it. The opposite of :meth:`run`.
@@ -409,31 +551,150 @@ class ContainerDefinition(_DefinitionBase):
             stdout=stdout, stderr=stderr, timestamps=timestamps, tail=tail,
             since=since)
 
-    def stream_logs(self, stdout=True, stderr=True, tail='all', timeout=10.0):
+    def log_hub(self):
+        """
+        Get the :class:`~seaworthy.stream.hub.LogHub` that follows the
+        container's logs, starting it if necessary. Up to
+        ``LOG_BUFFER_LINES`` log lines are kept.
+
+        :returns:
+            The hub, or ``None`` if ``LOG_BUFFER_LINES`` is ``0`` or ``None``.
+        """
+        if not self.LOG_BUFFER_LINES:
+            return None
+        if self._log_hub is None or self._log_hub.finished:
+            # The hub finishes when the container stops, and the container may
+            # have been started again since, so we need a new hub.
+            self._log_hub = LogHub(self.inner(), self.LOG_BUFFER_LINES)
+            self._log_hub.start()
+        return self._log_hub
+
+    def _record_logs(self):
+        if self.log_dir is None:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        container = self.inner()
+        filename = '{}-{}.log'.format(container.name, container.short_id)
+        path = os.path.join(self.log_dir, filename)
+        self.log_recorder = LogRecorder(container, path)
+        self.log_recorder.start()
+
+    def _last_log_lines(self):
+        if self.log_recorder is not None:
+            return self.log_recorder.tail(100).decode('utf-8', 'replace')
+        return _last_few_log_lines(self.inner())
+
+    def _subscribe_logs(self, timeout, stop=None, **logs_kwargs):
+        """
+        Subscribe to all the container's logs from the log hub, if the hub
+        can provide them.
+        """
+        defaults = {'stdout': True, 'stderr': True, 'tail': 'all'}
+        if any(defaults.get(k, object()) != v for k, v in logs_kwargs.items()):
+            return None
+        hub = self.log_hub()
+        if hub is None or hub.first > 0:
+            return None
+        return self._hub_lines(hub, timeout, stop, logs_kwargs)
+
+    def _hub_lines(self, hub, timeout, stop, logs_kwargs):
+        deadline = time.monotonic() + timeout
+        count = 0
+        try:
+            for line in hub.subscribe(
+                    timeout=timeout, stop=stop,
+                    timeout_msg='Timeout waiting for container logs.'):
+                count += 1
+                yield line
+        except LogHubOverflowError:
+            # We fell behind and the hub dropped lines we hadn't read yet, so
+            # read the rest of them from a new stream of all the logs.
+            lines = stream_logs(
+                self.inner(), timeout=max(deadline - time.monotonic(), 0),
+                stop=stop, **logs_kwargs)
+            yield from itertools.islice(lines, count, None)
+
+    def log_mark(self):
+        """
+        Mark the current end of the container's logs, so that only the output
+        after it is streamed or matched by passing the mark as the ``since``
+        parameter to :meth:`stream_logs` or :meth:`wait_for_logs_matching`::
+
+            mark = con.log_mark()
+            con.inner().kill(signal='SIGHUP')
+            con.wait_for_logs_matching(
+                RegexMatcher('Reloading'), since=mark)
+
+        See :func:`~seaworthy.stream.logs.log_mark`.
+        """
+        return log_mark(self.inner())
+
+    def stream_logs(self, stdout=True, stderr=True, tail='all', timeout=10.0,
+                    since=None):
         """
         Stream container output.
+
+        All the output is read from the container's log hub (see
+        :meth:`log_hub`) rather than a new stream, if the hub still has it.
+        Output since a :class:`~seaworthy.stream.logs.LogMark` from
+        :meth:`log_mark` is always read from a new stream.
         """
+        if since is None:
+            lines = self._subscribe_logs(
+                timeout, stdout=stdout, stderr=stderr, tail=tail)
+            if lines is not None:
+                return lines
         return stream_logs(
             self.inner(), stdout=stdout, stderr=stderr, tail=tail,
-            timeout=timeout)
+            timeout=timeout, since=since)
 
     def wait_for_logs_matching(self, matcher, timeout=10, encoding='utf-8',
-                               **logs_kwargs):
+                               stop=None, **logs_kwargs):
         """
         Wait for logs matching the given matcher.
+
+        All the output is read from the container's log hub (see
+        :meth:`log_hub`) rather than a new stream, if the hub still has it.
+
+        If the ``stop`` event is set, we stop reading the logs and raise a
+        ``RuntimeError`` as if they had ended.
         """
-        wait_for_logs_matching(
-            self.inner(), matcher, timeout=timeout, encoding=encoding,
-            **logs_kwargs)
+        lines = self._subscribe_logs(timeout, stop=stop, **logs_kwargs)
+        if lines is None:
+            lines = stream_logs(
+                self.inner(), timeout=timeout, stop=stop, **logs_kwargs)
+        return _wait_for_lines_matching(
+            self.inner(), lines, matcher, timeout, encoding,
+            last_lines=self._last_log_lines)
 
-    def http_client(self, port=None):
+    def http_client(self, port=None, shared=False, **client_kwargs):
         """
         Construct an HTTP client for this container.
-        """
+
+        :param port:
+            The container port to make requests against. If ``None``, the
+            first container port is used.
+        :param shared:
+            Whether to reuse the shared client for the port, so that its
+            connections are kept open and reused across callers. The shared
+            client is created the first time it is asked for.
+        :param client_kwargs:
+            Other keyword arguments for
+            :class:`~seaworthy.client.ContainerHttpClient`, such as
+            ``pool_maxsize``. These are ignored if the shared client already
+            exists.
+
+        The clients are closed when the container is torn down.
+        """
+        if shared and port in self._shared_http_clients:
+            return self._shared_http_clients[port]
         # Local import to avoid potential circularity.
         from seaworthy.client import ContainerHttpClient
-        client = ContainerHttpClient.for_container(self, container_port=port)
+        client = ContainerHttpClient.for_container(
+            self, container_port=port, **client_kwargs)
         self._http_clients.append(client)
+        if shared:
+            self._shared_http_clients[port] = client
         return client
 
 
@@ -0,0 +1,186 @@
+"""
+Tools for watching the Docker events of the containers we create, so that we
+can react to containers starting, exiting, or changing health status without
+polling.
+"""
+
+import collections
+import logging
+import threading
+
+from seaworthy.utils import _call_when_set
+
+log = logging.getLogger(__name__)
+
+# The most events we keep for each container. Containers that are exec'd into
+# or health checked get a steady stream of events while they run, and we only
+# ever need the recent ones.
+MAX_EVENTS_PER_CONTAINER = 100
+
+
+class ContainerExitedError(RuntimeError):
+    """
+    Raised when a container exits while we're waiting for it.
+    """
+
+
+def _event_status(event):
+    return event.get('status') or event.get('Action')
+
+
+def _event_container_id(event):
+    return event.get('id') or event.get('Actor', {}).get('ID')
+
+
+class EventHub:
+    """
+    A single subscription to the Docker events stream, whose container events
+    are shared with everything waiting on a container.
+
+    The events of each container's most recent run are kept from the time
+    that the hub is started until the container is destroyed, so it doesn't
+    matter whether a container's events happen before or after somebody
+    starts waiting for them. When a container is (re)started, the events from
+    its previous run are forgotten.
+    """
+
+    def __init__(self, client, filters=None):
+        """
+        :param client: The Docker client to use.
+        :param filters:
+            Filters for the events stream, for example to only watch the
+            containers with a particular label.
+        """
+        self._client = client
+        self._filters = dict(filters or {})
+        self._filters['type'] = 'container'
+        self._cond = threading.Condition()
+        self._events = {}
+        self._stream = None
+
+    def start(self):
+        """
+        Subscribe to the events stream and start dispatching events in a
+        background thread, if that hasn't happened already. Only events that
+        happen after this are seen.
+        """
+        with self._cond:
+            if self._stream is not None:
+                return
+            # The events request has been accepted by the time this returns,
+            # so we won't miss any events after this.
+            self._stream = self._client.events(
+                filters=self._filters, decode=True)
+            thread = threading.Thread(
+                target=self._run, args=(self._stream,), daemon=True)
+            thread.start()
+
+    def close(self):
+        """
+        Stop watching the events stream. Anything waiting for events stops
+        waiting.
+        """
+        with self._cond:
+            stream, self._stream = self._stream, None
+            self._events.clear()
+            self._cond.notify_all()
+        if stream is not None:
+            stream.close()
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    def _run(self, stream):
+        try:
+            for event in stream:
+                self._dispatch(event)
+        except Exception as e:
+            # The stream raises errors when it's closed while we're reading
+            if stream is self._stream:
+                log.warning('Docker events stream failed: {!r}'.format(e))
+
+    def _dispatch(self, event):
+        container_id = _event_container_id(event)
+        status = _event_status(event)
+        if container_id is None or status is None:
+            return
+
+        with self._cond:
+            # Events from before a restart no longer apply
+            if status in ('start', 'destroy'):
+                self._events.pop(container_id, None)
+            if status != 'destroy':
+                events = self._events.setdefault(
+                    container_id,
+                    collections.deque(maxlen=MAX_EVENTS_PER_CONTAINER))
+                events.append(event)
+            self._cond.notify_all()
+
+    def find(self, container_id, statuses):
+        """
+        Find the most recent event with one of the given statuses that has
+        been seen for a container since it was last started.
+
+        :param container_id: The ID of the container.
+        :param statuses:
+            The event statuses to look for, for example ``'die'`` or
+            ``'health_status: healthy'``.
+
+        :returns: The event, or ``None`` if there isn't one.
+        """
+        with self._cond:
+            return self._find(container_id, statuses)
+
+    def _find(self, container_id, statuses):
+        for event in reversed(self._events.get(container_id, ())):
+            if _event_status(event) in statuses:
+                return event
+        return None
+
+    def wait_for(self, container_id, statuses, timeout=None, stop=None):
+        """
+        Wait for an event with one of the given statuses for a container. See
+        :meth:`find`.
+
+        :param timeout:
+            The maximum number of seconds to wait. By default, we wait
+            forever.
+        :param threading.Event stop:
+            An event that can be set to stop waiting.
+
+        :returns:
+            The event, or ``None`` if the timeout was reached, the hub was
+            closed or ``stop`` was set first.
+        """
+        if stop is not None:
+            _call_when_set(stop, self._wake, timeout)
+        with self._cond:
+            self._cond.wait_for(
+                lambda: (self._find(container_id, statuses) is not None or
+                         self._stream is None or
+                         (stop is not None and stop.is_set())),
+                timeout)
+            return self._find(container_id, statuses)
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def check_running(self, container_id, name=None):
+        """
+        Raise an error if a container has exited.
+
+        :param container_id: The ID of the container.
+        :param name: The name of the container to use in the error message.
+
+        :raises ContainerExitedError:
+            If a ``die`` event has been seen since the container was last
+            started.
+        """
+        event = self.find(container_id, ['die'])
+        if event is not None:
+            attributes = event.get('Actor', {}).get('Attributes', {})
+            raise ContainerExitedError(
+                "Container '{}' exited with code {}.".format(
+                    name or container_id, attributes.get('exitCode', '?')))
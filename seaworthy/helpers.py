@@ -3,10 +3,24 @@ Classes that track resource creation and removal to ensure that all resources
 are namespaced and cleaned up after use.
 """
 
+import hashlib
 import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
 
 import docker
 from docker import models
+from docker.models.containers import _create_container_args
+
+from seaworthy.events import EventHub
+from seaworthy.stream.pull import pull_image
+from seaworthy.utils import _freeze
 
 # This is a hack to control our generated documentation. The value of the
 # attribute is ignored, only its presence or absence can be detected by the
@@ -16,6 +30,25 @@ __apigen_inherited_members__ = None
 
 log = logging.getLogger(__name__)
 
+#: Label for the namespace of the helper that created a resource.
+NAMESPACE_LABEL = 'seaworthy.namespace'
+#: Label for the ID of the session (process) that created a resource.
+SESSION_LABEL = 'seaworthy.session'
+#: Label for the PID of the process that created a resource.
+PID_LABEL = 'seaworthy.pid'
+#: Label for the hostname of the machine that created a resource.
+HOST_LABEL = 'seaworthy.host'
+#: Label for the UNIX time at which a resource was created.
+CREATED_LABEL = 'seaworthy.created'
+#: Label for containers that are kept alive between sessions.
+KEEP_ALIVE_LABEL = 'seaworthy.keep-alive'
+#: Label for the fingerprint of the image and parameters that a kept-alive
+#: container was created with.
+FINGERPRINT_LABEL = 'seaworthy.fingerprint'
+
+#: The ID of the current session, unique to this process.
+SESSION_ID = uuid.uuid4().hex
+
 
 def fetch_images(client, images):
     """
@@ -24,12 +57,20 @@ def fetch_images(client, images):
     return [fetch_image(client, image) for image in images]
 
 
-def fetch_image(client, name):
+def fetch_image(client, name, progress=None, timeout=None):
     """
     Fetch an image if it isn't already present.
 
     This works like ``docker pull`` and will pull the tag ``latest`` if no tag
     is specified in the image name.
+
+    :param progress:
+        A callable to call with a :class:`~seaworthy.stream.pull.PullProgress`
+        as the pull progresses. By default, the progress is logged every few
+        seconds at the ``DEBUG`` level.
+    :param timeout:
+        Timeout value in seconds for pulling the image. By default, there is
+        no timeout.
     """
     try:
         image = client.images.get(name)
@@ -38,7 +79,8 @@ def fetch_image(client, name):
         tag = 'latest' if tag is None else tag
 
         log.info("Pulling tag '{}' for image '{}'...".format(tag, name))
-        image = client.images.pull(name, tag=tag)
+        image = pull_image(
+            client, name, tag=tag, progress=progress, timeout=timeout)
 
     log.debug("Found image '{}' for tag '{}'".format(image.id, name))
     return image
@@ -59,6 +101,251 @@ def _parse_image_tag(name_tag):
         return name_tag, None
 
 
+@attr.s
+class TeardownRecord:
+    """
+    The outcome of removing a single resource during a concurrent teardown.
+    """
+
+    model_name = attr.ib()
+    name = attr.ib()
+    duration = attr.ib()
+    error = attr.ib(default=None)
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+
+class TeardownError(Exception):
+    """
+    Exception indicating that some resources could not be removed during a
+    concurrent teardown.
+    """
+
+    def __init__(self, result):
+        super().__init__('\n'.join(
+            'Failed to remove {} \'{}\': {}'.format(
+                r.model_name, r.name, r.error) for r in result.failures))
+        self.result = result
+
+
+@attr.s
+class TeardownResult:
+    """
+    The outcome of a concurrent teardown, with a :class:`TeardownRecord` for
+    every resource that still existed at teardown time.
+    """
+
+    records = attr.ib(default=attr.Factory(list))
+
+    @property
+    def failures(self):
+        """
+        The records for resources that could not be removed.
+        """
+        return [r for r in self.records if r.failed]
+
+    def raise_for_failures(self):
+        """
+        Raise a :class:`TeardownError` if any resources could not be removed.
+        """
+        if self.failures:
+            raise TeardownError(self)
+
+
+def _record_removal(model_name, resource, remove):
+    error = None
+    start = time.monotonic()
+    try:
+        remove(resource)
+    except Exception as e:
+        log.error("Failed to remove {} '{}': {}".format(
+            model_name, resource.name, e))
+        error = e
+    return TeardownRecord(
+        model_name, resource.name, time.monotonic() - start, error)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to somebody else
+        return True
+    return True
+
+
+def _is_stale(labels, max_age=None, now=None):
+    """
+    Determine whether a resource with the given Seaworthy labels was left
+    behind by a session that is no longer running. Containers that are kept
+    alive between sessions are never stale.
+    """
+    if labels.get(SESSION_LABEL) == SESSION_ID:
+        return False
+    if KEEP_ALIVE_LABEL in labels:
+        return False
+
+    if max_age is not None:
+        now = time.time() if now is None else now
+        try:
+            created = float(labels.get(CREATED_LABEL, 0))
+        except ValueError:
+            # We don't know how old the resource is, so leave it alone
+            return False
+        if now - created > max_age:
+            return True
+
+    # We can only check whether the creating process is still alive if it was
+    # running on this machine.
+    if labels.get(HOST_LABEL) == socket.gethostname():
+        try:
+            pid = int(labels[PID_LABEL])
+        except (KeyError, ValueError):
+            return False
+        return not _pid_alive(pid)
+
+    return False
+
+
+def _sparse_container_names(containers):
+    # A sparse listing saves inspecting every container, but the sparse data
+    # has a list of "Names" rather than the "Name" that the model expects.
+    for container in containers:
+        container.attrs.setdefault('Name', container.attrs['Names'][0])
+    return containers
+
+
+def find_stale_resources(client, namespace=None, max_age=None):
+    """
+    Find resources created by Seaworthy sessions that are no longer running.
+
+    A resource is considered stale if it was created by another session and
+    either it is older than ``max_age`` or the process that created it on this
+    machine has exited.
+
+    :param client: The Docker client to use.
+    :param namespace:
+        Only find resources in this namespace. By default, resources in all
+        namespaces are found.
+    :param max_age:
+        The age in seconds after which resources from other sessions are
+        always considered stale, whether or not their sessions are still
+        running.
+
+    :returns:
+        A list of ``(model_name, resources)`` tuples for containers, networks,
+        and volumes, in the order that they should be removed.
+    """
+    if namespace is None:
+        label_filter = NAMESPACE_LABEL
+    else:
+        label_filter = '{}={}'.format(NAMESPACE_LABEL, namespace)
+    filters = {'label': label_filter}
+
+    containers = _sparse_container_names(
+        client.containers.list(all=True, sparse=True, filters=filters))
+    networks = client.networks.list(filters=filters)
+    volumes = client.volumes.list(filters=filters)
+
+    now = time.time()
+    return [
+        (model_name, [r for r in resources
+                      if _is_stale(r.attrs.get('Labels') or {}, max_age, now)])
+        for model_name, resources in [
+            ('container', containers),
+            ('network', networks),
+            ('volume', volumes),
+        ]
+    ]
+
+
+def reap(client, namespace=None, max_age=None, max_workers=8):
+    """
+    Remove resources left behind by Seaworthy sessions that are no longer
+    running, for example because the test process was killed before it could
+    tear down its resources. See :func:`find_stale_resources` for the
+    parameters that determine which resources are removed.
+
+    All the stale containers are removed concurrently, followed by all the
+    networks and then all the volumes. Kept-alive containers are disconnected
+    from the stale networks rather than removed.
+
+    :param max_workers:
+        The number of threads to use to remove resources concurrently.
+
+    :returns:
+        A :class:`TeardownResult` for the removed resources.
+    """
+    stale = find_stale_resources(client, namespace, max_age)
+    return _remove_resources(stale, max_workers)
+
+
+def find_kept_alive_containers(client, namespace=None):
+    """
+    Find containers that are kept alive between sessions.
+
+    :param client: The Docker client to use.
+    :param namespace:
+        Only find containers in this namespace. By default, containers in all
+        namespaces are found.
+
+    :returns: A list of container models.
+    """
+    labels = [KEEP_ALIVE_LABEL]
+    if namespace is not None:
+        labels.append('{}={}'.format(NAMESPACE_LABEL, namespace))
+    return _sparse_container_names(client.containers.list(
+        all=True, sparse=True, filters={'label': labels}))
+
+
+def invalidate(client, namespace=None, max_workers=8):
+    """
+    Remove containers that are kept alive between sessions, so that the next
+    session creates new ones. See :func:`find_kept_alive_containers` for the
+    parameters that determine which containers are removed.
+
+    :param max_workers:
+        The number of threads to use to remove containers concurrently.
+
+    :returns:
+        A :class:`TeardownResult` for the removed containers.
+    """
+    kept_alive = find_kept_alive_containers(client, namespace)
+    return _remove_resources([('container', kept_alive)], max_workers)
+
+
+def _remove_network(network):
+    # Kept-alive containers are only disconnected from the session's networks
+    # when it is torn down, so they are still connected if it was killed.
+    network.reload()
+    for container in network.containers:
+        if KEEP_ALIVE_LABEL in container.labels:
+            network.disconnect(container, force=True)
+    network.remove()
+
+
+def _remove_resources(resources_by_model, max_workers):
+    removers = {
+        'container': lambda c: c.remove(force=True, v=True),
+        'network': _remove_network,
+        'volume': lambda v: v.remove(),
+    }
+
+    result = TeardownResult()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for model_name, resources in resources_by_model:
+            futures = [
+                executor.submit(_record_removal, model_name, resource,
+                                removers[model_name])
+                for resource in resources]
+            result.records.extend(future.result() for future in futures)
+    return result
+
+
 def _parse_volume_short_form(short_form):
     parts = short_form.split(':', 1)
     bind = parts[0]
@@ -66,6 +353,22 @@ def _parse_volume_short_form(short_form):
     return {'bind': bind, 'mode': mode}
 
 
+def _model_names(obj):
+    """
+    Replace the Docker model objects in a (possibly nested) structure of
+    creation parameters with their names (or IDs, for models without names,
+    such as images), since the short IDs in their reprs are different for
+    every session that creates them.
+    """
+    if isinstance(obj, models.resource.Model):
+        return getattr(obj, 'name', obj.id)
+    if isinstance(obj, dict):
+        return {_model_names(k): _model_names(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_model_names(o) for o in obj)
+    return obj
+
+
 class _HelperBase:
     __collection_type__ = None
 
@@ -99,17 +402,46 @@ class _HelperBase:
 
         return model.id, model
 
+    def _labels(self, labels=None):
+        """
+        Add the labels that identify the creator of a resource to the given
+        labels, which may be a dict or a list of label names.
+        """
+        if labels is None:
+            labels = {}
+        elif not isinstance(labels, dict):
+            labels = {label: '' for label in labels}
+
+        merged = dict(labels)
+        merged.update({
+            NAMESPACE_LABEL: self.namespace,
+            SESSION_LABEL: SESSION_ID,
+            PID_LABEL: str(os.getpid()),
+            HOST_LABEL: socket.gethostname(),
+            CREATED_LABEL: '{:.6f}'.format(time.time()),
+        })
+        return merged
+
     def create(self, name, *args, **kwargs):
         """
         Create an instance of this resource type.
+
+        The resource is labelled with its namespace and details of the
+        session that created it, so that it can be found and cleaned up later
+        even if this session is unable to remove it.
         """
         resource_name = self._resource_name(name)
         log.info(
             "Creating {} '{}'...".format(self._model_name, resource_name))
-        resource = self.collection.create(*args, name=resource_name, **kwargs)
+        kwargs['labels'] = self._labels(kwargs.get('labels'))
+        resource = self._create_resource(resource_name, *args, **kwargs)
         self._ids.add(resource.id)
         return resource
 
+    def _create_resource(self, name, *args, **kwargs):
+        # Override in subclass for different creation behaviour
+        return self.collection.create(*args, name=name, **kwargs)
+
     def remove(self, resource, **kwargs):
         """
         Remove an instance of this resource type.
@@ -119,23 +451,52 @@ class _HelperBase:
         resource.remove(**kwargs)
         self._ids.remove(resource.id)
 
-    def _teardown(self):
-        for resource_id in self._ids.copy():
-            # Check if the resource exists before trying to remove it
-            try:
-                resource = self.collection.get(resource_id)
-            except docker.errors.NotFound:
-                continue
+    def _teardown(self, executor=None):
+        """
+        Remove all the resources we created that still exist.
 
+        :param executor:
+            If given, the resources are removed concurrently using this
+            executor and a list of :class:`TeardownRecord` is returned instead
+            of the first removal error being raised.
+        """
+        survivors = self._teardown_survivors()
+        if executor is None:
+            for resource in survivors:
+                self._teardown_remove(resource)
+            return []
+
+        futures = [executor.submit(self._teardown_record, resource)
+                   for resource in survivors]
+        return [future.result() for future in futures]
+
+    def _teardown_survivors(self):
+        ids = self._ids.copy()
+        if not ids:
+            return []
+
+        # Check which resources still exist with a single listing rather than
+        # fetching each one. The server-side filters match on prefixes or
+        # substrings, so we check for exact matches ourselves.
+        survivors = [r for r in self._list_by_ids(ids) if r.id in ids]
+        for resource in survivors:
             log.warning("{} '{}' still existed during teardown".format(
                 self._model_name.title(), resource.name))
+        return survivors
 
-            self._teardown_remove(resource)
+    def _list_by_ids(self, ids):
+        # Override in subclass if the collection is listed differently
+        return self.collection.list(filters={'id': list(ids)})
 
     def _teardown_remove(self, resource):
         # Override in subclass for different removal behaviour on teardown
         self.remove(resource)
 
+    def _teardown_record(self, resource, remove=None):
+        if remove is None:
+            remove = self._teardown_remove
+        return _record_removal(self._model_name, resource, remove)
+
 
 class ContainerHelper(_HelperBase):
     """
@@ -146,14 +507,24 @@ class ContainerHelper(_HelperBase):
     __collection_type__ = models.containers.ContainerCollection
 
     def __init__(self, client, namespace, image_helper, network_helper,
-                 volume_helper):
+                 volume_helper, events=None):
         super().__init__(client, namespace)
         self._image_helper = image_helper
         self._network_helper = network_helper
         self._volume_helper = volume_helper
+        self._events = events
+        self._kept_alive = set()
+
+    @property
+    def events(self):
+        """
+        The :class:`~seaworthy.events.EventHub` for the containers, or
+        ``None`` if Docker events aren't being watched.
+        """
+        return self._events
 
     def create(self, name, image, fetch_image=False, network=None, volumes={},
-               **kwargs):
+               fingerprint=None, **kwargs):
         """
         Create a new container.
 
@@ -183,6 +554,9 @@ class ContainerHelper(_HelperBase):
             - A "short-form" bind specifier (str), for example ``/mnt:rw``
         :param fetch_image:
             Whether to attempt to pull the image if it is not found locally.
+        :param fingerprint:
+            A fingerprint from :meth:`fingerprint` to label the container
+            with, so that it can be kept alive with :meth:`keep_alive`.
         :param kwargs:
             Other parameters to create the container with.
         """
@@ -196,22 +570,179 @@ class ContainerHelper(_HelperBase):
             network_id, network = (
                 self._network_helper._get_id_and_model(network))
             create_kwargs['network'] = network_id
+            create_kwargs['network_aliases'] = [name]
 
         if volumes:
             create_kwargs['volumes'] = self._volumes_for_container(volumes)
 
         create_kwargs.update(kwargs)
 
+        if fingerprint is not None:
+            labels = self._labels(create_kwargs.get('labels'))
+            labels[KEEP_ALIVE_LABEL] = ''
+            labels[FINGERPRINT_LABEL] = fingerprint
+            create_kwargs['labels'] = labels
+
         if fetch_image:
             self._image_helper.fetch(image)
 
-        container = super().create(name, image, **create_kwargs)
+        # Start watching events before the container exists so that we see
+        # everything that happens to it.
+        if self._events is not None:
+            self._events.start()
+
+        return super().create(name, image, **create_kwargs)
+
+    def _create_resource(self, name, image, command=None, network_aliases=None,
+                         **kwargs):
+        # This is what ContainerCollection.create() does, but only the
+        # low-level API lets us give the container its network aliases when
+        # it is created. Otherwise we'd have to disconnect the container from
+        # the network and connect it again with the aliases afterwards.
+        # Docker adds the container's short ID as an alias when it's started.
+        api = self.collection.client.api
+        if isinstance(image, models.images.Image):
+            image = image.id
+        kwargs.update({
+            'image': image,
+            'command': command,
+            'name': name,
+            'version': api.api_version,
+        })
+        network = kwargs.get('network')
+        create_kwargs = _create_container_args(kwargs)
+        if network is not None:
+            create_kwargs['networking_config'] = api.create_networking_config({
+                network: api.create_endpoint_config(aliases=network_aliases),
+            })
+
+        response = api.create_container(**create_kwargs)
+        return self.collection.get(response['Id'])
+
+    def fingerprint(self, image, fetch_image=False, **kwargs):
+        """
+        Get a fingerprint for a container created with the given parameters,
+        made from the image ID and the parameters that the container would be
+        created with. Containers with the same fingerprint are
+        interchangeable.
+
+        :param image: The image tag or image object.
+        :param fetch_image:
+            Whether to attempt to pull the image if it is not found locally.
+        :param kwargs:
+            The other parameters to create the container with. Docker model
+            objects, such as networks and volumes, are identified by their
+            names, which are the same in every session, rather than by their
+            IDs.
+
+        :returns: The fingerprint, a hex string.
+        :raises ValueError:
+            If the container would mount a volume created by this helper's
+            volume helper, which is removed when the helper is torn down, so
+            the container can't be kept alive.
+        """
+        self._check_kept_alive_volumes(kwargs.get('volumes') or {})
+        if isinstance(image, models.images.Image):
+            image_id = image.id
+        elif fetch_image:
+            image_id = self._image_helper.fetch(image).id
+        else:
+            image_id = self._image_helper.collection.get(image).id
+
+        digest = hashlib.sha256(image_id.encode('utf-8'))
+        digest.update(repr(_freeze(_model_names(kwargs))).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _check_kept_alive_volumes(self, volumes):
+        for vol in volumes:
+            try:
+                vol_id, _ = self._volume_helper._get_id_and_model(vol)
+            except docker.errors.NotFound:
+                # A bind mount
+                continue
+            if vol_id in self._volume_helper._ids:
+                raise ValueError(
+                    "Containers that mount the volume '{}' cannot be kept "
+                    "alive, since it is removed when the helper is torn "
+                    "down.".format(vol_id))
+
+    def get_kept_alive(self, name, fingerprint, network=None, **kwargs):
+        """
+        Get a running container with the given name and fingerprint that was
+        kept alive by this or an earlier session. A kept-alive container with
+        the name but a different fingerprint, or that is not running, is
+        removed.
+
+        The container is connected to the network that it would have been
+        created with (giving it an alias with the ``name`` parameter), if it
+        isn't connected already, and is kept alive again when this helper is
+        torn down.
+
+        :param name:
+            The name of the container. This will be prefixed with the
+            namespace.
+        :param fingerprint: The fingerprint from :meth:`fingerprint`.
+        :param network: The network the container would be created with.
+        :param kwargs:
+            The other parameters the container would be created with.
+
+        :returns: The container model, or ``None`` if there isn't one.
+        """
+        try:
+            container = self.collection.get(self._resource_name(name))
+        except docker.errors.NotFound:
+            return None
+
+        labels = container.labels
+        if KEEP_ALIVE_LABEL not in labels:
+            return None
+        if (labels.get(FINGERPRINT_LABEL) != fingerprint or
+                container.status != 'running'):
+            log.info("Removing outdated kept-alive container '{}'...".format(
+                container.name))
+            container.remove(force=True, v=True)
+            self._kept_alive.discard(container.id)
+            return None
 
+        log.info("Reusing kept-alive container '{}'".format(container.name))
+        network = self._network_for_container(network, kwargs)
         if network is not None:
-            self._connect_container_network(container, network, aliases=[name])
+            _, network = self._network_helper._get_id_and_model(network)
+            networks = container.attrs['NetworkSettings']['Networks']
+            if network.id not in [n['NetworkID'] for n in networks.values()]:
+                network.connect(container, aliases=[name])
+                container.reload()
 
+        self._kept_alive.add(container.id)
         return container
 
+    def keep_alive(self, container):
+        """
+        Keep a container that was created with a fingerprint alive after this
+        helper is torn down, so that later sessions can reuse it. The
+        container is only disconnected from the networks that this helper's
+        network helper created.
+
+        :param container: The container to keep alive.
+        """
+        self._ids.discard(container.id)
+        self._kept_alive.add(container.id)
+
+    def check_running(self, container):
+        """
+        Raise an error if a container has exited since it was created. This
+        is cheap enough to call while polling a container, since it doesn't
+        inspect the container but checks the events that the helper has seen.
+        If the helper isn't watching events, this does nothing.
+
+        :param container: The container to check.
+
+        :raises seaworthy.events.ContainerExitedError:
+            If the container has exited.
+        """
+        if self._events is not None and self._events.running:
+            self._events.check_running(container.id, container.name)
+
     def _network_for_container(self, network, create_kwargs):
         # If a network is specified use that
         if network is not None:
@@ -248,13 +779,10 @@ class ContainerHelper(_HelperBase):
         return create_volumes
 
     def _connect_container_network(self, container, network, **connect_kwargs):
-        # FIXME: Hack to make sure the container has the right network aliases.
-        # Only the low-level Docker client API allows us to specify endpoint
-        # aliases at container creation time:
-        # https://docker-py.readthedocs.io/en/stable/api.html#docker.api.container.ContainerApiMixin.create_container
-        # If we don't specify a network when the container is created then the
-        # default bridge network is attached which we don't want, so we
-        # reattach our custom network as that allows specifying aliases.
+        # Docker can't change the aliases of a connected container, so we
+        # have to disconnect the container from the network and connect it
+        # again with the new aliases. New containers are created with their
+        # aliases instead, so this is only needed to change them afterwards.
         network.disconnect(container)
         network.connect(container, **connect_kwargs)
         # Reload the container data to get the new network setup
@@ -280,8 +808,37 @@ class ContainerHelper(_HelperBase):
             True, unlike the Docker default (where the equivalent parameter,
             ``v``, defaults to False).
         """
+        if container.id in self._kept_alive:
+            # Track kept-alive containers again so that they can be removed
+            self._kept_alive.remove(container.id)
+            self._ids.add(container.id)
         super().remove(container, force=force, v=volumes)
 
+    def _teardown(self, executor=None):
+        self._detach_kept_alive()
+        return super()._teardown(executor)
+
+    def _detach_kept_alive(self):
+        # Kept-alive containers outlive our networks, which can't be removed
+        # while containers are still connected to them.
+        api = self.collection.client.api
+        network_ids = self._network_helper._ids
+        for container_id in self._kept_alive:
+            try:
+                container = self.collection.get(container_id)
+            except docker.errors.NotFound:
+                continue
+            networks = container.attrs['NetworkSettings']['Networks']
+            for network in networks.values():
+                if network['NetworkID'] in network_ids:
+                    api.disconnect_container_from_network(
+                        container.id, network['NetworkID'])
+        self._kept_alive.clear()
+
+    def _list_by_ids(self, ids):
+        return _sparse_container_names(self.collection.list(
+            all=True, sparse=True, filters={'id': list(ids)}))
+
     def _teardown_remove(self, container):
         self.remove(container, force=True)
 
@@ -292,14 +849,72 @@ class ImageHelper:
 
         Document this properly.
     """
-    def __init__(self, client):
+    def __init__(self, client, cache_ttl=60.0):
+        """
+        :param client: The Docker client to use.
+        :param cache_ttl:
+            The number of seconds to cache the image for a tag for after it
+            has been fetched. Set to 0 to disable caching.
+        """
         self.collection = client.images
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        # Events for the tags being fetched, so that concurrent fetches of
+        # the same tag wait for a single pull.
+        self._fetching = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, tag, progress=None, timeout=None):
+        """
+        Fetch this image if it isn't already present. See :func:`fetch_image`
+        for the ``progress`` and ``timeout`` parameters.
 
-    def fetch(self, tag):
+        Images are cached by tag, so fetching the same tag again within the
+        ``cache_ttl`` doesn't need to inspect the image. If another thread is
+        already fetching the tag, we wait for it instead of pulling the image
+        again.
         """
-        Fetch this image if it isn't already present.
+        while True:
+            with self._lock:
+                expiry, image = self._cache.get(tag, (0, None))
+                if expiry > time.monotonic():
+                    log.debug("Found image '{}' for tag '{}' (cached)".format(
+                        image.id, tag))
+                    return image
+                event = self._fetching.get(tag)
+                if event is None:
+                    event = self._fetching[tag] = threading.Event()
+                    break
+            # If the other fetch fails (or caching is disabled) we try again
+            # ourselves.
+            event.wait()
+
+        try:
+            image = fetch_image(
+                self.collection.client, tag, progress=progress,
+                timeout=timeout)
+            if self.cache_ttl > 0:
+                expiry = time.monotonic() + self.cache_ttl
+                with self._lock:
+                    self._cache[tag] = (expiry, image)
+        finally:
+            with self._lock:
+                del self._fetching[tag]
+            event.set()
+        return image
+
+    def invalidate(self, tag=None):
         """
-        return fetch_image(self.collection.client, tag)
+        Remove an image from the cache, so that it is inspected (and pulled
+        if necessary) the next time it is fetched.
+
+        :param tag: The tag to remove. By default, all tags are removed.
+        """
+        with self._lock:
+            if tag is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(tag, None)
 
 
 class NetworkHelper(_HelperBase):
@@ -313,15 +928,23 @@ class NetworkHelper(_HelperBase):
     def __init__(self, client, namespace):
         super().__init__(client, namespace)
         self._default_network = None
+        # Containers may be created concurrently, so make sure that only one
+        # default network is created.
+        self._default_lock = threading.Lock()
 
-    def _teardown(self):
+    def _teardown(self, executor=None):
+        records = []
         # Remove the default network
         if self._default_network is not None:
-            self.remove(self._default_network)
+            if executor is None:
+                self.remove(self._default_network)
+            else:
+                records.append(self._teardown_record(
+                    self._default_network, remove=self.remove))
             self._default_network = None
 
         # Remove all other networks
-        super()._teardown()
+        return records + super()._teardown(executor)
 
     def get_default(self, create=True):
         """
@@ -331,9 +954,10 @@ class NetworkHelper(_HelperBase):
         :param create:
             Whether or not to create the network if it doesn't already exist.
         """
-        if self._default_network is None and create:
-            log.debug("Creating default network...")
-            self._default_network = self.create('default', driver='bridge')
+        with self._default_lock:
+            if self._default_network is None and create:
+                log.debug("Creating default network...")
+                self._default_network = self.create('default', driver='bridge')
 
         return self._default_network
 
@@ -375,6 +999,10 @@ class VolumeHelper(_HelperBase):
         """
         return super().create(name, **kwargs)
 
+    def _list_by_ids(self, ids):
+        # Volumes are identified by their names and can't be filtered by ID.
+        return self.collection.list(filters={'name': list(ids)})
+
 
 class DockerHelper:
     """
@@ -383,17 +1011,36 @@ class DockerHelper:
         Document this properly.
     """
 
-    def __init__(self, namespace='test', client=None):
+    def __init__(self, namespace='test', client=None, teardown_workers=None,
+                 image_cache_ttl=60.0):
+        """
+        :param namespace:
+            The namespace that the names of all created resources are prefixed
+            with.
+        :param client:
+            The Docker client to use. Defaults to a client configured from the
+            environment.
+        :param teardown_workers:
+            The default for the ``max_workers`` parameter of
+            :meth:`teardown`.
+        :param image_cache_ttl:
+            The number of seconds that the image helper caches images for. See
+            :class:`ImageHelper`.
+        """
         self._namespace = namespace
         if client is None:
             client = docker.client.from_env()
         self._client = client
+        self._teardown_workers = teardown_workers
 
-        self.images = ImageHelper(self._client)
+        self.images = ImageHelper(self._client, cache_ttl=image_cache_ttl)
         self.networks = NetworkHelper(self._client, namespace)
         self.volumes = VolumeHelper(self._client, namespace)
+        self.events = EventHub(self._client, filters={
+            'label': '{}={}'.format(NAMESPACE_LABEL, namespace)})
         self.containers = ContainerHelper(
-            self._client, namespace, self.images, self.networks, self.volumes)
+            self._client, namespace, self.images, self.networks, self.volumes,
+            events=self.events)
 
     def _helper_for_model(self, model_type):
         """
@@ -411,14 +1058,55 @@ class DockerHelper:
 
         raise ValueError('Unknown model type {}'.format(model_type))
 
-    def teardown(self):
+    def reap(self, namespace=None, max_age=None, max_workers=8):
+        """
+        Remove resources left behind by Seaworthy sessions that are no longer
+        running. See :func:`reap`.
+
+        Note that by default this removes stale resources in *all* namespaces,
+        not just the namespace of this helper.
+        """
+        return reap(self._client, namespace=namespace, max_age=max_age,
+                    max_workers=max_workers)
+
+    def teardown(self, max_workers=None):
         """
         Clean up all resources when we're done with them.
+
+        By default, resources are removed one at a time and the first error
+        stops the teardown. If ``max_workers`` is given, resources of each type
+        are removed concurrently instead: first all the containers, then all
+        the networks, and finally all the volumes, so that no resource is
+        removed while another still depends on it. Errors are collected rather
+        than raised.
+
+        :param max_workers:
+            The number of threads to use to remove resources concurrently.
+            Defaults to the ``teardown_workers`` value the helper was created
+            with.
+
+        :returns:
+            A :class:`TeardownResult` with the timing and outcome of every
+            removal if the teardown was concurrent, otherwise ``None``.
         """
-        self.containers._teardown()
-        self.networks._teardown()
-        self.volumes._teardown()
+        if max_workers is None:
+            max_workers = self._teardown_workers
+
+        result = None
+        if max_workers is None:
+            self.containers._teardown()
+            self.networks._teardown()
+            self.volumes._teardown()
+        else:
+            result = TeardownResult()
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for helper in [self.containers, self.networks, self.volumes]:
+                    result.records.extend(helper._teardown(executor))
+
+        self.events.close()
 
         # We need to close the underlying APIClient explicitly to avoid
         # ResourceWarnings from unclosed HTTP connections.
         self._client.api.close()
+
+        return result
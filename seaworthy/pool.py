@@ -0,0 +1,208 @@
+"""
+A pool of started containers that container definitions can reuse instead of
+creating and starting a new container every time they are set up.
+"""
+
+import itertools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import attr
+
+import docker
+
+from seaworthy.utils import _freeze
+
+log = logging.getLogger(__name__)
+
+
+@attr.s
+class _PoolEntry:
+    key = attr.ib()
+    name = attr.ib()
+    container = attr.ib()
+    network = attr.ib()
+
+
+class ContainerPool:
+    """
+    A pool of started containers, keyed by image and creation parameters.
+
+    When a :class:`~seaworthy.definitions.ContainerDefinition` with a pool is
+    set up, it is given an idle container from the pool that was created from
+    the same image with the same parameters, if there is one. Otherwise a new
+    container is created, started, and waited for. When the definition is torn
+    down, its container is :meth:`~.ContainerDefinition.clean`-ed and returned
+    to the pool. The container is only removed if cleaning it fails (or if the
+    definition doesn't support cleaning) or if the pool is already full.
+
+    Pooled containers are created with the definition's helper and so are
+    removed when that helper is torn down. To reuse containers across test
+    modules with pytest, use a ``docker_helper`` fixture with a wider scope.
+
+    Idle containers are only given the definition's name as a network alias
+    while they are in use.
+    """
+
+    def __init__(self, size=1):
+        """
+        :param size:
+            The maximum number of idle containers to keep for each combination
+            of image and creation parameters.
+        """
+        self.size = size
+        self._lock = threading.Lock()
+        self._counter = itertools.count(1)
+        self._idle = {}
+        self._busy = {}
+
+    def _key(self, definition, run_kwargs):
+        kwargs = definition.merge_kwargs(definition._create_kwargs, run_kwargs)
+        return _freeze((definition._create_args, kwargs))
+
+    def acquire(self, definition, **run_kwargs):
+        """
+        Get a started container for a definition. Used by
+        :meth:`.ContainerDefinition.setup`.
+
+        :param definition: The container definition that needs a container.
+        :param run_kwargs: Keyword arguments to create the container with.
+
+        :returns: The container model.
+        """
+        fetch_image = run_kwargs.pop('fetch_image', True)
+        key = (definition.helper, self._key(definition, run_kwargs))
+
+        entry = self._pop_idle(key)
+        if entry is None:
+            entry = self._start(definition, key, run_kwargs, fetch_image)
+
+        self._set_alias(definition.helper, entry, definition.name)
+        with self._lock:
+            self._busy[entry.container.id] = entry
+        return entry.container
+
+    def release(self, definition):
+        """
+        Clean a definition's container and return it to the pool. Used by
+        :meth:`.ContainerDefinition.teardown`.
+
+        :param definition: The container definition that is done with its
+            container.
+        """
+        container = definition.inner()
+        with self._lock:
+            entry = self._busy.pop(container.id)
+
+        try:
+            definition.clean()
+        except Exception as e:
+            log.info("Removing container '{}' that could not be cleaned: "
+                     "{!r}".format(container.name, e))
+            definition.helper.remove(container)
+            return
+
+        self._set_alias(definition.helper, entry, entry.name)
+        with self._lock:
+            idle = self._idle.setdefault(entry.key, [])
+            if len(idle) < self.size:
+                idle.append(entry)
+                return
+        definition.helper.remove(container)
+
+    def prewarm(self, definition, **run_kwargs):
+        """
+        Start containers for a definition concurrently until the pool holds
+        ``size`` idle containers for it. The definition must have a helper.
+
+        :param definition: The container definition to start containers for.
+        :param run_kwargs: Keyword arguments to create the containers with.
+        """
+        fetch_image = run_kwargs.pop('fetch_image', True)
+        key = (definition.helper, self._key(definition, run_kwargs))
+        with self._lock:
+            missing = self.size - len(self._idle.get(key, []))
+        if missing <= 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=missing) as executor:
+            futures = [
+                executor.submit(
+                    self._start, definition, key, run_kwargs, fetch_image)
+                for _ in range(missing)]
+            entries = [future.result() for future in futures]
+
+        with self._lock:
+            self._idle.setdefault(key, []).extend(entries)
+
+    def _pop_idle(self, key):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    return None
+                entry = idle.pop()
+
+            # The container may have been removed (e.g. by the helper's
+            # teardown) or may have stopped since it was returned to the pool.
+            try:
+                entry.container.reload()
+            except docker.errors.NotFound:
+                continue
+            if entry.container.status == 'running':
+                return entry
+            helper, _ = key
+            log.info("Removing idle container '{}' that is no longer "
+                     "running".format(entry.container.name))
+            try:
+                helper.remove(entry.container)
+            except docker.errors.NotFound:
+                pass
+
+    def _start(self, definition, key, run_kwargs, fetch_image):
+        helper = definition.helper
+        name = '{}_pool{}'.format(definition.name, next(self._counter))
+        kwargs = definition.merge_kwargs(definition._create_kwargs, run_kwargs)
+
+        network = helper._network_for_container(kwargs.get('network'), kwargs)
+        if network is not None:
+            _, network = helper._network_helper._get_id_and_model(network)
+
+        container = helper.create(
+            name, *definition._create_args, fetch_image=fetch_image, **kwargs)
+        container.start()
+        container.reload()
+
+        # Wait for the new container using a copy of the definition, since the
+        # definition itself may be in use or busy with another container.
+        waiter = definition._waiter_copy(container)
+        try:
+            waiter.wait_for_start()
+        except Exception:
+            helper.remove(container)
+            raise
+        finally:
+            waiter._close_clients()
+
+        return _PoolEntry(key, name, container, network)
+
+    def _set_alias(self, helper, entry, alias):
+        if entry.network is None:
+            return
+        helper._connect_container_network(
+            entry.container, entry.network, aliases=[alias])
+
+    def clear(self):
+        """
+        Remove all the idle containers in the pool.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for (helper, _), entries in idle.items():
+            for entry in entries:
+                try:
+                    helper.remove(entry.container)
+                except docker.errors.NotFound:
+                    pass
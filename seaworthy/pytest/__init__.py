@@ -7,5 +7,9 @@ pieces to make Seaworthy work better with pytest.
 """
 from .checks import dockertest
 from .fixtures import docker_helper
+# The plugin hooks must be importable from the module that is registered as
+# the pytest plugin.
+from .plugin import (  # noqa: F401
+    pytest_addoption, pytest_collection_finish, pytest_configure)
 
 __all__ = ['docker_helper', 'dockertest']
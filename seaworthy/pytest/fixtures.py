@@ -8,6 +8,7 @@ import pytest
 
 from seaworthy.definitions import ContainerDefinition, _DefinitionBase
 from seaworthy.helpers import DockerHelper
+from seaworthy.pytest.scheduler import registry
 
 
 def docker_helper_fixture(name='docker_helper', scope='module', **kwargs):
@@ -45,13 +46,16 @@ def image_fetch_fixture(image, name, scope='module'):
     """
     Create a fixture to fetch an image.
     """
+    registry.register_image(name, image)
+
     @pytest.fixture(name=name, scope=scope)
     def fixture(docker_helper):
         return docker_helper.images.fetch(image)
     return fixture
 
 
-def resource_fixture(definition, name, scope='function', dependencies=()):
+def resource_fixture(definition, name, scope='function', dependencies=(),
+                     keep_alive=False):
     """
     Create a fixture for a resource.
 
@@ -74,23 +78,40 @@ def resource_fixture(definition, name, scope='function', dependencies=()):
     :param dependencies:
         A sequence of names of other pytest fixtures that this fixture depends
         on. These fixtures will be requested from pytest and so will be setup,
-        but nothing is done with the actual fixture values.
+        but nothing is done with the actual fixture values. When the
+        ``--seaworthy-startup-workers`` option is greater than 1, the resource
+        fixtures among these (and their own dependencies) are set up
+        concurrently.
+    :param keep_alive:
+        Whether to keep the container alive between test sessions. Only
+        supported for container definitions. See
+        :meth:`.ContainerDefinition.setup`.
 
     :returns: The fixture function.
     """
+    if keep_alive and not isinstance(definition, ContainerDefinition):
+        raise ValueError(
+            'keep_alive is only supported for container definitions')
+    setup_kwargs = {'keep_alive': True} if keep_alive else {}
+    registry.register(name, definition, dependencies, setup_kwargs)
+
     @pytest.fixture(name=name, scope=scope)
     def fixture(request, docker_helper):
+        scheduler = getattr(request.config, '_seaworthy_scheduler', None)
+        if scheduler is not None:
+            scheduler.start(request, docker_helper, dependencies)
         for dependency in dependencies:
             request.getfixturevalue(dependency)
 
-        definition.setup(helper=docker_helper)
+        definition.setup(helper=docker_helper, **setup_kwargs)
         yield definition
         definition.teardown()
 
     return fixture
 
 
-def _definition_fixture(self, name, scope='function', dependencies=()):
+def _definition_fixture(self, name, scope='function', dependencies=(),
+                        keep_alive=False):
     """
     Create a pytest fixture for the resource. See :func:`.resource_fixture`.
 
@@ -106,8 +127,11 @@ def _definition_fixture(self, name, scope='function', dependencies=()):
         A sequence of names of other pytest fixtures that this fixture
         depends on. These fixtures will be requested from pytest and so
         will be setup, but nothing is done with the actual fixture values.
+    :param keep_alive:
+        Whether to keep the container alive between test sessions. Only
+        supported for container definitions.
     """
-    return resource_fixture(self, name, scope, dependencies)
+    return resource_fixture(self, name, scope, dependencies, keep_alive)
 
 
 _DefinitionBase.pytest_fixture = _definition_fixture
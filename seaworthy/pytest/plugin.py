@@ -0,0 +1,46 @@
+"""
+pytest hooks for the Seaworthy plugin.
+"""
+
+from seaworthy.checks import docker_available, docker_client
+from seaworthy.pytest.prefetch import find_images, prefetch_images
+from seaworthy.pytest.scheduler import StartupScheduler
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('seaworthy')
+    group.addoption(
+        '--seaworthy-startup-workers', type=int, default=1, metavar='N',
+        help=('The number of resource fixture dependencies to set up '
+              'concurrently (default: 1, one at a time).'))
+    group.addoption(
+        '--seaworthy-prefetch-workers', type=int, default=0, metavar='N',
+        help=('Fetch the images used by the collected tests before running '
+              'them, N at a time (default: 0, images are fetched when '
+              'containers are created).'))
+
+
+def pytest_configure(config):
+    workers = config.getoption('seaworthy_startup_workers')
+    if workers > 1:
+        config._seaworthy_scheduler = StartupScheduler(workers)
+
+
+def pytest_collection_finish(session):
+    workers = session.config.getoption('seaworthy_prefetch_workers')
+    if workers < 1:
+        return
+
+    images = find_images(session.items)
+    if not images or not docker_available():
+        return
+
+    reporter = session.config.pluginmanager.get_plugin('terminalreporter')
+
+    def report(message):
+        if reporter is not None:
+            reporter.write_line('seaworthy: {}'.format(message))
+
+    report('Fetching {} image(s)...'.format(len(images)))
+    with docker_client() as client:
+        prefetch_images(client, images, max_workers=workers, report=report)
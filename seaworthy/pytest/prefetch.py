@@ -0,0 +1,126 @@
+"""
+Fetching the images that collected tests need at the start of a test session,
+rather than one at a time as containers are created.
+"""
+
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from seaworthy.definitions import ContainerDefinition
+from seaworthy.helpers import fetch_image
+from seaworthy.pytest.scheduler import registry as default_registry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+
+def find_images(items, registry=default_registry):
+    """
+    Find the images used by the resource fixtures and image fetch fixtures
+    that collected test items need, including the resource fixtures that
+    those fixtures depend on.
+
+    :param items: The collected pytest items.
+    :param registry: The registry to find the fixtures in.
+
+    :returns: A list of image tags, without duplicates.
+    """
+    images = []
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        images.extend(registry.lookup_images(name))
+        for resource in registry.lookup_all(name):
+            definition = resource.definition
+            if isinstance(definition, ContainerDefinition):
+                images.append(definition._create_args[0])
+            for dependency in resource.dependencies:
+                visit(dependency)
+
+    for item in items:
+        for name in getattr(item, 'fixturenames', ()):
+            visit(name)
+
+    # Only tags can be fetched, not image models.
+    tags = [image for image in images if isinstance(image, str)]
+    return sorted(set(tags), key=tags.index)
+
+
+@contextlib.contextmanager
+def image_lock(image, lock_dir=None):
+    """
+    A context manager that holds a file lock for an image, so that only one
+    process (for example, one pytest-xdist worker) fetches it at a time. The
+    others wait and then find the image already present. Locking is skipped
+    on platforms without :mod:`fcntl`.
+
+    :param image: The image tag.
+    :param lock_dir:
+        The directory for the lock file. Defaults to the system temporary
+        directory.
+    """
+    if fcntl is None:  # pragma: no cover
+        yield
+        return
+
+    if lock_dir is None:
+        lock_dir = tempfile.gettempdir()
+    digest = hashlib.sha256(image.encode('utf-8')).hexdigest()[:16]
+    path = os.path.join(lock_dir, 'seaworthy-image-{}.lock'.format(digest))
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _fetch(client, image, lock_dir):
+    start = time.monotonic()
+    with image_lock(image, lock_dir):
+        fetch_image(client, image)
+    return time.monotonic() - start
+
+
+def prefetch_images(client, images, max_workers=4, report=None,
+                    lock_dir=None):
+    """
+    Fetch images concurrently if they aren't already present. Errors are
+    reported rather than raised, so that only the tests that need an image
+    that couldn't be fetched fail.
+
+    :param client: The Docker client to use.
+    :param images: The image tags to fetch.
+    :param max_workers: The number of images to fetch at the same time.
+    :param report: A function to call with a progress message for each image.
+    :param lock_dir: The directory for the lock files. See :func:`image_lock`.
+
+    :returns: A dict of the images that couldn't be fetched to the errors.
+    """
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_fetch, client, image, lock_dir): image
+                   for image in images}
+        for count, future in enumerate(as_completed(futures), 1):
+            image = futures[future]
+            try:
+                duration = future.result()
+            except Exception as e:
+                errors[image] = e
+                message = "Failed to fetch image '{}' ({}/{}): {}".format(
+                    image, count, len(images), e)
+            else:
+                message = "Fetched image '{}' ({}/{}, {:.2f}s)".format(
+                    image, count, len(images), duration)
+            if report is not None:
+                report(message)
+    return errors
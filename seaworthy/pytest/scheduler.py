@@ -0,0 +1,195 @@
+"""
+Concurrent startup of the resources that resource fixtures depend on.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import attr
+
+
+@attr.s
+class _Resource:
+    name = attr.ib()
+    definition = attr.ib()
+    dependencies = attr.ib()
+    setup_kwargs = attr.ib()
+
+
+class ResourceRegistry:
+    """
+    A record of the resource definitions behind resource fixtures and the
+    images behind image fetch fixtures, keyed by fixture name.
+    """
+
+    def __init__(self):
+        self._resources = {}
+        self._images = {}
+
+    def register(self, name, definition, dependencies=(), setup_kwargs=None):
+        """
+        Record the definition for a resource fixture.
+
+        :param name: The fixture name.
+        :param definition: The resource definition.
+        :param dependencies:
+            The names of the other fixtures that the fixture depends on.
+        :param setup_kwargs:
+            Keyword arguments that the fixture passes to the definition's
+            ``setup`` method.
+        """
+        resource = _Resource(
+            name, definition, tuple(dependencies), dict(setup_kwargs or {}))
+        self._resources.setdefault(name, []).append(resource)
+
+    def lookup(self, name):
+        """
+        Get the resource for a fixture name, or ``None`` if the fixture isn't
+        a resource fixture. If several resource fixtures have the same name,
+        we can't tell which of them pytest will use, so ``None`` is returned
+        for those too.
+        """
+        resources = self.lookup_all(name)
+        if len(resources) == 1:
+            return resources[0]
+        return None
+
+    def lookup_all(self, name):
+        """
+        Get all the resources registered for a fixture name.
+        """
+        return list(self._resources.get(name, []))
+
+    def register_image(self, name, image):
+        """
+        Record the image for an image fetch fixture.
+
+        :param name: The fixture name.
+        :param image: The image tag.
+        """
+        self._images.setdefault(name, []).append(image)
+
+    def lookup_images(self, name):
+        """
+        Get all the images registered for a fixture name.
+        """
+        return list(self._images.get(name, []))
+
+    def get_definitions(self):
+        """
+        Get all the registered resource definitions.
+        """
+        return [resource.definition
+                for resources in self._resources.values()
+                for resource in resources]
+
+
+#: The registry that :func:`~seaworthy.pytest.fixtures.resource_fixture`
+#: records its fixtures in.
+registry = ResourceRegistry()
+
+
+class StartupScheduler:
+    """
+    Sets up the resources that a resource fixture depends on concurrently,
+    following the graph of their declared dependencies. Each resource is set
+    up as soon as all the resources it depends on are ready, so independent
+    containers start (and wait to start) at the same time.
+
+    Dependencies that aren't resource fixtures are requested from pytest
+    first, on the main thread. Once the resources are set up, their fixtures
+    find them already created and only have to register their teardown.
+    """
+
+    def __init__(self, max_workers, registry=registry):
+        """
+        :param max_workers:
+            The maximum number of resources to set up at the same time.
+        :param registry: The :class:`ResourceRegistry` to find resources in.
+        """
+        self.max_workers = max_workers
+        self._registry = registry
+
+    def plan(self, dependencies):
+        """
+        Find all the resources that the given fixtures need, directly or
+        indirectly.
+
+        :param dependencies: The names of the fixtures.
+
+        :returns:
+            A tuple of a list of the resources, in an order in which they can
+            be set up one at a time, and a list of the names of the other
+            fixtures that they need.
+        """
+        resources, others = [], []
+        seen = set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            resource = self._registry.lookup(name)
+            if resource is None:
+                others.append(name)
+                return
+            for dependency in resource.dependencies:
+                visit(dependency)
+            resources.append(resource)
+
+        for name in dependencies:
+            visit(name)
+        return resources, others
+
+    def start(self, request, helper, dependencies):
+        """
+        Set up the resources that the given fixtures need.
+
+        :param request: The pytest request of the fixture being set up.
+        :param helper: The helper to set up the resources with.
+        :param dependencies: The names of the fixture's dependencies.
+        """
+        resources, others = self.plan(dependencies)
+        for name in others:
+            request.getfixturevalue(name)
+        self._start_resources(helper, resources)
+
+    def _start_resources(self, helper, resources):
+        names = {resource.name for resource in resources}
+        done = {r.name for r in resources if r.definition.created}
+        pending = [r for r in resources if r.name not in done]
+        running = {}
+        started = []
+        error = None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                if error is None:
+                    for resource in list(pending):
+                        deps = names.intersection(resource.dependencies)
+                        if deps.issubset(done):
+                            pending.remove(resource)
+                            future = executor.submit(
+                                resource.definition.setup, helper=helper,
+                                **resource.setup_kwargs)
+                            running[future] = resource
+                # Anything still pending after this is part of a dependency
+                # cycle, which pytest will report when the fixtures are set up.
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    resource = running.pop(future)
+                    if future.exception() is not None:
+                        if error is None:
+                            error = future.exception()
+                        continue
+                    started.append(resource)
+                    done.add(resource.name)
+
+        if error is not None:
+            # The fixtures for the resources we started won't be set up, so
+            # they won't be torn down either.
+            for resource in reversed(started):
+                resource.definition.teardown()
+            raise error
@@ -1,7 +1,171 @@
+import heapq
+import itertools
+import logging
+import os
+import socket
+import struct
 import threading
+import time
 
+from requests.packages.urllib3.exceptions import ReadTimeoutError
 
-def stream_timeout(stream, timeout, timeout_msg=None):
+log = logging.getLogger(__name__)
+
+
+class _DeadlineScheduler:
+    """
+    A single background thread that calls callbacks when their deadlines are
+    reached, so that we don't need a thread per timeout.
+
+    Deadlines are kept in a heap. Cancelling a deadline just marks its entry,
+    which is dropped when it reaches the top of the heap or when cancelled
+    entries make up most of the heap. Callbacks are called in the scheduler's
+    thread, so they must be quick.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._cancelled = 0
+        self._counter = itertools.count()
+        self._thread = None
+        self._pid = None
+
+    def schedule(self, delay, callback):
+        """
+        Call ``callback`` after ``delay`` seconds.
+
+        :returns: An entry that can be passed to :meth:`cancel`.
+        """
+        entry = [time.monotonic() + delay, next(self._counter), callback]
+        with self._cond:
+            self._ensure_thread()
+            heapq.heappush(self._heap, entry)
+            # Only wake the thread if its next deadline has changed
+            if self._heap[0] is entry:
+                self._cond.notify()
+        return entry
+
+    def cancel(self, entry):
+        """
+        Cancel a deadline, if its callback hasn't been called yet.
+        """
+        with self._cond:
+            if entry[2] is None:
+                return
+            entry[2] = None
+            self._cancelled += 1
+            if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap) - self._cancelled
+
+    def _ensure_thread(self):
+        # Threads don't survive forking, so a forked process needs its own
+        if self._thread is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _pop_due(self):
+        with self._cond:
+            while True:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                time_left = self._heap[0][0] - time.monotonic()
+                if time_left > 0:
+                    self._cond.wait(time_left)
+                    continue
+                entry = heapq.heappop(self._heap)
+                callback, entry[2] = entry[2], None
+                return callback
+
+    def _run(self):
+        while True:
+            callback = self._pop_due()
+            try:
+                callback()
+            except Exception:
+                log.exception('Error in timeout callback')
+
+
+_scheduler = _DeadlineScheduler()
+
+#: How often to check whether a stream's stop event has been set, in seconds.
+STOP_POLL_INTERVAL = 0.05
+
+
+def _call_when_stopped(stop, callback, done):
+    """
+    Call ``callback`` soon after ``stop`` is set, unless ``done()`` returns
+    ``True`` first. The event is checked periodically in the scheduler's
+    thread, rather than waited for in a thread of its own.
+    """
+    def check():
+        if done():
+            return
+        if stop.is_set():
+            callback()
+        else:
+            _scheduler.schedule(STOP_POLL_INTERVAL, check)
+
+    _scheduler.schedule(STOP_POLL_INTERVAL, check)
+
+
+class _StreamCloser:
+    """
+    Close a stream when it times out, and close its response when we're done
+    with it. The lock makes sure that these never happen at the same time,
+    that the stream isn't closed for a timeout after we're done with it, and
+    that the response is only closed once.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._done = False
+        self.timed_out = False
+
+    @property
+    def done(self):
+        return self._done
+
+    def timeout(self):
+        with self._lock:
+            if self._done or self.timed_out:
+                return
+            self.timed_out = True
+            self._stream.close()
+
+    def stop(self):
+        with self._lock:
+            if self._done or self.timed_out:
+                return
+            self._stream.close()
+
+    def close(self):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+            # Close the stream's underlying response object (if it has one)
+            # to avoid potential socket leaks.
+            # This method seems to have more success at preventing
+            # ResourceWarnings than just stream.close() (should this be
+            # improved upstream?)
+            if hasattr(self._stream, '_response'):
+                self._stream._response.close()
+
+
+def stream_timeout(stream, timeout, timeout_msg=None, stop=None):
     """
     Iterate over items in a streaming response from the Docker client within
     a timeout.
@@ -9,33 +173,132 @@ def stream_timeout(stream, timeout, timeout_msg=None):
     :param ~docker.types.daemon.CancellableStream stream:
         Stream from the Docker client to consume items from.
     :param timeout:
-        Timeout value in seconds.
+        Timeout value in seconds, or ``None`` for no timeout.
     :param timeout_msg:
         Message to raise in the exception when a timeout occurs.
+    :param threading.Event stop:
+        An event that can be set to close the stream and stop iterating early.
     """
-    timed_out = threading.Event()
-
-    def timeout_func():
-        timed_out.set()
-        stream.close()
-
-    timer = threading.Timer(timeout, timeout_func)
+    closer = _StreamCloser(stream)
+    entry = None
+    if timeout is not None:
+        entry = _scheduler.schedule(timeout, closer.timeout)
+    if stop is not None:
+        _call_when_stopped(stop, closer.stop, lambda: closer.done)
     try:
-        timer.start()
         for item in stream:
             yield item
 
         # A timeout looks the same as the loop ending. So we need to check a
         # flag to determine whether a timeout occurred or not.
-        if timed_out.is_set():
+        if closer.timed_out:
             raise TimeoutError(timeout_msg)
     finally:
-        timer.cancel()
-        # Close the stream's underlying response object (if it has one) to
-        # avoid potential socket leaks.
-        # This method seems to have more success at preventing ResourceWarnings
-        # than just stream.close() (should this be improved upstream?)
-        # FIXME: Potential race condition if Timer thread closes the stream at
-        # the same time we do here, but hopefully not with serious side effects
-        if hasattr(stream, '_response'):
-            stream._response.close()
+        if entry is not None:
+            _scheduler.cancel(entry)
+        closer.close()
+
+
+def _response_socket(response):
+    """
+    Find the socket under a streaming response from the Docker client, in the
+    same way as ``APIClient._get_raw_response_socket()``. Returns ``None`` if
+    the socket can't be reached, for example for SSH connections.
+    """
+    try:
+        sock = response.raw._fp.fp.raw
+    except AttributeError:
+        return None
+    sock = getattr(sock, '_sock', sock)
+    if not hasattr(sock, 'settimeout'):
+        return None
+    return sock
+
+
+def _read_frames(response, sock, timeout, timeout_msg, demux, stop):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    lock = threading.Lock()
+    closed = False
+
+    def shutdown():
+        # This wakes up a blocked read, which then sees the end of the stream.
+        # We can't use short read timeouts to check the stop event instead,
+        # since urllib3 closes the connection when a read times out.
+        with lock:
+            if closed:
+                return
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    if stop is not None:
+        _call_when_stopped(stop, shutdown, lambda: closed)
+
+    def read(n):
+        if deadline is None:
+            sock.settimeout(None)
+            return response.raw.read(n)
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError(timeout_msg)
+        sock.settimeout(time_left)
+        return response.raw.read(n)
+
+    try:
+        # This is what APIClient._multiplexed_response_stream_helper() does
+        while stop is None or not stop.is_set():
+            header = read(8)
+            if not header:
+                break
+            stream_type, length = struct.unpack('>BxxxL', header)
+            if not length:
+                continue
+            data = read(length)
+            if not data:
+                break
+            yield (stream_type, data) if demux else data
+    except (socket.timeout, ReadTimeoutError):
+        raise TimeoutError(timeout_msg)
+    finally:
+        with lock:
+            closed = True
+            response.close()
+
+
+def multiplexed_stream_timeout(stream, timeout, timeout_msg=None, demux=False,
+                               stop=None):
+    """
+    Iterate over the frames of a multiplexed (non-TTY) log stream from the
+    Docker client within a timeout.
+
+    Rather than closing the stream from another thread when the timeout is
+    reached, as :func:`stream_timeout` does, we read the frames from the
+    stream's response ourselves with a timeout on the socket for whatever is
+    left of the timeout. If the socket can't be reached, we fall back to
+    :func:`stream_timeout`.
+
+    :param ~docker.types.daemon.CancellableStream stream:
+        Stream from the Docker client to consume frames from. The stream
+        itself is not iterated over if we can read from its socket.
+    :param timeout:
+        Timeout value in seconds, or ``None`` for no timeout.
+    :param timeout_msg:
+        Message to raise in the exception when a timeout occurs.
+    :param demux:
+        If ``True``, iterate over ``(stream_type, data)`` tuples instead,
+        where ``stream_type`` is 1 for stdout and 2 for stderr, as in the
+        frame headers. The stream type isn't known if we fall back to
+        :func:`stream_timeout`, in which case it is ``None``.
+    :param threading.Event stop:
+        An event that can be set to stop iterating early. The stream's socket
+        is shut down soon after it is set, so that a blocked read returns.
+    """
+    response = getattr(stream, '_response', None)
+    sock = None if response is None else _response_socket(response)
+    if sock is None:
+        frames = stream_timeout(stream, timeout, timeout_msg, stop=stop)
+        if demux:
+            return ((None, data) for data in frames)
+        return frames
+    return _read_frames(response, sock, timeout, timeout_msg, demux, stop)
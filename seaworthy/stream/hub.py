@@ -0,0 +1,180 @@
+"""
+A shared, buffered stream of a container's logs.
+"""
+
+import collections
+import itertools
+import logging
+import threading
+import time
+
+from seaworthy.stream.logs import _stream_lines
+from seaworthy.utils import _call_when_set
+
+log = logging.getLogger(__name__)
+
+
+class LogHubOverflowError(Exception):
+    """
+    Raised when a subscriber is so far behind that log lines it hasn't read
+    yet have been dropped from the hub's ring buffer.
+    """
+
+
+class LogHub:
+    """
+    A single stream of a container's logs that is followed in a background
+    thread, with the most recent log lines kept in a ring buffer so that any
+    number of subscribers can read them without each opening its own stream
+    and replaying the container's whole log history.
+
+    Each log line has a sequence number, starting at 0 for the first line of
+    the container's logs. A cursor is the sequence number of the next line to
+    read.
+    """
+
+    def __init__(self, container, max_lines=10000):
+        """
+        :param ~docker.models.containers.Container container:
+            Container whose logs to follow.
+        :param max_lines:
+            The maximum number of log lines to keep. Older lines are dropped
+            and can't be read from the hub.
+        """
+        self._container = container
+        self._cond = threading.Condition()
+        self._lines = collections.deque(maxlen=max_lines)
+        self._first = 0
+        self._stream = None
+        self._finished = False
+
+    def start(self):
+        """
+        Start following the container's logs, if that hasn't happened
+        already.
+        """
+        with self._cond:
+            if self._stream is not None or self._finished:
+                return
+            self._stream = self._container.logs(stream=True, tail='all')
+            thread = threading.Thread(
+                target=self._run, args=(self._stream,), daemon=True)
+            thread.start()
+
+    def close(self):
+        """
+        Stop following the container's logs. Subscribers read the lines that
+        are left and then stop.
+        """
+        with self._cond:
+            stream, self._stream = self._stream, None
+            self._finished = True
+            self._cond.notify_all()
+        if stream is not None:
+            stream.close()
+
+    @property
+    def finished(self):
+        """
+        Whether the hub has stopped following the logs, either because it was
+        closed or because the container stopped.
+        """
+        return self._finished
+
+    @property
+    def first(self):
+        """
+        The sequence number of the oldest log line that is still kept.
+        """
+        return self._first
+
+    @property
+    def cursor(self):
+        """
+        A cursor for reading the log lines that come after the ones that have
+        been read so far.
+        """
+        with self._cond:
+            return self._first + len(self._lines)
+
+    def _run(self, stream):
+        try:
+            # stdout and stderr are framed into lines separately, so that
+            # partial lines written to both at once aren't mixed up.
+            for line in _stream_lines(self._container, stream, None):
+                with self._cond:
+                    if len(self._lines) == self._lines.maxlen:
+                        self._first += 1
+                    self._lines.append(line)
+                    self._cond.notify_all()
+        except Exception as e:
+            # The stream raises errors when it's closed while we're reading
+            if stream is self._stream:
+                log.warning('Container log stream failed: {!r}'.format(e))
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def subscribe(self, cursor=0, timeout=None, timeout_msg=None, stop=None):
+        """
+        Iterate over the log lines from a cursor onwards, as the hub receives
+        them. Iteration stops when the hub has finished and all its lines have
+        been read.
+
+        :param cursor:
+            The cursor to start reading from. Defaults to the first line of
+            the container's logs.
+        :param timeout:
+            Timeout value in seconds. By default, there is no timeout.
+        :param timeout_msg:
+            Message to raise in the exception when a timeout occurs.
+        :param threading.Event stop:
+            An event that can be set to stop iterating early.
+
+        :raises TimeoutError:
+            When the timeout value is reached before the hub has finished.
+        :raises LogHubOverflowError:
+            When lines from the cursor onwards have been dropped before they
+            were read, either before subscribing or because the subscriber
+            fell behind.
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        if stop is not None:
+            _call_when_set(stop, self._wake, timeout)
+        while True:
+            with self._cond:
+                while (cursor >= self._first + len(self._lines) and
+                        not self._finished):
+                    if stop is not None and stop.is_set():
+                        return
+                    if timeout is None:
+                        self._cond.wait()
+                        continue
+                    time_left = deadline - time.monotonic()
+                    if time_left <= 0:
+                        raise TimeoutError(timeout_msg)
+                    self._cond.wait(time_left)
+                if cursor < self._first:
+                    raise LogHubOverflowError(
+                        '{} log line(s) were dropped before they were '
+                        'read.'.format(self._first - cursor))
+                lines = list(itertools.islice(
+                    self._lines, cursor - self._first, None))
+                finished = self._finished
+
+            if not lines and finished:
+                return
+            if stop is not None and stop.is_set():
+                return
+            for line in lines:
+                cursor += 1
+                yield line
+            if (timeout is not None and not finished and
+                    time.monotonic() >= deadline):
+                raise TimeoutError(timeout_msg)
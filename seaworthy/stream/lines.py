@@ -0,0 +1,128 @@
+"""
+Framing of streamed log chunks into lines.
+
+The chunks we get from Docker don't have to be whole lines. A long line can
+be split over several chunks, and a chunk can hold several lines.
+"""
+
+from collections import OrderedDict
+
+# The stream types in the headers of Docker's multiplexed streams
+STDOUT = 1
+STDERR = 2
+
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+class LineFramer:
+    """
+    Buffer chunks of a stream of bytes, and split them into lines that end in
+    ``\\n``.
+
+    A chunk that holds whole lines, which is the common case, is split
+    without copying it into the buffer. Only a partial line at the end of a
+    chunk is buffered until the rest of it arrives.
+    """
+
+    def __init__(self, max_line_length=MAX_LINE_LENGTH):
+        """
+        :param max_line_length:
+            The maximum length of a line, including its newline. Longer lines
+            are split into pieces of this length, so that a stream without
+            newlines can't fill up the buffer.
+        """
+        self._buffer = bytearray()
+        self._max_line_length = max_line_length
+
+    def feed(self, chunk):
+        """
+        Add a chunk of the stream.
+
+        :returns:
+            A list of the lines that were completed by the chunk, including
+            their newlines.
+        """
+        lines = []
+        start = 0
+        if self._buffer:
+            end = chunk.find(b'\n') + 1
+            if end == 0:
+                end = len(chunk)
+            self._buffer += memoryview(chunk)[:end]
+            if self._buffer.endswith(b'\n'):
+                self._add_line(lines, bytes(self._buffer))
+                self._buffer.clear()
+            start = end
+
+        while True:
+            end = chunk.find(b'\n', start) + 1
+            if end == 0:
+                break
+            # A slice of the whole chunk is the chunk itself, not a copy.
+            self._add_line(lines, chunk[start:end])
+            start = end
+
+        if start < len(chunk):
+            self._buffer += memoryview(chunk)[start:]
+        while len(self._buffer) > self._max_line_length:
+            lines.append(bytes(self._buffer[:self._max_line_length]))
+            del self._buffer[:self._max_line_length]
+        return lines
+
+    def flush(self):
+        """
+        Empty the buffer at the end of the stream.
+
+        :returns:
+            A list with the partial line that was left in the buffer, if
+            there was one.
+        """
+        lines = [bytes(self._buffer)] if self._buffer else []
+        self._buffer.clear()
+        return lines
+
+    def _add_line(self, lines, line):
+        max_length = self._max_line_length
+        while len(line) > max_length:
+            lines.append(line[:max_length])
+            line = line[max_length:]
+        lines.append(line)
+
+
+def frame_lines(chunks, max_line_length=MAX_LINE_LENGTH):
+    """
+    Iterate over the lines in a stream of chunks. See :class:`LineFramer`.
+
+    :param chunks: An iterable of ``bytes`` chunks.
+    :param max_line_length: The maximum length of a line.
+    """
+    framer = LineFramer(max_line_length)
+    for chunk in chunks:
+        yield from framer.feed(chunk)
+    yield from framer.flush()
+
+
+def demux_lines(frames, max_line_length=MAX_LINE_LENGTH):
+    """
+    Iterate over the lines in a multiplexed stream of frames, each tagged
+    with the stream it came from. The frames of each stream are framed into
+    lines separately, so that stdout and stderr lines that are written at the
+    same time aren't mixed up.
+
+    :param frames:
+        An iterable of ``(stream, chunk)`` tuples, where ``stream`` is
+        :data:`STDOUT`, :data:`STDERR`, or ``None`` if it isn't known.
+    :param max_line_length: The maximum length of a line.
+
+    :returns: An iterator over ``(stream, line)`` tuples.
+    """
+    framers = OrderedDict()
+    for stream, chunk in frames:
+        framer = framers.get(stream)
+        if framer is None:
+            framer = framers[stream] = LineFramer(max_line_length)
+        for line in framer.feed(chunk):
+            yield stream, line
+    for stream, framer in framers.items():
+        for line in framer.flush():
+            yield stream, line
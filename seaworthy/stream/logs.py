@@ -1,18 +1,153 @@
-from seaworthy.stream._timeout import stream_timeout
+import calendar
+import functools
+import time
+
+import attr
+
+from seaworthy.stream._timeout import (
+    multiplexed_stream_timeout, stream_timeout)
+from seaworthy.stream.lines import (
+    MAX_LINE_LENGTH, STDOUT, demux_lines, frame_lines)
+
+# The ASCII characters that str.rstrip() strips
+_ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
 
 
 def _last_few_log_lines(container):
-    return container.logs(tail=100).decode('utf-8')
+    return container.logs(tail=100).decode('utf-8', 'replace')
+
+
+def _logs_timeout(container, timeout, demux=False,
+                  max_line_length=MAX_LINE_LENGTH, stop=None, **logs_kwargs):
+    stream = container.logs(stream=True, **logs_kwargs)
+    return _stream_lines(
+        container, stream, timeout, demux, max_line_length, stop)
+
+
+def _stream_lines(container, stream, timeout, demux=False,
+                  max_line_length=MAX_LINE_LENGTH, stop=None):
+    """
+    Frame the chunks of a container's log stream into lines. The timeout can
+    be ``None`` for streams that are followed for as long as they last.
+    """
+    timeout_msg = 'Timeout waiting for container logs.'
+    # The logs of a container with a TTY aren't multiplexed, and everything
+    # is written to stdout.
+    attrs = getattr(container, 'attrs', {})
+    if attrs.get('Config', {}).get('Tty', False):
+        lines = frame_lines(
+            stream_timeout(stream, timeout, timeout_msg, stop=stop),
+            max_line_length)
+        return ((STDOUT, line) for line in lines) if demux else lines
+
+    # Lines from stdout and stderr can be interleaved, so we always frame
+    # each stream's lines separately.
+    frames = multiplexed_stream_timeout(
+        stream, timeout, timeout_msg, demux=True, stop=stop)
+    lines = demux_lines(frames, max_line_length)
+    return lines if demux else (line for _, line in lines)
+
+
+def _parse_timestamp(timestamp):
+    """
+    Parse a timestamp from Docker's logs, such as
+    ``2018-01-01T12:34:56.123456789Z``, into nanoseconds since the epoch.
+    """
+    seconds, _, fraction = timestamp.decode('ascii').rstrip('Z').partition('.')
+    seconds = calendar.timegm(time.strptime(seconds, '%Y-%m-%dT%H:%M:%S'))
+    return seconds * 10**9 + int(fraction.ljust(9, '0')[:9])
+
+
+@attr.s(frozen=True)
+class LogMark:
+    """
+    A position in a container's logs, just after the log lines that had been
+    logged when the mark was made. See :func:`log_mark`.
+
+    Docker only gives log lines timestamps, so a mark is the timestamp of the
+    last log line and the number of log lines with exactly that timestamp.
+    """
+
+    timestamp = attr.ib()
+    """
+    The timestamp of the last log line in nanoseconds since the epoch, or
+    ``None`` if nothing had been logged.
+    """
+
+    offset = attr.ib(default=0)
+    """
+    The number of log lines with exactly the mark's timestamp, which are
+    before the mark.
+    """
+
+
+def log_mark(container):
+    """
+    Mark the current end of a container's logs (both stdout and stderr), so
+    that only the log lines after it can be streamed later.
+
+    :param ~docker.models.containers.Container container:
+        Container whose logs to mark.
+
+    :returns: A :class:`LogMark`.
+    """
+    lines = container.logs(timestamps=True, tail=100).split(b'\n')
+    timestamps = [_parse_timestamp(line.split(b' ', 1)[0])
+                  for line in lines if line]
+    if not timestamps:
+        return LogMark(None)
+    return LogMark(timestamps[-1], timestamps.count(timestamps[-1]))
 
 
-def stream_logs(container, timeout=10.0, **logs_kwargs):
+def _lines_since(lines, mark, timestamps=False, demux=False):
+    skip = mark.offset
+    for item in lines:
+        line = item[1] if demux else item
+        timestamp, _, text = line.partition(b' ')
+        if mark.timestamp is not None:
+            timestamp = _parse_timestamp(timestamp)
+            if timestamp < mark.timestamp:
+                continue
+            # Drop the lines from before the mark that have the same timestamp
+            if timestamp == mark.timestamp and skip > 0:
+                skip -= 1
+                continue
+        if not timestamps:
+            line = text
+        yield (item[0], line) if demux else line
+
+
+def stream_logs(container, timeout=10.0, since=None, demux=False,
+                max_line_length=MAX_LINE_LENGTH, stop=None, **logs_kwargs):
     """
-    Stream logs from a Docker container within a timeout.
+    Stream log lines from a Docker container within a timeout.
+
+    The chunks that Docker sends are framed into whole lines, each with its
+    trailing newline (except possibly the last one). See
+    :class:`~seaworthy.stream.lines.LineFramer`.
+
+    For containers without a TTY, the timeout is applied to reads from the
+    stream's socket where possible. See
+    :func:`~seaworthy.stream._timeout.multiplexed_stream_timeout`.
 
     :param ~docker.models.containers.Container container:
         Container who's log lines to stream.
     :param timeout:
         Timeout value in seconds.
+    :param since:
+        Only stream the log lines after this time. This can be a
+        :class:`LogMark` from :func:`log_mark`, which is more precise than the
+        whole seconds that Docker supports.
+    :param demux:
+        If ``True``, stream ``(stream, line)`` tuples, where ``stream`` is
+        :data:`~seaworthy.stream.lines.STDOUT` or
+        :data:`~seaworthy.stream.lines.STDERR` for the stream the line was
+        logged to. It is ``None`` if the streams can't be told apart, which
+        is the case when the stream's socket can't be reached.
+    :param max_line_length:
+        The maximum length of a line. Longer lines are split.
+    :param threading.Event stop:
+        An event that can be set to close the stream and stop streaming early.
     :param logs_kwargs:
         Additional keyword arguments to pass to ``container.logs()``. For
         example, the ``stdout`` and ``stderr`` boolean arguments can be used to
@@ -21,9 +156,20 @@ def stream_logs(container, timeout=10.0, **logs_kwargs):
     :raises TimeoutError:
         When the timeout value is reached before the logs have completed.
     """
-    stream = container.logs(stream=True, **logs_kwargs)
-    return stream_timeout(
-        stream, timeout, 'Timeout waiting for container logs.')
+    logs_kwargs.update(
+        demux=demux, max_line_length=max_line_length, stop=stop)
+    if not isinstance(since, LogMark):
+        if since is not None:
+            logs_kwargs['since'] = since
+        return _logs_timeout(container, timeout, **logs_kwargs)
+
+    timestamps = logs_kwargs.pop('timestamps', False)
+    if since.timestamp is not None:
+        # Docker only takes whole seconds, so we get a few lines from before
+        # the mark and drop them ourselves.
+        logs_kwargs['since'] = since.timestamp // 10**9
+    lines = _logs_timeout(container, timeout, timestamps=True, **logs_kwargs)
+    return _lines_since(lines, since, timestamps=timestamps, demux=demux)
 
 
 def wait_for_logs_matching(container, matcher, timeout=10, encoding='utf-8',
@@ -47,6 +193,8 @@ def wait_for_logs_matching(container, matcher, timeout=10, encoding='utf-8',
         Additional keyword arguments to pass to ``container.logs()``. For
         example, the ``stdout`` and ``stderr`` boolean arguments can be used to
         determine whether to stream stdout or stderr or both (the default).
+        The ``since`` argument can be a :class:`LogMark` to only match log
+        lines after the mark. See :func:`stream_logs`.
 
     :returns:
         The final matching log line.
@@ -58,22 +206,51 @@ def wait_for_logs_matching(container, matcher, timeout=10, encoding='utf-8',
         been found (the container must have stopped for its stream to have
         ended without error).
     """
+    lines = stream_logs(container, timeout=timeout, **logs_kwargs)
+    return _wait_for_lines_matching(
+        container, lines, matcher, timeout, encoding)
+
+
+def _wait_for_lines_matching(container, lines, matcher, timeout, encoding,
+                             last_lines=None):
+    """
+    Match log lines from an iterable that raises TimeoutError when the timeout
+    is reached. See :func:`wait_for_logs_matching`.
+
+    :param last_lines:
+        A callable that returns the last few log lines for error messages,
+        instead of getting them from the container.
+    """
+    if last_lines is None:
+        last_lines = functools.partial(_last_few_log_lines, container)
+    use_bytes = getattr(matcher, 'use_bytes', None)
     try:
-        for line in stream_logs(container, timeout=timeout, **logs_kwargs):
-            # Drop the trailing newline
-            line = line.decode(encoding).rstrip()
-            if matcher(line):
-                return line
+        if use_bytes is not None and use_bytes(encoding):
+            # Match the raw lines so that we only decode the matching one
+            for line in lines:
+                # Strip what line.decode(encoding).rstrip() would. Non-ASCII
+                # whitespace is rare, so we only decode if it could be there.
+                line = line.rstrip(_ASCII_WHITESPACE)
+                if line and line[-1] >= 0x80:
+                    line = line.decode(encoding).rstrip().encode(encoding)
+                if matcher(line):
+                    return line.decode(encoding)
+        else:
+            for line in lines:
+                # Drop the trailing newline
+                line = line.decode(encoding).rstrip()
+                if matcher(line):
+                    return line
     except TimeoutError:
         raise TimeoutError('\n'.join([
             ('Timeout ({}s) waiting for logs matching {}.'.format(
                 timeout, matcher)),
             'Last few log lines:',
-            _last_few_log_lines(container),
+            last_lines(),
         ]))
 
     raise RuntimeError('\n'.join([
         'Logs matching {} not found.'.format(matcher),
         'Last few log lines:',
-        _last_few_log_lines(container),
+        last_lines(),
     ]))
@@ -1,5 +1,18 @@
+import codecs
 import re
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+# Numbered backreferences would refer to the wrong groups in a combined regex
+_BACKREFERENCE = re.compile(r'\\[1-9]')
+# Alternations of patterns that start with a literal are fast to search
+_LITERAL_START = re.compile(r'[\w ]')
+# Inline flag groups, such as (?i) or (?u), some of which are Unicode-aware
+# for str or aren't allowed in bytes patterns
+_INLINE_FLAGS = re.compile(r'\(\?[aiLmsux-]+[:)]')
+# Encodings where ASCII characters are encoded as the same single bytes and
+# never appear inside the encoding of another character
+_ASCII_COMPATIBLE = {'ascii', 'utf-8', 'iso8859-1'}
 
 
 class StreamMatcher(ABC):
@@ -19,6 +32,17 @@ class StreamMatcher(ABC):
         Return an args string for the repr.
         """
 
+    def use_bytes(self, encoding):
+        """
+        Prepare the matcher to also match ``bytes`` items, which are matched
+        in the same way as the items decoded with ``encoding`` would be.
+
+        :returns:
+            ``True`` if the matcher can match ``bytes`` items, otherwise
+            ``False``. Matchers that can't match bytes don't override this.
+        """
+        return False
+
     def __call__(self, item):
         return self.match(item)
 
@@ -42,6 +66,47 @@ def to_matcher(matcher_factory, obj):
     return obj if isinstance(obj, StreamMatcher) else matcher_factory(obj)
 
 
+def _ascii_compatible(encoding):
+    try:
+        return codecs.lookup(encoding).name in _ASCII_COMPATIBLE
+    except LookupError:
+        return False
+
+
+def _bytes_safe_pattern(pattern):
+    """
+    Whether a ``str`` regex pattern matches the same lines when it's encoded
+    and used to search encoded lines. Anything that matches a single
+    character could match part of a multibyte one instead, so we reject
+    patterns with those, even if they would turn out to be fine.
+    """
+    try:
+        pattern.encode('ascii')
+    except UnicodeEncodeError:
+        return False
+    if _INLINE_FLAGS.search(pattern):
+        return False
+    i = 0
+    while i < len(pattern):
+        c, following = pattern[i], pattern[i + 1:i + 2]
+        if c == '\\':
+            # Character class escapes are Unicode-aware, and numeric escapes
+            # could be non-ASCII characters.
+            if following.isalpha() and following not in 'ntrfvAZ':
+                return False
+            if following.isdigit() and pattern[i + 2:i + 3].isdigit():
+                return False
+            i += 2
+            continue
+        # Any number of characters is the same as any number of bytes
+        if c == '.' and following not in ('*', '+'):
+            return False
+        if c == '[' and following == '^':
+            return False
+        i += 1
+    return True
+
+
 class CombinationMatcher(StreamMatcher):
     """
     Matcher that combines multiple input matchers.
@@ -65,6 +130,14 @@ class CombinationMatcher(StreamMatcher):
         """
         return cls(*(to_matcher(RegexMatcher, p) for p in patterns))
 
+    def use_bytes(self, encoding):
+        """
+        Prepare all the matchers to match ``bytes`` items. Returns ``True`` if
+        they all can, otherwise ``False``.
+        """
+        return all([getattr(m, 'use_bytes', lambda e: False)(encoding)
+                    for m in self._matchers])
+
 
 class OrderedMatcher(CombinationMatcher):
     """
@@ -106,6 +179,43 @@ class OrderedMatcher(CombinationMatcher):
             ', '.join(matched), ', '.join(unmatched))
 
 
+def _combinable(matcher):
+    """
+    Whether a matcher is a plain :class:`RegexMatcher` whose pattern can be
+    part of a combined regex without changing what it matches, and is likely
+    to be faster to search for that way.
+    """
+    if type(matcher) is not RegexMatcher:
+        return False
+    regex = matcher._regex
+    # Global flags (including inline ones) would apply to the whole combined
+    # regex, so we only combine patterns with the default flags.
+    return (isinstance(regex.pattern, str) and
+            regex.flags & ~re.UNICODE == 0 and
+            _LITERAL_START.match(regex.pattern) is not None and
+            not _BACKREFERENCE.search(regex.pattern))
+
+
+def _combine_regexes(regexes):
+    """
+    Combine some compiled regexes into a single alternation, which matches an
+    item if and only if one of the regexes does. The regexes must all be
+    ``str`` regexes or all be ``bytes`` regexes.
+
+    :returns: The regex, or ``None`` if the patterns can't be combined.
+    """
+    patterns = [r.pattern for r in regexes]
+    if isinstance(patterns[0], bytes):
+        pattern = b'|'.join(b'(?:' + p + b')' for p in patterns)
+    else:
+        pattern = '|'.join('(?:{})'.format(p) for p in patterns)
+    try:
+        return re.compile(pattern)
+    except re.error:
+        # For example, if two patterns have groups with the same name
+        return None
+
+
 class UnorderedMatcher(CombinationMatcher):
     """
     Matcher that takes a list of matchers, and matches each one to an item.
@@ -113,6 +223,10 @@ class UnorderedMatcher(CombinationMatcher):
     or all unmatched matchers are checked. Returns True ("matches") on the
     final match.
 
+    Unmatched :class:`RegexMatcher` instances are combined into a single
+    regex, so that most items, which match none of them, are tested against
+    all of them in one go.
+
     .. note::
 
         This is a *stateful* matcher. Once it has done its matching,
@@ -121,25 +235,80 @@ class UnorderedMatcher(CombinationMatcher):
     def __init__(self, *matchers):
         super().__init__(*matchers)
         self._used_matchers = []
+        # Unused matchers by position, and the positions of each matcher in
+        # case the same one was given more than once.
+        self._unused = OrderedDict(enumerate(matchers))
+        self._positions = {}
+        for position, matcher in enumerate(matchers):
+            self._positions.setdefault(id(matcher), []).append(position)
+        self._regex = None
+        self._bytes_regex = None
+        self._others = []
+        self._regex_stale = True
 
     @property
     def _unused_matchers(self):
-        return [m for m in self._matchers if m not in self._used_matchers]
+        return list(self._unused.values())
+
+    def _update_regex(self):
+        """
+        Combine the unused regex matchers, and keep track of the other unused
+        matchers that still need to be tried one at a time.
+        """
+        self._regex_stale = False
+        combinable = [m for m in self._unused.values() if _combinable(m)]
+        self._regex = None
+        self._bytes_regex = None
+        # A single pattern is faster on its own
+        if len(combinable) > 1:
+            self._regex = _combine_regexes([m._regex for m in combinable])
+        if self._regex is not None and all(
+                m._bytes_regex is not None for m in combinable):
+            self._bytes_regex = _combine_regexes(
+                [m._bytes_regex for m in combinable])
+        combined = set() if self._regex is None else set(map(id, combinable))
+        self._others = [m for m in self._unused.values()
+                        if id(m) not in combined]
+
+    def _use(self, matcher):
+        self._used_matchers.append(matcher)
+        for position in self._positions[id(matcher)]:
+            del self._unused[position]
+        self._regex_stale = True
+
+    def _find_match(self, item):
+        if self._regex_stale:
+            self._update_regex()
+        candidates = self._unused.values()
+        regex = None
+        if isinstance(item, str):
+            regex = self._regex
+        elif isinstance(item, bytes):
+            regex = self._bytes_regex
+        # Most items don't match any of the regexes, so we check that in one
+        # go. Otherwise, all the matchers are tried in order so that the
+        # first one to match is used, but that only happens once per match.
+        if regex is not None and regex.search(item) is None:
+            candidates = self._others
+
+        for matcher in candidates:
+            if matcher(item):
+                return matcher
+        return None
 
     def match(self, item):
         """
         Return ``True`` if the expected matchers are matched in any order,
         otherwise ``False``.
         """
-        if not self._unused_matchers:
+        if not self._unused:
             raise RuntimeError('Matcher exhausted, no more matchers to use')
 
-        for matcher in self._unused_matchers:
-            if matcher(item):
-                self._used_matchers.append(matcher)
-                break
+        matcher = self._find_match(item)
+        if matcher is not None:
+            self._use(matcher)
 
-        if not self._unused_matchers:
+        if not self._unused:
             # All patterns have been matched
             return True
 
@@ -161,12 +330,29 @@ class EqualsMatcher(StreamMatcher):
     """
     def __init__(self, expected_item):
         self._expected_item = expected_item
+        self._expected_bytes = None
+
+    def use_bytes(self, encoding):
+        """
+        Encode the expected value, if it's a string that can be encoded.
+        """
+        self._expected_bytes = None
+        if not (_ascii_compatible(encoding) and
+                isinstance(self._expected_item, str)):
+            return False
+        try:
+            self._expected_bytes = self._expected_item.encode(encoding)
+        except UnicodeEncodeError:
+            return False
+        return True
 
     def match(self, item):
         """
         Return ``True`` if the item matches the expected value exactly,
         otherwise ``False``.
         """
+        if isinstance(item, bytes) and self._expected_bytes is not None:
+            return item == self._expected_bytes
         return item == self._expected_item
 
     def args_str(self):
@@ -182,13 +368,38 @@ class RegexMatcher(StreamMatcher):
     """
     def __init__(self, pattern):
         self._regex = re.compile(pattern)
+        self._bytes_regex = None
+
+    def use_bytes(self, encoding):
+        """
+        Compile a ``bytes`` version of the regex if it matches the same lines
+        in bytes as it does in text. That's only the case for ASCII patterns
+        that don't use Unicode-aware features, such as ``\\w``, ``IGNORECASE``
+        or inline flags, or a ``.`` that isn't followed by ``*`` or ``+``.
+        """
+        self._bytes_regex = None
+        pattern = self._regex.pattern
+        if not (_ascii_compatible(encoding) and isinstance(pattern, str) and
+                not self._regex.flags & re.IGNORECASE and
+                _bytes_safe_pattern(pattern)):
+            return False
+        try:
+            self._bytes_regex = re.compile(
+                pattern.encode('ascii'), self._regex.flags & ~re.UNICODE)
+        except re.error:
+            # Anything we missed that's only valid in str patterns
+            return False
+        return True
 
     def match(self, item):
         """
         Return ``True`` if the item matches the expected regex, otherwise
         ``False``.
         """
-        return self._regex.search(item) is not None
+        regex = self._regex
+        if isinstance(item, bytes) and self._bytes_regex is not None:
+            regex = self._bytes_regex
+        return regex.search(item) is not None
 
     def args_str(self):
         """
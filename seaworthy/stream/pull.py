@@ -0,0 +1,241 @@
+"""
+Streaming image pulls with progress reporting.
+"""
+
+import logging
+import queue
+import threading
+import time
+
+from docker.errors import APIError
+
+from seaworthy.stream._timeout import stream_timeout
+
+log = logging.getLogger(__name__)
+
+
+def _format_bytes(num):
+    for unit in ['B', 'kB', 'MB']:
+        if num < 1000:
+            return '{:.1f} {}'.format(num, unit)
+        num /= 1000
+    return '{:.1f} GB'.format(num)
+
+
+class PullProgress:
+    """
+    The progress of an image pull, aggregated over the image's layers from
+    the events in the pull stream.
+
+    Layers that already exist locally are not counted. The total size is only
+    known for the layers that have started downloading, so it may grow as the
+    pull goes on.
+    """
+
+    def __init__(self, image, clock=time.monotonic):
+        """
+        :param image: The image being pulled.
+        :param clock: A function that returns the current time in seconds.
+        """
+        self.image = image
+        self.status = None
+        self._clock = clock
+        self._start = clock()
+        self._layers = {}
+
+    def update(self, event):
+        """
+        Update the progress with an event from the pull stream.
+        """
+        self.status = event.get('status')
+        layer = event.get('id')
+        if layer is None or self.status is None:
+            return
+
+        detail = event.get('progressDetail') or {}
+        if self.status == 'Downloading' and 'total' in detail:
+            self._layers[layer] = (detail.get('current', 0), detail['total'])
+        elif (self.status in ['Download complete', 'Pull complete'] and
+                layer in self._layers):
+            _, total = self._layers[layer]
+            self._layers[layer] = (total, total)
+
+    @property
+    def downloaded(self):
+        """
+        The number of bytes downloaded so far.
+        """
+        return sum(current for current, _ in self._layers.values())
+
+    @property
+    def total(self):
+        """
+        The total number of bytes to download, as far as is known so far.
+        """
+        return sum(total for _, total in self._layers.values())
+
+    @property
+    def elapsed(self):
+        """
+        The number of seconds since the pull started.
+        """
+        return self._clock() - self._start
+
+    @property
+    def rate(self):
+        """
+        The average download rate in bytes per second.
+        """
+        elapsed = self.elapsed
+        return self.downloaded / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self):
+        """
+        The estimated number of seconds until the download is complete, or
+        ``None`` if it can't be estimated yet.
+        """
+        rate = self.rate
+        if rate <= 0:
+            return None
+        return (self.total - self.downloaded) / rate
+
+    def __str__(self):
+        eta = self.eta
+        return "Pulling '{}': {} of {} ({}/s, ETA {})".format(
+            self.image, _format_bytes(self.downloaded),
+            _format_bytes(self.total), _format_bytes(self.rate),
+            '?' if eta is None else '{:.0f}s'.format(eta))
+
+
+def log_progress(interval=5.0, level=logging.DEBUG):
+    """
+    Create a progress callback for :func:`pull_image` that logs the progress
+    at most once every ``interval`` seconds.
+    """
+    last = [None]
+
+    def callback(progress):
+        elapsed = progress.elapsed
+        if last[0] is None or elapsed - last[0] >= interval:
+            last[0] = elapsed
+            log.log(level, str(progress))
+
+    return callback
+
+
+class _PullStream:
+    """
+    Iterate over the events of a pull stream in a background thread. The
+    low-level ``APIClient.pull()`` returns a generator, which can't be closed
+    while it is blocked waiting for the next event, so a stalled pull couldn't
+    be aborted by :func:`~seaworthy.stream._timeout.stream_timeout`. Closing
+    this stream instead stops iteration straight away, and the thread finishes
+    when the pull does.
+    """
+
+    _END = object()
+
+    def __init__(self, events):
+        self._queue = queue.Queue()
+        self._closed = False
+        thread = threading.Thread(
+            target=self._run, args=(events,), daemon=True)
+        thread.start()
+
+    def _run(self, events):
+        try:
+            for event in events:
+                if self._closed:
+                    break
+                self._queue.put((event, None))
+        except Exception as e:
+            self._queue.put((self._END, e))
+        else:
+            self._queue.put((self._END, None))
+        finally:
+            if hasattr(events, 'close'):
+                events.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._closed:
+            raise StopIteration()
+        event, error = self._queue.get()
+        if error is not None:
+            raise error
+        if event is self._END:
+            raise StopIteration()
+        return event
+
+    def close(self):
+        self._closed = True
+        self._queue.put((self._END, None))
+
+
+def follow_pull(stream, image, progress=None, timeout=None):
+    """
+    Consume the decoded events of an image pull stream, tracking the progress
+    of the pull.
+
+    :param stream: The stream of decoded pull events.
+    :param image: The name of the image being pulled.
+    :param progress:
+        A callable to call with the :class:`PullProgress` after each event.
+    :param timeout:
+        Timeout value in seconds for the whole pull. By default, there is no
+        timeout.
+
+    :returns: The final :class:`PullProgress`.
+    :raises TimeoutError: When the pull takes longer than the timeout.
+    :raises docker.errors.APIError: When the pull stream reports an error.
+    """
+    pull_progress = PullProgress(image)
+    if timeout is not None:
+        stream = stream_timeout(
+            stream, timeout,
+            "Timeout ({}s) pulling image '{}'.".format(timeout, image))
+
+    for event in stream:
+        if 'error' in event:
+            raise APIError(
+                "Error pulling image '{}': {}".format(image, event['error']))
+        pull_progress.update(event)
+        if progress is not None:
+            progress(pull_progress)
+    return pull_progress
+
+
+def pull_image(client, name, tag='latest', progress=None, timeout=None):
+    """
+    Pull an image, streaming the pull's progress rather than blocking until
+    the whole image has been downloaded.
+
+    :param client: The Docker client to use.
+    :param name: The name of the image, without the tag.
+    :param tag: The tag to pull.
+    :param progress:
+        A callable to call with the :class:`PullProgress` as the pull
+        progresses. Defaults to logging the progress every few seconds at the
+        ``DEBUG`` level. See :func:`log_progress`.
+    :param timeout:
+        Timeout value in seconds for the whole pull. By default, there is no
+        timeout.
+
+    :returns: The image model.
+    :raises TimeoutError: When the pull takes longer than the timeout.
+    :raises docker.errors.APIError: When the pull fails.
+    """
+    if progress is None:
+        progress = log_progress()
+
+    separator = '@' if tag.startswith('sha256:') else ':'
+    image = '{}{}{}'.format(name, separator, tag)
+    stream = _PullStream(client.api.pull(name, tag, stream=True, decode=True))
+    try:
+        follow_pull(stream, image, progress=progress, timeout=timeout)
+    finally:
+        stream.close()
+    return client.images.get(image)
@@ -0,0 +1,174 @@
+"""
+Recording of a container's logs to disk.
+"""
+
+import logging
+import mmap
+import os
+import re
+import threading
+
+from seaworthy.stream.logs import _stream_lines
+
+log = logging.getLogger(__name__)
+
+
+class LogRecorder:
+    """
+    Follow a container's logs in a background thread and write them to a
+    file, so that they can be searched without asking Docker for them again,
+    even after the container has been removed.
+
+    The file is memory-mapped when it is searched or tailed, so searching
+    large logs doesn't read them all into memory.
+    """
+
+    def __init__(self, container, path):
+        """
+        :param ~docker.models.containers.Container container:
+            Container whose logs to record.
+        :param path:
+            The file to record the logs in. Any existing file is replaced.
+        """
+        self._container = container
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._stream = None
+        self._thread = None
+        self._finished = False
+
+    def start(self):
+        """
+        Start recording the container's logs, if that hasn't happened
+        already.
+        """
+        with self._lock:
+            if self._file is not None or self._finished:
+                return
+            file = open(self.path, 'wb')
+            try:
+                self._stream = self._container.logs(stream=True, tail='all')
+            except Exception:
+                file.close()
+                raise
+            self._file = file
+            self._thread = threading.Thread(
+                target=self._run, args=(self._stream,), daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=0):
+        """
+        Stop recording the container's logs. The file is kept, and can still
+        be searched.
+
+        :param timeout:
+            How many seconds to wait for the log stream to end by itself
+            before closing it, so that the last of the logs of a container
+            that has stopped are recorded.
+        """
+        thread = self._thread
+        if timeout and thread is not None:
+            thread.join(timeout)
+        with self._lock:
+            stream, self._stream = self._stream, None
+            self._finished = True
+        if stream is not None:
+            stream.close()
+
+    @property
+    def finished(self):
+        """
+        Whether the recorder has stopped recording, either because it was
+        closed or because the container stopped.
+        """
+        return self._finished
+
+    def _run(self, stream):
+        try:
+            # stdout and stderr are framed into lines separately, so that
+            # partial lines written to both at once aren't mixed up.
+            for line in _stream_lines(self._container, stream, None):
+                with self._lock:
+                    self._file.write(line)
+        except Exception as e:
+            # The stream raises errors when it's closed while we're reading
+            if stream is self._stream:
+                log.warning('Container log stream failed: {!r}'.format(e))
+        finally:
+            with self._lock:
+                self._finished = True
+                self._file.close()
+
+    def _map(self):
+        """
+        Memory-map what has been recorded so far. Returns ``None`` if nothing
+        has been recorded, because an empty file can't be mapped.
+        """
+        with self._lock:
+            if self._file is None:
+                return None
+            if not self._file.closed:
+                self._file.flush()
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return None
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def tail(self, n=100):
+        """
+        Get the last ``n`` recorded log lines, like ``container.logs(tail=n)``
+        does.
+
+        :returns: ``bytes``
+        """
+        data = self._map()
+        if data is None:
+            return b''
+        with data:
+            end = len(data)
+            # A trailing newline doesn't start another line
+            start = end - 1 if data[end - 1:end] == b'\n' else end
+            for _ in range(n):
+                start = data.rfind(b'\n', 0, start)
+                if start == -1:
+                    break
+            return data[start + 1:end]
+
+    def search(self, pattern):
+        """
+        Find the recorded log lines that match a regex.
+
+        :param pattern:
+            A ``bytes`` or ``str`` pattern, or a compiled ``bytes`` regex. A
+            ``str`` pattern is encoded as UTF-8. ``^`` and ``$`` match at the
+            start and end of each line.
+
+        :returns:
+            A list of the matching lines as ``bytes``, without their
+            newlines. If a match spans several lines, they are returned as one
+            item.
+        """
+        if isinstance(pattern, str):
+            pattern = pattern.encode('utf-8')
+        if not hasattr(pattern, 'finditer'):
+            pattern = re.compile(pattern, re.MULTILINE)
+
+        data = self._map()
+        if data is None:
+            return []
+        lines = []
+        with data:
+            end = -1
+            for match in pattern.finditer(data):
+                # Only one item for each line, even if it matches more than
+                # once.
+                if match.start() <= end:
+                    continue
+                start = data.rfind(b'\n', 0, match.start()) + 1
+                # A match can end with the newline at the end of its line
+                end = data.find(b'\n', max(match.end() - 1, match.start()))
+                if end == -1:
+                    end = len(data)
+                lines.append(data[start:end])
+        return lines
@@ -0,0 +1,33 @@
+"""
+An aiohttp web server and request helpers for testing the async HTTP client.
+They use the async syntax, so they're kept out of the test module, which
+skips on Python 3.4 if it can't import them.
+"""
+
+from aiohttp import web
+
+
+def make_app(requests, statuses):
+    """
+    Make a web app that records the requests it gets in ``requests``, and
+    responds to each of them with the next of ``statuses``, or 200.
+    """
+    async def handler(request):
+        requests.append(
+            (request.method, request.path_qs, await request.read()))
+        status = statuses.pop(0) if statuses else 200
+        return web.Response(status=status, text='hello')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handler)
+    return app
+
+
+async def fetch(method, path, **kwargs):
+    """
+    Make a request with one of the client's methods, and read the response.
+
+    :returns: The response status and text.
+    """
+    response = await method(path, **kwargs)
+    return response.status, await response.text()
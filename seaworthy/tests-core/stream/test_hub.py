@@ -0,0 +1,171 @@
+import socket
+import threading
+import time
+import unittest
+
+from seaworthy.stream.hub import LogHub, LogHubOverflowError
+
+from .test_logs import FakeLogsContainer
+from .test_timeout import BlockingStream, FakeSocketResponse, frame
+
+
+class FakeMultiplexedContainer:
+    """
+    A container stub whose log stream is read from a socket of multiplexed
+    frames, like a real container without a TTY.
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+
+    def logs(self, stream=False, **kw):
+        assert stream
+        logs = BlockingStream()
+        logs._response = FakeSocketResponse(self._sock)
+        return logs
+
+
+class TestLogHub(unittest.TestCase):
+    def make_hub(self, items, max_lines=10000, close_timeout=0.1):
+        con = FakeLogsContainer(items, close_timeout=close_timeout)
+        self.addCleanup(con.cleanup)
+        hub = LogHub(con, max_lines=max_lines)
+        self.addCleanup(hub.close)
+        hub.start()
+        return hub
+
+    def test_subscribe(self):
+        """
+        Subscribers get all the log lines, including the ones that arrived
+        before they subscribed, and stop when the stream ends.
+        """
+        hub = self.make_hub([(0, b'a\n'), (0, b'b\n'), (0.05, b'c\n')])
+        time.sleep(0.02)
+        self.assertEqual(list(hub.subscribe(timeout=1)),
+                         [b'a\n', b'b\n', b'c\n'])
+        self.assertTrue(hub.finished)
+        self.assertEqual(list(hub.subscribe(timeout=1)),
+                         [b'a\n', b'b\n', b'c\n'])
+
+    def test_concurrent_subscribers(self):
+        """
+        Many subscribers can read from the hub at the same time.
+        """
+        hub = self.make_hub(
+            [(0.01, '{}\n'.format(i).encode()) for i in range(20)])
+        results = []
+
+        def read():
+            results.append(list(hub.subscribe(timeout=2)))
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = ['{}\n'.format(i).encode() for i in range(20)]
+        self.assertEqual(results, [expected] * 5)
+
+    def test_cursor(self):
+        """
+        We can subscribe from a cursor to only get the lines after it.
+        """
+        hub = self.make_hub([(0, b'a\n'), (0.1, b'b\n')])
+        time.sleep(0.05)
+        cursor = hub.cursor
+        self.assertEqual(cursor, 1)
+        self.assertEqual(list(hub.subscribe(cursor, timeout=1)), [b'b\n'])
+
+    def test_ring_buffer(self):
+        """
+        Only the most recent lines are kept, and subscribing from a line that
+        has been dropped is an error.
+        """
+        hub = self.make_hub([(0, b'a\n'), (0, b'b\n'), (0, b'c\n')],
+                            max_lines=2)
+        self.assertEqual(
+            list(hub.subscribe(1, timeout=1)), [b'b\n', b'c\n'])
+        self.assertEqual(hub.first, 1)
+        self.assertEqual(hub.cursor, 3)
+        with self.assertRaises(LogHubOverflowError):
+            list(hub.subscribe(timeout=1))
+
+    def test_overflow(self):
+        """
+        A subscriber that falls behind the lines the hub keeps gets an error
+        rather than skipping the lines that were dropped.
+        """
+        hub = self.make_hub(
+            [(0, b'a\n'), (0.05, b'b\n'), (0, b'c\n'), (0, b'd\n')],
+            max_lines=2)
+        lines = hub.subscribe(timeout=1)
+        self.assertEqual(next(lines), b'a\n')
+        while not hub.finished:
+            time.sleep(0.01)
+        with self.assertRaises(LogHubOverflowError) as cm:
+            next(lines)
+        self.assertEqual(
+            str(cm.exception), '1 log line(s) were dropped before they were '
+            'read.')
+
+    def test_lines(self):
+        """
+        The hub keeps whole log lines, however the chunks of the stream are
+        split.
+        """
+        hub = self.make_hub([(0, b'a\nb'), (0, b'c\n'), (0, b'd')])
+        self.assertEqual(list(hub.subscribe(timeout=1)),
+                         [b'a\n', b'bc\n', b'd'])
+
+    def test_interleaved_lines(self):
+        """
+        Partial lines written to stdout and stderr at the same time are framed
+        separately, so they aren't mixed up.
+        """
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        self.addCleanup(client.close)
+        hub = LogHub(FakeMultiplexedContainer(client))
+        self.addCleanup(hub.close)
+        hub.start()
+        server.sendall(
+            frame(b'out 1, ') + frame(b'err 1, ', 2) + frame(b'part 2\nout') +
+            frame(b'part 2\n', 2) + frame(b' 2\n'))
+        server.shutdown(socket.SHUT_WR)
+        self.assertEqual(list(hub.subscribe(timeout=1)), [
+            b'out 1, part 2\n', b'err 1, part 2\n', b'out 2\n'])
+
+    def test_timeout(self):
+        """
+        A subscriber gets a TimeoutError if the timeout is reached while the
+        stream is still going.
+        """
+        hub = self.make_hub([(0, b'a\n')], close_timeout=1)
+        lines = []
+        with self.assertRaises(TimeoutError) as cm:
+            for line in hub.subscribe(timeout=0.1, timeout_msg='Timeout!'):
+                lines.append(line)
+        self.assertEqual(str(cm.exception), 'Timeout!')
+        self.assertEqual(lines, [b'a\n'])
+
+    def test_stop(self):
+        """
+        A subscriber stops as soon as its stop event is set.
+        """
+        hub = self.make_hub([(0, b'a\n')], close_timeout=1)
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        start = time.monotonic()
+        self.assertEqual(list(hub.subscribe(timeout=1, stop=stop)), [b'a\n'])
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertFalse(hub.finished)
+
+    def test_close(self):
+        """
+        Subscribers stop when the hub is closed.
+        """
+        hub = self.make_hub([(0, b'a\n')], close_timeout=1)
+        threading.Timer(0.05, hub.close).start()
+        start = time.monotonic()
+        self.assertEqual(list(hub.subscribe(timeout=1)), [b'a\n'])
+        self.assertLess(time.monotonic() - start, 0.5)
@@ -0,0 +1,72 @@
+import unittest
+
+from seaworthy.stream.lines import (
+    LineFramer, STDERR, STDOUT, demux_lines, frame_lines)
+
+
+class TestLineFramer(unittest.TestCase):
+    def test_whole_lines(self):
+        """
+        A chunk of whole lines is split into lines, and a chunk that is a
+        single line isn't copied.
+        """
+        framer = LineFramer()
+        chunk = b'a\n'
+        self.assertIs(framer.feed(chunk)[0], chunk)
+        self.assertEqual(framer.feed(b'b\nc\n\n'), [b'b\n', b'c\n', b'\n'])
+        self.assertEqual(framer.flush(), [])
+
+    def test_partial_lines(self):
+        """
+        Partial lines are buffered until the rest of them arrives.
+        """
+        framer = LineFramer()
+        self.assertEqual(framer.feed(b'a\nb'), [b'a\n'])
+        self.assertEqual(framer.feed(b'c'), [])
+        self.assertEqual(framer.feed(b'd\ne\nf'), [b'bcd\n', b'e\n'])
+        self.assertEqual(framer.feed(b'\n'), [b'f\n'])
+        self.assertEqual(framer.feed(b'g'), [])
+        self.assertEqual(framer.flush(), [b'g'])
+        self.assertEqual(framer.flush(), [])
+
+    def test_max_line_length(self):
+        """
+        Lines longer than the maximum length are split, whether or not their
+        newline has arrived.
+        """
+        framer = LineFramer(max_line_length=4)
+        self.assertEqual(framer.feed(b'abcdefghij\n'),
+                         [b'abcd', b'efgh', b'ij\n'])
+        self.assertEqual(framer.feed(b'abc'), [])
+        self.assertEqual(framer.feed(b'defghi'), [b'abcd', b'efgh'])
+        self.assertEqual(framer.flush(), [b'i'])
+
+
+class TestFrameLinesFunc(unittest.TestCase):
+    def test_frame_lines(self):
+        """
+        We get whole lines from chunks that are split anywhere, including the
+        partial line at the end.
+        """
+        chunks = [b'hel', b'lo\nwor', b'ld\n', b'', b'bye']
+        self.assertEqual(list(frame_lines(chunks)),
+                         [b'hello\n', b'world\n', b'bye'])
+
+
+class TestDemuxLinesFunc(unittest.TestCase):
+    def test_demux_lines(self):
+        """
+        The lines of each stream are framed separately and tagged with their
+        stream.
+        """
+        frames = [
+            (STDOUT, b'out '),
+            (STDERR, b'err\nerr '),
+            (STDOUT, b'1\n'),
+            (STDERR, b'2'),
+        ]
+        self.assertEqual(list(demux_lines(frames)), [
+            (STDERR, b'err\n'),
+            (STDOUT, b'out 1\n'),
+            (STDERR, b'err 2'),
+        ])
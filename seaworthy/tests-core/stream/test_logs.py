@@ -3,8 +3,10 @@ from datetime import datetime
 
 from seaworthy.checks import docker_client, dockertest
 from seaworthy.helpers import DockerHelper, fetch_images
-from seaworthy.stream.logs import stream_logs, wait_for_logs_matching
-from seaworthy.stream.matchers import EqualsMatcher
+from seaworthy.stream.lines import STDOUT
+from seaworthy.stream.logs import (
+    LogMark, _lines_since, log_mark, stream_logs, wait_for_logs_matching)
+from seaworthy.stream.matchers import EqualsMatcher, RegexMatcher
 
 from .fake_stream import FakeStreamSource
 
@@ -150,6 +152,31 @@ class TestStreamLogsFunc(unittest.TestCase):
         lines = list(self.stream_logs(con, timeout=0.35))
         self.assertEqual(lines, [b'hello\n', b'goodbye\n'])
 
+    def test_lines(self):
+        """
+        We get whole lines, however the chunks of the stream are split.
+        """
+        con = self.mkcontainer([
+            (0, b'hel'),
+            (0.05, b'lo\ngoodbye\nag'),
+            (0, b'ain'),
+        ])
+        self.assertEqual(list(self.stream_logs(con)),
+                         [b'hello\n', b'goodbye\n', b'again'])
+
+    def test_demux(self):
+        """
+        Lines can be tagged with their streams. For a container with a TTY,
+        everything is logged to stdout. Otherwise, the streams of our fake
+        container can't be told apart.
+        """
+        con = self.mkcontainer([(0, b'hello\n')])
+        self.assertEqual(list(self.stream_logs(con, demux=True)),
+                         [(None, b'hello\n')])
+        con.attrs = {'Config': {'Tty': True}}
+        self.assertEqual(list(self.stream_logs(con, demux=True)),
+                         [(STDOUT, b'hello\n')])
+
 
 class TestWaitForLogsMatchingFunc(unittest.TestCase):
     def mkcontainer(self, *args, **kw):
@@ -235,6 +262,54 @@ class TestWaitForLogsMatchingFunc(unittest.TestCase):
         # If this doesn't raise an exception, the test passes.
         self.wflm(con, EqualsMatcher('\u00feorn'), encoding='latin1')
 
+    def test_split_line(self):
+        """
+        A line that is split over several chunks is matched as a whole.
+        """
+        con = self.mkcontainer([
+            (0, b'hel'),
+            (0.05, b'lo\n'),
+        ])
+        self.assertEqual(self.wflm(con, EqualsMatcher('hello')), 'hello')
+
+    def test_bytes_matching(self):
+        """
+        Lines are matched without decoding them if the matcher can match
+        bytes, and the matching line is decoded and stripped in the same way
+        as it would be otherwise.
+        """
+        con = self.mkcontainer([
+            (0, b'hi\n'),
+            (0, b'hello \xc3\xbeorn\xc2\xa0\x1c\r\n'),
+        ])
+        line = self.wflm(con, RegexMatcher(r'^hello .*rn$'))
+        self.assertEqual(line, 'hello \u00feorn')
+
+    def test_bytes_matching_unsupported(self):
+        """
+        Lines are decoded for matchers that can't match bytes.
+        """
+        con = self.mkcontainer([
+            (0, b'hello \xc3\xbeorn\n'),
+        ])
+        line = self.wflm(con, RegexMatcher(r'^hello \w+$'))
+        self.assertEqual(line, 'hello \u00feorn')
+        con = self.mkcontainer([
+            (0, b'hello\n'),
+        ])
+        self.assertEqual(self.wflm(con, lambda line: line == 'hello'), 'hello')
+
+    def test_bytes_matching_inline_flags(self):
+        """
+        Patterns with inline flags that aren't valid in bytes patterns are
+        matched as text rather than raising an error.
+        """
+        con = self.mkcontainer([
+            (0, b'hello\n'),
+            (0, b'ready\n'),
+        ])
+        self.assertEqual(self.wflm(con, RegexMatcher('(?u)ready')), 'ready')
+
     def test_kwargs(self):
         """
         We pass through any kwargs we don't recognise to docker.
@@ -247,6 +322,54 @@ class TestWaitForLogsMatchingFunc(unittest.TestCase):
         self.wflm(con, EqualsMatcher('hi'), stdout=False)
 
 
+class FakeTimestampedLogsContainer:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def logs(self, timestamps=False, tail='all'):
+        assert timestamps
+        return b''.join(self.lines[-tail:])
+
+
+class TestLogMark(unittest.TestCase):
+    def test_log_mark(self):
+        """
+        A mark has the timestamp of the last log line and the number of lines
+        with that timestamp.
+        """
+        con = FakeTimestampedLogsContainer([
+            b'2018-01-01T00:00:01.000000001Z a\n',
+            b'2018-01-01T00:00:01.5Z b\n',
+            b'2018-01-01T00:00:01.500000000Z c\n',
+        ])
+        self.assertEqual(log_mark(con), LogMark(1514764801500000000, 2))
+
+    def test_log_mark_no_logs(self):
+        """
+        A mark for a container with no logs has no timestamp.
+        """
+        con = FakeTimestampedLogsContainer([])
+        self.assertEqual(log_mark(con), LogMark(None, 0))
+
+    def test_lines_since(self):
+        """
+        Only the lines after the mark are kept, without their timestamps,
+        including lines with the same timestamp as the mark.
+        """
+        lines = [
+            b'2018-01-01T00:00:01.000000001Z a\n',
+            b'2018-01-01T00:00:01.5Z b\n',
+            b'2018-01-01T00:00:01.5Z c\n',
+            b'2018-01-01T00:00:01.5Z d\n',
+            b'2018-01-01T00:00:02Z e\n',
+        ]
+        mark = LogMark(1514764801500000000, 2)
+        self.assertEqual(list(_lines_since(lines, mark)), [b'd\n', b'e\n'])
+        self.assertEqual(list(_lines_since(lines, mark, timestamps=True)),
+                         lines[3:])
+        self.assertEqual(len(list(_lines_since(lines, LogMark(None)))), 5)
+
+
 class FakeAndRealContainerMixin:
     def wflm(self, con, matcher, timeout=0.5, **kw):
         return wait_for_logs_matching(con, matcher, timeout=timeout, **kw)
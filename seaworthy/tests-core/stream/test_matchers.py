@@ -1,3 +1,5 @@
+import random
+import re
 import unittest
 
 from seaworthy.stream.matchers import (
@@ -17,6 +19,22 @@ class TestEqualsMatcher(unittest.TestCase):
         self.assertEqual(str(matcher), "EqualsMatcher('bar')")
         self.assertEqual(repr(matcher), str(matcher))
 
+    def test_bytes(self):
+        """
+        Matches bytes that are the expected string encoded, if the string can
+        be encoded.
+        """
+        matcher = EqualsMatcher('\u00feorn')
+        self.assertTrue(matcher.use_bytes('utf-8'))
+        self.assertTrue(matcher(b'\xc3\xbeorn'))
+        self.assertFalse(matcher(b'\xfeorn'))
+        self.assertTrue(matcher('\u00feorn'))
+        self.assertTrue(matcher.use_bytes('latin1'))
+        self.assertTrue(matcher(b'\xfeorn'))
+        self.assertFalse(matcher.use_bytes('ascii'))
+        self.assertFalse(matcher.use_bytes('utf-16'))
+        self.assertFalse(EqualsMatcher(1).use_bytes('utf-8'))
+
 
 class TestRegexMatcher(unittest.TestCase):
     def test_matching(self):
@@ -33,6 +51,28 @@ class TestRegexMatcher(unittest.TestCase):
         self.assertEqual(str(matcher), "RegexMatcher('^bar')")
         self.assertEqual(repr(matcher), str(matcher))
 
+    def test_bytes(self):
+        """
+        Matches bytes with a bytes version of the pattern.
+        """
+        matcher = RegexMatcher(r'^foo.*(bar|baz)\.$')
+        self.assertTrue(matcher.use_bytes('utf-8'))
+        self.assertTrue(matcher('foo \u00fe baz.'.encode('utf-8')))
+        self.assertFalse(matcher(b'barfoo.'))
+        self.assertTrue(matcher('foobar.'))
+
+    def test_bytes_unsafe(self):
+        """
+        Patterns that could match differently in bytes aren't used for bytes.
+        """
+        for pattern in [r'\w+', r'a.b', r'[^a]', r'(?i)foo', r'(?mi:foo)',
+                        r'(?u)foo', r'(?s)foo', r'\xfe', r'\376', '\u00fe']:
+            self.assertFalse(RegexMatcher(pattern).use_bytes('utf-8'))
+        matcher = RegexMatcher(re.compile('a', re.IGNORECASE))
+        self.assertFalse(matcher.use_bytes('utf-8'))
+        self.assertFalse(RegexMatcher(b'a').use_bytes('utf-8'))
+        self.assertFalse(RegexMatcher('a').use_bytes('utf-16'))
+
 
 class TestOrderedMatcher(unittest.TestCase):
     def test_matching(self):
@@ -198,3 +238,94 @@ class TestUnorderedMatcher(unittest.TestCase):
             "UnorderedMatcher(matched=[EqualsMatcher('foo'), "
             "RegexMatcher('^bar')], unmatched=[])")
         self.assertEqual(repr(matcher), str(matcher))
+
+    def test_first_matcher_wins(self):
+        """
+        When an item matches more than one matcher, the first of them in the
+        order given is matched, wherever in the item the others match.
+        """
+        matcher = UnorderedMatcher.by_regex('world', 'hello', 'o')
+        self.assertFalse(matcher('hello world'))
+        self.assertEqual(
+            matcher.args_str(),
+            "matched=[RegexMatcher('world')], "
+            "unmatched=[RegexMatcher('hello'), RegexMatcher('o')]")
+
+        matcher = UnorderedMatcher(
+            RegexMatcher('o'), EqualsMatcher('hello'), RegexMatcher('^h'))
+        self.assertFalse(matcher('hello'))
+        self.assertEqual(matcher._used_matchers, [matcher._matchers[0]])
+        self.assertFalse(matcher('hello'))
+        self.assertEqual(matcher._used_matchers[1], matcher._matchers[1])
+
+    def test_regex_features(self):
+        """
+        Patterns with anchors, flags, groups and backreferences match the same
+        as they do on their own.
+        """
+        matcher = UnorderedMatcher.by_regex(
+            r'^b', r'(?i)HELLO', r'(\w)\1', r'(?P<x>a)(?P=x)', r'c$')
+        self.assertFalse(matcher('abc'))
+        self.assertEqual(len(matcher._used_matchers), 1)
+        self.assertFalse(matcher('bcd'))
+        self.assertFalse(matcher('Hello'))
+        self.assertFalse(matcher('letter'))
+        self.assertTrue(matcher('baab'))
+
+    def test_same_as_sequential(self):
+        """
+        Matching random items gives the same results as trying each unused
+        matcher in turn.
+        """
+        rand = random.Random(42)
+        patterns = ['^a', 'b$', 'ab', 'a.c', '[cd]+', '^$', 'b(?=c)', 'x|y',
+                    '(?P<g>a)b', '(?P<g>b)c', r'(a)\1']
+        for _ in range(100):
+            matchers = [RegexMatcher(p) for p in rand.sample(patterns, 6)]
+            matchers.append(EqualsMatcher('abc'))
+            rand.shuffle(matchers)
+            matcher = UnorderedMatcher(*matchers)
+            unused = list(matchers)
+            for _ in range(30):
+                if not unused:
+                    break
+                item = ''.join(rand.choice('abcxy') for _ in range(4))
+                for m in unused:
+                    if m(item):
+                        unused.remove(m)
+                        break
+                self.assertEqual(matcher(item), not unused)
+                self.assertEqual(matcher._unused_matchers, unused)
+
+    def test_bytes(self):
+        """
+        Matching encoded items gives the same results as matching the items,
+        and the combined regex is used for them too.
+        """
+        patterns = ['^a', 'b$', 'ab', '[cd]+', 'x|y', '(?P<g>a)b', 'a.*c']
+        rand = random.Random(42)
+        for _ in range(50):
+            matchers = [UnorderedMatcher(*[
+                RegexMatcher(p) for p in patterns] + [EqualsMatcher('abc')])
+                for _ in range(2)]
+            self.assertTrue(matchers[1].use_bytes('utf-8'))
+            self.assertFalse(matchers[1](b'zzz'))
+            self.assertIsNotNone(matchers[1]._bytes_regex)
+            for _ in range(10):
+                item = ''.join(rand.choice('abcxy\u00fe') for _ in range(4))
+                self.assertEqual(
+                    matchers[0](item), matchers[1](item.encode('utf-8')))
+                self.assertEqual(str(matchers[0]), str(matchers[1]))
+                if not matchers[0]._unused:
+                    break
+
+    def test_bytes_inline_flags(self):
+        """
+        Patterns with inline flags that aren't allowed in bytes patterns are
+        still matched as text.
+        """
+        matcher = UnorderedMatcher(
+            RegexMatcher('(?u)ready'), RegexMatcher('a'))
+        self.assertFalse(matcher.use_bytes('utf-8'))
+        self.assertFalse(matcher('ready'))
+        self.assertTrue(matcher('a'))
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+import unittest
+
+import docker
+
+from seaworthy.checks import dockertest
+from seaworthy.stream.pull import (
+    PullProgress, _PullStream, follow_pull, log_progress, pull_image)
+
+from .fake_stream import FakeStreamSource
+
+
+def downloading(layer, current, total):
+    return {'status': 'Downloading', 'id': layer,
+            'progressDetail': {'current': current, 'total': total}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPullProgress(unittest.TestCase):
+    def test_progress(self):
+        """
+        Progress is aggregated over the layers being downloaded, and gives a
+        rate and an estimate of the remaining time.
+        """
+        clock = FakeClock()
+        progress = PullProgress('busybox:latest', clock=clock)
+        self.assertEqual((progress.downloaded, progress.total), (0, 0))
+        self.assertIsNone(progress.eta)
+
+        progress.update({'status': 'Pulling fs layer', 'id': 'a'})
+        progress.update({'status': 'Already exists', 'id': 'c'})
+        progress.update(downloading('a', 1000, 4000))
+        progress.update(downloading('b', 1000, 2000))
+        clock.now += 2
+        self.assertEqual(progress.status, 'Downloading')
+        self.assertEqual((progress.downloaded, progress.total), (2000, 6000))
+        self.assertEqual(progress.rate, 1000)
+        self.assertEqual(progress.eta, 4)
+        self.assertEqual(
+            str(progress),
+            "Pulling 'busybox:latest': 2.0 kB of 6.0 kB (1.0 kB/s, ETA 4s)")
+
+        progress.update({'status': 'Download complete', 'id': 'b'})
+        progress.update({'status': 'Extracting', 'id': 'b',
+                         'progressDetail': {'current': 10, 'total': 2000}})
+        self.assertEqual((progress.downloaded, progress.total), (3000, 6000))
+
+        progress.update({'status': 'Pull complete', 'id': 'a'})
+        self.assertEqual((progress.downloaded, progress.total), (6000, 6000))
+        self.assertEqual(progress.eta, 0)
+
+
+class TestFollowPullFunc(unittest.TestCase):
+    def test_progress(self):
+        """
+        The progress callback is called after each event, and the final
+        progress is returned.
+        """
+        events = [
+            downloading('a', 10, 20),
+            {'status': 'Pull complete', 'id': 'a'},
+            {'status': 'Status: Downloaded newer image for busybox:latest'},
+        ]
+        seen = []
+        progress = follow_pull(
+            iter(events), 'busybox:latest',
+            progress=lambda p: seen.append((p.status, p.downloaded)))
+        self.assertEqual(seen, [
+            ('Downloading', 10),
+            ('Pull complete', 20),
+            ('Status: Downloaded newer image for busybox:latest', 20),
+        ])
+        self.assertEqual(progress.total, 20)
+
+    def test_error(self):
+        """
+        An error in the stream is raised.
+        """
+        events = [downloading('a', 10, 20), {'error': 'no space left'}]
+        with self.assertRaises(docker.errors.APIError) as cm:
+            follow_pull(iter(events), 'busybox:latest')
+        self.assertIn(
+            "Error pulling image 'busybox:latest': no space left",
+            str(cm.exception))
+
+    def test_timeout(self):
+        """
+        A stalled pull is aborted when the timeout is reached.
+        """
+        src = FakeStreamSource([
+            (0.01, downloading('a', 10, 20)),
+            (1, downloading('a', 15, 20)),
+        ])
+        self.addCleanup(src.cleanup)
+        seen = []
+        with self.assertRaises(TimeoutError) as cm:
+            follow_pull(src.stream_items('all', {}), 'busybox:latest',
+                        progress=seen.append, timeout=0.2)
+        self.assertEqual(str(cm.exception),
+                         "Timeout (0.2s) pulling image 'busybox:latest'.")
+        self.assertEqual(len(seen), 1)
+
+
+class TestPullStream(unittest.TestCase):
+    def test_events(self):
+        """
+        The stream iterates over the events, and raises the error that the
+        events raise.
+        """
+        def events():
+            yield {'status': 'Pulling'}
+            raise docker.errors.APIError('broken')
+
+        stream = _PullStream(events())
+        self.assertEqual(next(stream), {'status': 'Pulling'})
+        with self.assertRaises(docker.errors.APIError):
+            next(stream)
+
+    def test_timeout(self):
+        """
+        A pull whose events are blocked is aborted when the timeout is
+        reached, and the events are closed once they're unblocked.
+        """
+        unblock = threading.Event()
+        closed = threading.Event()
+
+        def events():
+            try:
+                yield downloading('a', 10, 20)
+                unblock.wait(5)
+                yield downloading('a', 15, 20)
+            finally:
+                closed.set()
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            follow_pull(_PullStream(events()), 'busybox:latest', timeout=0.2)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(closed.is_set())
+        unblock.set()
+        self.assertTrue(closed.wait(1))
+
+
+class TestLogProgressFunc(unittest.TestCase):
+    def test_interval(self):
+        """
+        Progress is logged at most once per interval.
+        """
+        clock = FakeClock()
+        progress = PullProgress('busybox:latest', clock=clock)
+        callback = log_progress(interval=5, level=logging.INFO)
+        with self.assertLogs('seaworthy', level='INFO') as cm:
+            for _ in range(4):
+                callback(progress)
+                clock.now += 2
+        self.assertEqual(len(cm.records), 2)
+
+
+@dockertest()
+class TestPullImageFunc(unittest.TestCase):
+    def setUp(self):
+        self.client = docker.client.from_env()
+        self.addCleanup(self.client.api.close)
+
+    def test_pull(self):
+        """
+        We can pull an image and follow its progress.
+        """
+        seen = []
+        image = pull_image(
+            self.client, 'busybox', progress=seen.append, timeout=60)
+        self.assertIn('busybox:latest', image.tags)
+        self.assertTrue(seen)
+
+    def test_pull_missing(self):
+        """
+        Pulling an image that doesn't exist raises an error.
+        """
+        with self.assertRaises(docker.errors.APIError):
+            pull_image(self.client, 'seaworthy/does-not-exist', timeout=60)
@@ -0,0 +1,145 @@
+import gc
+import os
+import re
+import shutil
+import socket
+import tempfile
+import time
+import unittest
+import warnings
+
+from seaworthy.stream.recorder import LogRecorder
+
+from .test_hub import FakeMultiplexedContainer
+from .test_logs import FakeLogsContainer
+from .test_timeout import frame
+
+
+class TestLogRecorder(unittest.TestCase):
+    def make_recorder(self, items, close_timeout=0.1):
+        con = FakeLogsContainer(items, close_timeout=close_timeout)
+        self.addCleanup(con.cleanup)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        recorder = LogRecorder(con, os.path.join(tmpdir, 'con.log'))
+        self.addCleanup(recorder.close)
+        recorder.start()
+        return recorder
+
+    def wait_finished(self, recorder):
+        deadline = time.monotonic() + 1
+        while not recorder.finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(recorder.finished)
+
+    def test_record(self):
+        """
+        The logs are recorded to the file as whole lines.
+        """
+        recorder = self.make_recorder([(0, b'a\nb'), (0, b'c\n')])
+        self.wait_finished(recorder)
+        with open(recorder.path, 'rb') as f:
+            self.assertEqual(f.read(), b'a\nbc\n')
+
+    def test_interleaved_lines(self):
+        """
+        Partial lines written to stdout and stderr at the same time are
+        recorded separately, so they aren't mixed up.
+        """
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        self.addCleanup(client.close)
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        recorder = LogRecorder(
+            FakeMultiplexedContainer(client), os.path.join(tmpdir, 'con.log'))
+        self.addCleanup(recorder.close)
+        recorder.start()
+        server.sendall(
+            frame(b'out 1, ') + frame(b'err 1, ', 2) + frame(b'part 2\nout') +
+            frame(b'part 2\n', 2) + frame(b' 2\n'))
+        server.shutdown(socket.SHUT_WR)
+        self.wait_finished(recorder)
+        with open(recorder.path, 'rb') as f:
+            self.assertEqual(
+                f.read(), b'out 1, part 2\nerr 1, part 2\nout 2\n')
+
+    def test_tail(self):
+        """
+        We can get the last few lines that have been recorded, while the
+        container is still logging.
+        """
+        recorder = self.make_recorder(
+            [(0, b'a\n'), (0, b'b\n'), (0, b'c\n')], close_timeout=1)
+        time.sleep(0.05)
+        self.assertEqual(recorder.tail(2), b'b\nc\n')
+        self.assertEqual(recorder.tail(), b'a\nb\nc\n')
+        self.assertEqual(recorder.tail(0), b'')
+
+    def test_tail_empty(self):
+        """
+        Tailing before anything has been logged gives nothing.
+        """
+        recorder = self.make_recorder([])
+        self.assertEqual(recorder.tail(), b'')
+        self.assertEqual(recorder.search('a'), [])
+
+    def test_search(self):
+        """
+        We get each matching line once, without its newline, and ^ and $
+        match at the start and end of each line.
+        """
+        recorder = self.make_recorder([
+            (0, b'hello\n'), (0, b'world\n'), (0, b'hello world\n'),
+            (0, b'bye'),
+        ])
+        self.wait_finished(recorder)
+        self.assertEqual(recorder.search('o'),
+                         [b'hello', b'world', b'hello world'])
+        self.assertEqual(recorder.search(b'^world$'), [b'world'])
+        self.assertEqual(recorder.search('o\nw'), [b'hello\nworld'])
+        self.assertEqual(recorder.search(re.compile(b'e$')), [b'bye'])
+
+    def test_close(self):
+        """
+        Closing the recorder stops the recording, and keeps the file.
+        """
+        recorder = self.make_recorder([(0, b'a\n'), (1, b'b\n')],
+                                      close_timeout=2)
+        time.sleep(0.05)
+        recorder.close()
+        self.wait_finished(recorder)
+        self.assertEqual(recorder.tail(), b'a\n')
+        self.assertTrue(os.path.exists(recorder.path))
+
+    def test_close_timeout(self):
+        """
+        Closing the recorder with a timeout waits for the stream to end by
+        itself, so that the last of the logs are recorded.
+        """
+        recorder = self.make_recorder([(0, b'a\n'), (0.1, b'b\n')])
+        recorder.close(timeout=1)
+        self.assertTrue(recorder.finished)
+        self.assertEqual(recorder.tail(), b'a\nb\n')
+
+    def test_start_error(self):
+        """
+        The file is closed if the log stream can't be opened.
+        """
+        class BrokenContainer:
+            def logs(self, **kw):
+                raise RuntimeError('No logs for you.')
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        recorder = LogRecorder(
+            BrokenContainer(), os.path.join(tmpdir, 'con.log'))
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            with self.assertRaises(RuntimeError):
+                recorder.start()
+            gc.collect()
+        self.assertEqual(
+            [w for w in caught if issubclass(w.category, ResourceWarning)],
+            [])
+        self.assertIsNone(recorder._file)
@@ -0,0 +1,314 @@
+import io
+import socket
+import struct
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from seaworthy.stream._timeout import (
+    _DeadlineScheduler, _scheduler, multiplexed_stream_timeout,
+    stream_timeout)
+
+
+class FakeResponse:
+    def __init__(self):
+        self.close_count = 0
+
+    def close(self):
+        self.close_count += 1
+
+
+class BlockingStream:
+    """
+    A stream that emits some items and then blocks until it's closed, like a
+    stream from a container that stops logging.
+    """
+
+    def __init__(self, items=()):
+        self._items = list(items)
+        self._closed = threading.Event()
+        self.close_count = 0
+        self._response = FakeResponse()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._items:
+            return self._items.pop(0)
+        self._closed.wait()
+        raise StopIteration
+
+    def close(self):
+        self.close_count += 1
+        self._closed.set()
+
+
+class TestDeadlineScheduler(unittest.TestCase):
+    def test_order(self):
+        """
+        Callbacks are called in deadline order.
+        """
+        scheduler = _DeadlineScheduler()
+        called = []
+        done = threading.Event()
+        scheduler.schedule(0.03, lambda: called.append(3) or done.set())
+        scheduler.schedule(0.01, lambda: called.append(1))
+        scheduler.schedule(0.02, lambda: called.append(2))
+        self.assertTrue(done.wait(1))
+        self.assertEqual(called, [1, 2, 3])
+        self.assertEqual(len(scheduler), 0)
+
+    def test_many_deadlines(self):
+        """
+        Thousands of deadlines share a single thread, and cancelled deadlines
+        are never called.
+        """
+        scheduler = _DeadlineScheduler()
+        called = []
+        lock = threading.Lock()
+
+        def callback(i):
+            with lock:
+                called.append(i)
+
+        threads = threading.active_count()
+        entries = [scheduler.schedule(0.2 + 0.001 * (i % 100),
+                                      lambda i=i: callback(i))
+                   for i in range(5000)]
+        self.assertLessEqual(threading.active_count(), threads + 1)
+        for entry in entries[1::2]:
+            scheduler.cancel(entry)
+
+        deadline = time.monotonic() + 5
+        while len(called) < 2500 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(len(scheduler), 0)
+        self.assertEqual(sorted(called), list(range(0, 5000, 2)))
+
+    def test_cancel_compacts(self):
+        """
+        Cancelled deadlines don't pile up in the heap.
+        """
+        scheduler = _DeadlineScheduler()
+        for _ in range(1000):
+            scheduler.cancel(scheduler.schedule(60, lambda: None))
+        self.assertLess(len(scheduler._heap), 200)
+        self.assertEqual(len(scheduler), 0)
+
+
+class TestStreamTimeoutFunc(unittest.TestCase):
+    def test_items(self):
+        """
+        Items are passed through, and the response is closed once we're done.
+        """
+        stream = BlockingStream([1, 2, 3])
+        lines = []
+        for item in stream_timeout(stream, 1):
+            lines.append(item)
+            if item == 3:
+                break
+        self.assertEqual(lines, [1, 2, 3])
+        self.assertEqual(stream.close_count, 0)
+        self.assertEqual(stream._response.close_count, 1)
+
+    def test_timeout(self):
+        """
+        A TimeoutError is raised when the timeout is reached, and the stream
+        and its response are each closed once.
+        """
+        stream = BlockingStream([1])
+        lines = []
+        with self.assertRaises(TimeoutError) as cm:
+            for item in stream_timeout(stream, 0.05, 'Timeout!'):
+                lines.append(item)
+        self.assertEqual(str(cm.exception), 'Timeout!')
+        self.assertEqual(lines, [1])
+        self.assertEqual(stream.close_count, 1)
+        self.assertEqual(stream._response.close_count, 1)
+
+    def test_stop(self):
+        """
+        The stream is closed and iteration stops without an error when the
+        stop event is set.
+        """
+        stream = BlockingStream([1])
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        self.assertEqual(list(stream_timeout(stream, 5, stop=stop)), [1])
+        self.assertEqual(stream.close_count, 1)
+        self.assertEqual(stream._response.close_count, 1)
+
+    def test_stop_no_thread(self):
+        """
+        The stop event is checked in the scheduler's thread, even without a
+        timeout, rather than in a thread for each stream.
+        """
+        _scheduler.schedule(0, lambda: None)
+        threads = threading.active_count()
+        stop = threading.Event()
+        items = stream_timeout(BlockingStream([1]), None, stop=stop)
+        self.assertEqual(next(items), 1)
+        self.assertEqual(threading.active_count(), threads)
+        stop.set()
+        self.assertEqual(list(items), [])
+
+    def test_stress(self):
+        """
+        Thousands of concurrent timed streams all time out or finish cleanly,
+        without a thread per stream, and each stream and response is closed
+        at most once.
+        """
+        streams = [BlockingStream([i]) for i in range(2000)]
+
+        def consume(i):
+            # Half of the streams stop early and half of them time out.
+            timeout = 0.05 + 0.0001 * i
+            try:
+                for item in stream_timeout(streams[i], timeout):
+                    if i % 2:
+                        return 'done'
+            except TimeoutError:
+                return 'timeout'
+
+        pending = len(_scheduler)
+        threads = threading.active_count()
+        with ThreadPoolExecutor(max_workers=500) as executor:
+            results = list(executor.map(consume, range(2000)))
+            # Only the workers and the scheduler thread, if it hadn't been
+            # started yet.
+            self.assertLessEqual(threading.active_count(), threads + 501)
+
+        self.assertEqual(results, ['timeout', 'done'] * 1000)
+        self.assertEqual(
+            [s.close_count for s in streams], [1, 0] * 1000)
+        self.assertEqual(
+            [s._response.close_count for s in streams], [1] * 2000)
+        self.assertEqual(len(_scheduler), pending)
+
+
+def frame(data, stream=1):
+    return struct.pack('>BxxxL', stream, len(data)) + data
+
+
+class FakeSocketResponse:
+    """
+    A response whose body is read from a real socket, like a streaming
+    response from the Docker client.
+    """
+
+    def __init__(self, sock):
+        fp = io.BufferedReader(socket.SocketIO(sock, 'rb'))
+        self.raw = SimpleNamespace(_fp=SimpleNamespace(fp=fp), read=fp.read)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestMultiplexedStreamTimeoutFunc(unittest.TestCase):
+    def make_stream(self):
+        server, client = socket.socketpair()
+        self.addCleanup(server.close)
+        self.addCleanup(client.close)
+        stream = BlockingStream()
+        stream._response = FakeSocketResponse(client)
+        return server, stream
+
+    def test_frames(self):
+        """
+        Frames are read from the socket, and the response is closed at the
+        end of the stream.
+        """
+        server, stream = self.make_stream()
+        server.sendall(frame(b'a\n') + frame(b'') + frame(b'b\n', 2))
+        server.shutdown(socket.SHUT_WR)
+        frames = list(multiplexed_stream_timeout(stream, 1))
+        self.assertEqual(frames, [b'a\n', b'b\n'])
+        self.assertTrue(stream._response.closed)
+        self.assertEqual(stream.close_count, 0)
+
+    def test_demux(self):
+        """
+        Frames can be tagged with their stream types.
+        """
+        server, stream = self.make_stream()
+        server.sendall(frame(b'a\n') + frame(b'b\n', 2))
+        server.shutdown(socket.SHUT_WR)
+        frames = list(multiplexed_stream_timeout(stream, 1, demux=True))
+        self.assertEqual(frames, [(1, b'a\n'), (2, b'b\n')])
+
+    def test_timeout(self):
+        """
+        The timeout is reached in the reading thread, without closing the
+        stream from another thread.
+        """
+        server, stream = self.make_stream()
+        server.sendall(frame(b'a\n'))
+        pending = len(_scheduler)
+        frames = []
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError) as cm:
+            for data in multiplexed_stream_timeout(stream, 0.1, 'Timeout!'):
+                frames.append(data)
+                self.assertEqual(len(_scheduler), pending)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(str(cm.exception), 'Timeout!')
+        self.assertEqual(frames, [b'a\n'])
+        self.assertTrue(stream._response.closed)
+        self.assertEqual(stream.close_count, 0)
+
+    def test_stop(self):
+        """
+        Setting the stop event shuts the socket down, so that a blocked read
+        returns and iteration stops without an error.
+        """
+        server, stream = self.make_stream()
+        server.sendall(frame(b'a\n'))
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        start = time.monotonic()
+        frames = list(multiplexed_stream_timeout(stream, 5, stop=stop))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(frames, [b'a\n'])
+        self.assertTrue(stream._response.closed)
+
+    def test_stop_no_thread(self):
+        """
+        The stop event is checked in the scheduler's thread, even without a
+        timeout, rather than in a thread for each stream.
+        """
+        server, stream = self.make_stream()
+        server.sendall(frame(b'a\n'))
+        _scheduler.schedule(0, lambda: None)
+        threads = threading.active_count()
+        stop = threading.Event()
+        frames = multiplexed_stream_timeout(stream, None, stop=stop)
+        self.assertEqual(next(frames), b'a\n')
+        self.assertEqual(threading.active_count(), threads)
+        stop.set()
+        self.assertEqual(list(frames), [])
+        self.assertTrue(stream._response.closed)
+
+    def test_fallback(self):
+        """
+        If the socket can't be reached, we fall back to closing the stream
+        when the timeout is reached.
+        """
+        stream = BlockingStream([b'a\n'])
+        frames = []
+        with self.assertRaises(TimeoutError):
+            for data in multiplexed_stream_timeout(stream, 0.05):
+                frames.append(data)
+        self.assertEqual(frames, [b'a\n'])
+        self.assertEqual(stream.close_count, 1)
+
+        # The stream types aren't known.
+        stream = BlockingStream([b'a\n'])
+        frames = []
+        with self.assertRaises(TimeoutError):
+            for data in multiplexed_stream_timeout(stream, 0.05, demux=True):
+                frames.append(data)
+        self.assertEqual(frames, [(None, b'a\n')])
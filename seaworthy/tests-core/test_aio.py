@@ -0,0 +1,244 @@
+import asyncio
+import socket
+import time
+import unittest
+
+import responses
+
+from stream.test_logs import FakeLogsContainer
+
+from test_client import FakeStatusClient
+
+try:
+    from seaworthy.aio import (
+        AsyncDockerHelper, stream_logs, wait_for_logs_matching, wait_for_port,
+        wait_for_response)
+    from seaworthy.aio._executor import AsyncIterator
+except SyntaxError:
+    raise unittest.SkipTest('The asyncio API requires Python 3.5 or newer.')
+from seaworthy.checks import docker_client, dockertest
+from seaworthy.client import ContainerHttpClient
+from seaworthy.definitions import ContainerDefinition
+from seaworthy.helpers import fetch_images
+from seaworthy.stream.matchers import EqualsMatcher
+
+IMG = 'alpine:latest'
+
+
+class AsyncTestCase(unittest.TestCase):
+    # The tests don't use the async syntax so that they can be skipped on
+    # Python 3.4 rather than failing to compile.
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.addCleanup(asyncio.set_event_loop, None)
+        self.addCleanup(self.loop.close)
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def collect(self, stream):
+        lines = []
+        while True:
+            try:
+                lines.append(self.run_async(stream.__anext__()))
+            except StopAsyncIteration:
+                return lines
+
+    def mkcontainer(self, *args, **kw):
+        kw.setdefault('close_timeout', 0.1)
+        con = FakeLogsContainer(*args, **kw)
+        self.addCleanup(con.cleanup)
+        return con
+
+
+class TestStreamLogsFunc(AsyncTestCase):
+    def test_stream(self):
+        """
+        We can iterate over log lines asynchronously.
+        """
+        con = self.mkcontainer([(0, b'a\n'), (0.05, b'b\n')])
+        lines = self.collect(stream_logs(con, timeout=1))
+        self.assertEqual(lines, [b'a\n', b'b\n'])
+
+    def test_timeout(self):
+        """
+        A TimeoutError is raised when the timeout is reached.
+        """
+        con = self.mkcontainer([(0, b'a\n'), (1, b'b\n')])
+        stream = stream_logs(con, timeout=0.1)
+        self.assertEqual(self.run_async(stream.__anext__()), b'a\n')
+        with self.assertRaises(TimeoutError):
+            self.run_async(stream.__anext__())
+
+    def test_aclose(self):
+        """
+        Closing the iterator early closes the generator it iterates over,
+        and iteration stops.
+        """
+        closed = []
+
+        def lines():
+            try:
+                yield b'a\n'
+                yield b'b\n'
+            finally:
+                closed.append(True)
+
+        stream = AsyncIterator(lines)
+        self.assertEqual(self.run_async(stream.__anext__()), b'a\n')
+        self.assertIs(self.run_async(stream.__aenter__()), stream)
+        self.run_async(stream.__aexit__(None, None, None))
+        self.assertEqual(closed, [True])
+        with self.assertRaises(StopAsyncIteration):
+            self.run_async(stream.__anext__())
+
+
+class TestWaitForLogsMatchingFunc(AsyncTestCase):
+    def test_concurrent(self):
+        """
+        We can wait for logs from several containers at once.
+        """
+        cons = [self.mkcontainer([(0.1, b'hello\n')]) for _ in range(5)]
+        start = time.monotonic()
+        lines = self.run_async(asyncio.gather(*[
+            wait_for_logs_matching(con, EqualsMatcher('hello'), timeout=1)
+            for con in cons]))
+        self.assertEqual(lines, ['hello'] * 5)
+        self.assertLess(time.monotonic() - start, 0.4)
+
+
+class TestWaitForResponseFunc(AsyncTestCase):
+    @responses.activate
+    def test_error_then_success(self):
+        """
+        We retry until a request succeeds.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(
+            responses.GET, 'http://127.0.0.1:12345/', body=Exception('KABOOM'))
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=200)
+        self.run_async(wait_for_response(client, 1))
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_check(self):
+        """
+        The check callable can stop us from waiting any longer.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(
+            responses.GET, 'http://127.0.0.1:12345/', body=Exception('KABOOM'))
+
+        def check():
+            raise RuntimeError('Container exited.')
+
+        with self.assertRaises(RuntimeError):
+            self.run_async(wait_for_response(client, 10, check=check))
+
+    @responses.activate
+    def test_expected_status(self):
+        """
+        Responses with unexpected status codes are retried.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=503)
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=200)
+        response = self.run_async(
+            wait_for_response(client, 1, expected_status={200}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_expected_status_closes_responses(self):
+        """
+        Responses with unexpected status codes are closed before retrying.
+        """
+        client = FakeStatusClient([503, 200])
+        response = self.run_async(
+            wait_for_response(client, 1, expected_status={200}))
+        self.assertIs(response, client.responses[-1])
+        self.assertEqual(
+            [(r.status_code, r.closed) for r in client.responses],
+            [(503, True), (200, False)])
+
+    @responses.activate
+    def test_tcp_first(self):
+        """
+        With ``tcp_first``, no requests are made until the port accepts
+        connections.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            client = ContainerHttpClient('127.0.0.1', port)
+            responses.add(
+                responses.GET, 'http://127.0.0.1:{}/'.format(port), status=200)
+            with self.assertRaises(TimeoutError):
+                self.run_async(wait_for_response(client, 0.2, tcp_first=True))
+            self.assertEqual(len(responses.calls), 0)
+
+            sock.listen()
+            self.run_async(wait_for_response(client, 1, tcp_first=True))
+            self.assertEqual(len(responses.calls), 1)
+
+
+class TestWaitForPortFunc(AsyncTestCase):
+    def test_wait(self):
+        """
+        We can wait for several ports at once on the event loop.
+        """
+        socks = [socket.socket() for _ in range(3)]
+        ports = []
+        for sock in socks:
+            self.addCleanup(sock.close)
+            sock.bind(('127.0.0.1', 0))
+            ports.append(sock.getsockname()[1])
+            self.loop.call_later(0.1, sock.listen)
+        start = time.monotonic()
+        self.run_async(asyncio.gather(
+            *[wait_for_port('127.0.0.1', port, 1) for port in ports]))
+        self.assertLess(time.monotonic() - start, 0.5)
+
+        with self.assertRaises(TimeoutError):
+            sock = socket.socket()
+            self.addCleanup(sock.close)
+            sock.bind(('127.0.0.1', 0))
+            self.run_async(
+                wait_for_port('127.0.0.1', sock.getsockname()[1], 0.2))
+
+
+@dockertest()
+class TestAsyncDockerHelper(AsyncTestCase):
+    @classmethod
+    def setUpClass(cls):
+        with docker_client() as client:
+            fetch_images(client, [IMG])
+
+    def test_setup_concurrently(self):
+        """
+        We can set up several containers at once, wait for their logs, and
+        tear everything down.
+        """
+        definitions = [
+            ContainerDefinition(
+                'test{}'.format(i), IMG, wait_patterns=['ready'],
+                create_kwargs={
+                    'command': ['sh', '-c', 'sleep 0.5; echo ready; sleep 10'],
+                })
+            for i in range(3)]
+
+        helper = AsyncDockerHelper()
+        self.addCleanup(self.run_async, helper.teardown())
+
+        start = time.monotonic()
+        containers = self.run_async(asyncio.gather(
+            *[helper.setup(d) for d in definitions]))
+        # The containers were started at the same time.
+        self.assertLess(time.monotonic() - start, 3 * 0.5 + 1)
+        for container in containers:
+            self.assertEqual(container.definition.status(), 'running')
+
+        self.run_async(
+            containers[0].wait_for_logs_matching(EqualsMatcher('ready')))
+        self.run_async(asyncio.gather(*[c.teardown() for c in containers]))
+        self.assertEqual(helper.sync.containers._ids, set())
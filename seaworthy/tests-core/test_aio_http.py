@@ -0,0 +1,178 @@
+import asyncio
+import socket
+import unittest
+
+from test_aio import AsyncTestCase
+
+try:
+    from aiohttp import web
+    from aio_server import fetch, make_app
+    from seaworthy.aio import wait_for_response
+    from seaworthy.aio.http import AsyncContainerHttpClient
+except SyntaxError:
+    raise unittest.SkipTest('The asyncio API requires Python 3.5 or newer.')
+except ImportError:
+    raise unittest.SkipTest('The async HTTP client requires aiohttp.')
+from seaworthy.client import ContainerHttpClient
+
+
+class FakeContainer:
+    def __init__(self, ports):
+        self.ports = ports
+
+    def get_host_port(self, port):
+        return self.ports[port]
+
+    def get_first_host_port(self):
+        return self.ports[min(self.ports)]
+
+
+class TestAsyncContainerHttpClient(AsyncTestCase):
+    def setUp(self):
+        super().setUp()
+        self.requests = []
+        self.statuses = []
+
+    def start_server(self):
+        """
+        Start a web server on the event loop that records the requests it
+        gets, and responds to each of them with the next of ``self.statuses``,
+        or 200.
+        """
+        app = make_app(self.requests, self.statuses)
+        runner = web.AppRunner(app)
+        self.run_async(runner.setup())
+        self.addCleanup(self.run_async, runner.cleanup())
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        self.run_async(site.start())
+        return site._server.sockets[0].getsockname()[1]
+
+    def make_client(self, port, **kwargs):
+        client = AsyncContainerHttpClient('127.0.0.1', port, **kwargs)
+        self.addCleanup(self.run_async, client.close())
+        return client
+
+    def test_urls(self):
+        """
+        URLs are built in the same way as for the synchronous client.
+        """
+        client = AsyncContainerHttpClient('127.0.0.1', '12345')
+        sync_client = ContainerHttpClient('127.0.0.1', '12345')
+        for path, url_kwargs in [
+                (None, None), ('/', None), ('foo/bar', None),
+                ('/foo/bar', None), ('/baz', {'query': (('a', 'b'),)}),
+                (None, {'fragment': 'frag'})]:
+            self.assertEqual(
+                client._url(path, url_kwargs),
+                sync_client._url(path, url_kwargs))
+
+        client = AsyncContainerHttpClient(
+            '127.0.0.1', '12345', url_defaults={'scheme': 'https'})
+        self.assertEqual(
+            client._url('/foo', None), 'https://127.0.0.1:12345/foo')
+
+    def test_for_container(self):
+        """
+        Clients can be made for the first port of a container, or for a
+        specific port.
+        """
+        container = FakeContainer({
+            '8080/tcp': ('127.0.0.1', '32768'),
+            '9090/tcp': ('0.0.0.0', '32769'),
+        })
+        client = AsyncContainerHttpClient.for_container(container)
+        self.assertEqual(client._url(None, None), 'http://127.0.0.1:32768')
+
+        client = AsyncContainerHttpClient.for_container(
+            container, container_port='9090/tcp', limit=5)
+        self.assertEqual(client._url(None, None), 'http://0.0.0.0:32769')
+        self.assertEqual(client._limit, 5)
+
+    def test_session_and_limit(self):
+        """
+        A connection limit can't be given for a session we didn't make.
+        """
+        with self.assertRaises(ValueError):
+            AsyncContainerHttpClient(
+                '127.0.0.1', '12345', session=object(), limit=5)
+
+    def test_methods(self):
+        """
+        Each method makes a request with that method, to the right path.
+        """
+        port = self.start_server()
+        client = self.make_client(port)
+
+        statuses = []
+        for method, path in [
+                (client.options, '/'), (client.head, 'foo'),
+                (client.get, '/foo/bar'), (client.post, '/post'),
+                (client.put, '/put'), (client.patch, '/patch'),
+                (client.delete, '/delete')]:
+            status, _ = self.run_async(fetch(method, path))
+            statuses.append(status)
+
+        self.assertEqual(statuses, [200] * 7)
+        self.assertEqual([r[:2] for r in self.requests], [
+            ('OPTIONS', '/'), ('HEAD', '/foo'), ('GET', '/foo/bar'),
+            ('POST', '/post'), ('PUT', '/put'), ('PATCH', '/patch'),
+            ('DELETE', '/delete'),
+        ])
+
+    def test_request_kwargs(self):
+        """
+        URL parameters and request parameters are passed on, and a number can
+        be given as the timeout.
+        """
+        port = self.start_server()
+        client = self.make_client(port)
+
+        _, text = self.run_async(fetch(
+            client.post, '/foo', url_kwargs={'query': (('a', 'b'),)},
+            data=b'body', timeout=5))
+        self.assertEqual(text, 'hello')
+        self.assertEqual(self.requests, [('POST', '/foo?a=b', b'body')])
+
+    def test_concurrent(self):
+        """
+        Many requests can be made at once with a connection limit.
+        """
+        port = self.start_server()
+        client = self.make_client(port, limit=5)
+
+        results = self.run_async(asyncio.gather(
+            *[fetch(client.get, '/{}'.format(i)) for i in range(20)]))
+        texts = [text for _, text in results]
+        self.assertEqual(texts, ['hello'] * 20)
+        self.assertEqual(
+            sorted(r[1] for r in self.requests),
+            sorted('/{}'.format(i) for i in range(20)))
+
+    def test_wait_for_response(self):
+        """
+        We can wait for a response with the async client, retrying responses
+        with unexpected status codes.
+        """
+        port = self.start_server()
+        client = self.make_client(port)
+        self.statuses[:] = [503, 503]
+        response = self.run_async(wait_for_response(
+            client, 5, path='/ready', expected_status={200}, tcp_first=True))
+        self.assertEqual(response.status, 200)
+        self.assertEqual(len(self.requests), 3)
+
+        self.statuses[:] = [503] * 100
+        with self.assertRaises(TimeoutError) as cm:
+            self.run_async(wait_for_response(
+                client, 0.3, expected_status={200}))
+        self.assertIn('last status was 503', str(cm.exception))
+
+    def test_wait_for_response_timeout(self):
+        """
+        A TimeoutError is raised if nothing is listening on the port.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            client = self.make_client(sock.getsockname()[1])
+            with self.assertRaises(TimeoutError):
+                self.run_async(wait_for_response(client, 0.2))
@@ -0,0 +1,134 @@
+import contextlib
+import io
+import os
+import unittest
+
+import docker
+
+from seaworthy.checks import docker_client, dockertest
+from seaworthy.cli import main
+from seaworthy.helpers import fetch_images
+
+
+IMG = 'nginx:alpine'
+
+
+@dockertest()
+def setUpModule():  # noqa: N802 (The camelCase is mandated by unittest.)
+    with docker_client() as client:
+        fetch_images(client, [IMG])
+
+
+@dockertest()
+class TestReapCommand(unittest.TestCase):
+    def setUp(self):
+        self.client = docker.client.from_env()
+        self.addCleanup(self.client.api.close)
+
+    def make_orphan(self, name):
+        # These labels look like those of a long-finished session.
+        labels = {
+            'seaworthy.namespace': 'clitest',
+            'seaworthy.session': 'other',
+            'seaworthy.pid': '0',
+            'seaworthy.created': '0',
+        }
+        container = self.client.containers.create(
+            IMG, name='clitest_{}'.format(name), labels=labels)
+        self.addCleanup(self.remove, container)
+        return container
+
+    def remove(self, container):
+        try:
+            container.remove(force=True)
+        except docker.errors.NotFound:
+            pass
+
+    def run_main(self, *args):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = main(list(args))
+        return status, out.getvalue()
+
+    def test_dry_run(self):
+        """
+        With ``--dry-run``, stale resources are listed but not removed.
+        """
+        container = self.make_orphan('dry')
+        status, out = self.run_main(
+            'reap', '--namespace', 'clitest', '--max-age', '60', '--dry-run')
+        self.assertEqual(status, 0)
+        self.assertEqual(out, "Would remove container 'clitest_dry'\n")
+        container.reload()
+
+    def test_reap(self):
+        """
+        Stale resources are removed and reported.
+        """
+        container = self.make_orphan('reaped')
+        status, out = self.run_main(
+            'reap', '--namespace', 'clitest', '--max-age', '60')
+        self.assertEqual(status, 0)
+        self.assertRegex(
+            out, r"^Removed container 'clitest_reaped' \(\d+\.\d\ds\)\n$")
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+    def test_other_namespace(self):
+        """
+        Resources in other namespaces are left alone.
+        """
+        container = self.make_orphan('other')
+        status, out = self.run_main(
+            'reap', '--namespace', 'clitest{}'.format(os.getpid()),
+            '--max-age', '60')
+        self.assertEqual((status, out), (0, ''))
+        container.reload()
+
+
+@dockertest()
+class TestInvalidateCommand(unittest.TestCase):
+    def setUp(self):
+        self.client = docker.client.from_env()
+        self.addCleanup(self.client.api.close)
+
+    def make_kept_alive(self, name):
+        labels = {
+            'seaworthy.namespace': 'clitest',
+            'seaworthy.keep-alive': '',
+            'seaworthy.fingerprint': 'abc',
+        }
+        container = self.client.containers.create(
+            IMG, name='clitest_{}'.format(name), labels=labels)
+        self.addCleanup(self.remove, container)
+        return container
+
+    remove = TestReapCommand.remove
+    run_main = TestReapCommand.run_main
+
+    def test_dry_run(self):
+        """
+        With ``--dry-run``, kept-alive containers are listed but not removed.
+        """
+        container = self.make_kept_alive('kept_dry')
+        status, out = self.run_main(
+            'invalidate', '--namespace', 'clitest', '--dry-run')
+        self.assertEqual(status, 0)
+        self.assertEqual(out, "Would remove container 'clitest_kept_dry'\n")
+        container.reload()
+
+    def test_invalidate(self):
+        """
+        Kept-alive containers are removed and reported, but are never reaped.
+        """
+        container = self.make_kept_alive('kept')
+        status, out = self.run_main(
+            'reap', '--namespace', 'clitest', '--max-age', '0')
+        self.assertEqual((status, out), (0, ''))
+
+        status, out = self.run_main('invalidate', '--namespace', 'clitest')
+        self.assertEqual(status, 0)
+        self.assertRegex(
+            out, r"^Removed container 'clitest_kept' \(\d+\.\d\ds\)\n$")
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
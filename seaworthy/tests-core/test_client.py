@@ -1,11 +1,18 @@
+import gc
+import socket
+import threading
+import time
 import unittest
+import weakref
 
 import requests.exceptions
 
 import responses
 
 from seaworthy.checks import docker_client, dockertest
-from seaworthy.client import ContainerHttpClient, wait_for_response
+from seaworthy.client import (
+    ContainerHttpClient, _build_url, _cached_url, wait_for_port,
+    wait_for_response)
 from seaworthy.definitions import ContainerDefinition
 from seaworthy.helpers import DockerHelper, fetch_images
 
@@ -220,6 +227,93 @@ class TestContainerHttpClient(unittest.TestCase):
 
         self.assertTrue(session.check_was_closed())
 
+    def test_url_cache(self):
+        """
+        Simple paths are appended to the base URL, and other URLs are built
+        once and cached, which gives the same URLs as building them each
+        time.
+        """
+        _cached_url.cache_clear()
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        urls = [
+            (None, None), ('/foo/bar', None), ('foo', None), ('', None),
+            ('/foo bar', None), ('/foo', {'scheme': 'https'}),
+            ('/foo', {'query': (('a', 'b'),)}),
+            ('/foo', {'query': [('a', 'b')]}),
+        ]
+        for path, kwargs in urls * 2:
+            self.assertEqual(client._url(path, kwargs),
+                             _build_url(client._base_url, path, kwargs or {}))
+        # Only the URLs that aren't simple and are hashable are cached.
+        self.assertEqual(_cached_url.cache_info().currsize, 3)
+
+        # The path can't just be appended if the base URL has a path.
+        client = ContainerHttpClient(
+            '127.0.0.1', '12345', url_defaults={'path': ('api',)})
+        self.assertEqual(client._url('foo', None),
+                         'http://127.0.0.1:12345/api/foo')
+
+    def test_url_cache_no_cycle(self):
+        """
+        The URL cache doesn't keep clients alive, so they're freed as soon as
+        they're no longer used without waiting for the garbage collector.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        client._url('/foo bar', None)
+        ref = weakref.ref(client)
+        gc.disable()
+        try:
+            del client
+            self.assertIsNone(ref())
+        finally:
+            gc.enable()
+
+    def test_pool_options(self):
+        """
+        The connection pool can be configured when no session is given.
+        """
+        client = ContainerHttpClient(
+            '127.0.0.1', '12345', pool_maxsize=20, max_retries=3)
+        adapter = client._session.get_adapter('http://127.0.0.1:12345/')
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertEqual(adapter.max_retries.total, 3)
+
+        with self.assertRaises(ValueError):
+            ContainerHttpClient(
+                '127.0.0.1', '12345', session=DummySession(), pool_maxsize=20)
+
+    @responses.activate
+    def test_map_requests(self):
+        """
+        We can make many requests concurrently, and get the responses in the
+        same order as the requests.
+        """
+        for path in ['foo', 'bar', 'baz']:
+            responses.add(
+                responses.GET, 'http://127.0.0.1:12345/' + path, body=path)
+        responses.add(responses.POST, 'http://127.0.0.1:12345/foo', body='p')
+
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        paths = ['/foo', '/bar', '/baz'] * 10
+        reqs = paths + [{'method': 'POST', 'path': '/foo', 'data': 'x'}]
+        resps = client.map_requests(reqs, max_workers=4)
+        self.assertEqual([r.text for r in resps],
+                         [p[1:] for p in paths] + ['p'])
+        self.assertEqual([c.request.body for c in responses.calls
+                          if c.request.method == 'POST'], ['x'])
+
+    @responses.activate
+    def test_map_requests_error(self):
+        """
+        If a request fails, the exception is raised.
+        """
+        responses.add(responses.GET, 'http://127.0.0.1:12345/foo')
+        responses.add(responses.GET, 'http://127.0.0.1:12345/bar',
+                      body=requests.exceptions.ConnectionError('KABOOM'))
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.map_requests(['/foo', '/bar'])
+
     @dockertest()
     def test_for_container_first_port(self):
         """
@@ -276,6 +370,30 @@ class TestContainerHttpClient(unittest.TestCase):
         self.assertIn('Host: {}:{}'.format(addr, port), response_lines)
 
 
+class FakeStatusResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStatusClient:
+    """
+    A client that responds with each of the given status codes in turn and
+    keeps the responses it returns.
+    """
+
+    def __init__(self, statuses):
+        self._statuses = iter(statuses)
+        self.responses = []
+
+    def get(self, path, **kwargs):
+        self.responses.append(FakeStatusResponse(next(self._statuses)))
+        return self.responses[-1]
+
+
 class TestWaitForResponseFunc(unittest.TestCase):
     @responses.activate
     def test_success(self):
@@ -319,6 +437,43 @@ class TestWaitForResponseFunc(unittest.TestCase):
         self.assertEqual(
             str(cm.exception), 'Timeout waiting for HTTP response.')
 
+    @responses.activate
+    def test_check(self):
+        """
+        The check callable is called before each retry and can stop us from
+        waiting any longer.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(
+            responses.GET, 'http://127.0.0.1:12345/', body=Exception('KABOOM'))
+        checks = []
+
+        def check():
+            checks.append(True)
+            if len(checks) == 2:
+                raise RuntimeError('Container exited.')
+
+        with self.assertRaises(RuntimeError) as cm:
+            wait_for_response(client, 10, check=check)
+        self.assertEqual(str(cm.exception), 'Container exited.')
+        self.assertEqual(len(checks), 2)
+
+    @responses.activate
+    def test_stop(self):
+        """
+        We stop retrying and return None when the stop event is set.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(
+            responses.GET, 'http://127.0.0.1:12345/', body=Exception('KABOOM'))
+        stop = threading.Event()
+        timer = threading.Timer(0.1, stop.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        start = time.monotonic()
+        self.assertIsNone(wait_for_response(client, 10, stop=stop))
+        self.assertLess(time.monotonic() - start, 1)
+
     @responses.activate
     def test_timeout(self):
         """
@@ -339,3 +494,123 @@ class TestWaitForResponseFunc(unittest.TestCase):
             wait_for_response(client, 0.1)
         self.assertEqual(
             str(cm.exception), 'Timeout waiting for HTTP response.')
+
+    @responses.activate
+    def test_expected_status(self):
+        """
+        Responses with unexpected status codes are retried, and the response
+        with an expected status code is returned.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=503)
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=200)
+        response = wait_for_response(client, 1, expected_status={200})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_expected_status_closes_responses(self):
+        """
+        Responses with unexpected status codes are closed before retrying,
+        and the response that is returned is left open.
+        """
+        client = FakeStatusClient([503, 503, 200])
+        response = wait_for_response(client, 1, expected_status={200})
+        self.assertIs(response, client.responses[-1])
+        self.assertEqual(
+            [(r.status_code, r.closed) for r in client.responses],
+            [(503, True), (503, True), (200, False)])
+
+    @responses.activate
+    def test_expected_status_timeout(self):
+        """
+        If we never get a response with an expected status code, we time out
+        with the last status code in the message.
+        """
+        client = ContainerHttpClient('127.0.0.1', '12345')
+        responses.add(responses.GET, 'http://127.0.0.1:12345/', status=503)
+        with self.assertRaises(TimeoutError) as cm:
+            wait_for_response(client, 0.2, expected_status={200, 204})
+        self.assertEqual(
+            str(cm.exception),
+            'Timeout waiting for HTTP response with status in [200, 204], '
+            'last status was 503.')
+
+    @responses.activate
+    def test_tcp_first(self):
+        """
+        With ``tcp_first``, no requests are made until the port accepts
+        connections.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            client = ContainerHttpClient('127.0.0.1', port)
+            url = 'http://127.0.0.1:{}/'.format(port)
+            responses.add(responses.GET, url, status=200)
+
+            with self.assertRaises(TimeoutError) as cm:
+                wait_for_response(client, 0.2, tcp_first=True)
+            self.assertEqual(
+                str(cm.exception), 'Timeout waiting for HTTP response.')
+            self.assertEqual(len(responses.calls), 0)
+
+            sock.listen()
+            wait_for_response(client, 1, tcp_first=True)
+            self.assertEqual(len(responses.calls), 1)
+
+
+class TestWaitForPortFunc(unittest.TestCase):
+    def listener(self, delay=0):
+        sock = socket.socket()
+        self.addCleanup(sock.close)
+        sock.bind(('127.0.0.1', 0))
+        timer = threading.Timer(delay, sock.listen)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        return sock.getsockname()[1]
+
+    def test_wait(self):
+        """
+        We return once the port accepts connections.
+        """
+        port = self.listener(delay=0.1)
+        start = time.monotonic()
+        wait_for_port('0.0.0.0', port, 1)
+        self.assertGreater(time.monotonic() - start, 0.1)
+
+    def test_timeout(self):
+        """
+        If the port never accepts connections, we time out.
+        """
+        port = self.listener(delay=10)
+        with self.assertRaises(TimeoutError) as cm:
+            wait_for_port('127.0.0.1', port, 0.2)
+        self.assertEqual(
+            str(cm.exception),
+            'Timeout (0.2s) waiting for 127.0.0.1:{} to accept '
+            'connections.'.format(port))
+
+    def test_check(self):
+        """
+        The check callable can stop us from waiting any longer.
+        """
+        port = self.listener(delay=10)
+
+        def check():
+            raise RuntimeError('Container exited.')
+
+        with self.assertRaises(RuntimeError):
+            wait_for_port('127.0.0.1', port, 10, check=check)
+
+    def test_stop(self):
+        """
+        We stop waiting when the stop event is set.
+        """
+        port = self.listener(delay=10)
+        stop = threading.Event()
+        timer = threading.Timer(0.1, stop.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        start = time.monotonic()
+        wait_for_port('127.0.0.1', port, 10, stop=stop)
+        self.assertLess(time.monotonic() - start, 1.5)
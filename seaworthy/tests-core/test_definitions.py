@@ -1,11 +1,18 @@
+import os
+import shutil
+import tempfile
 import time
 import unittest
 from datetime import datetime
 
+import docker
+
 from seaworthy.checks import docker_client, dockertest
 from seaworthy.definitions import (
     ContainerDefinition, NetworkDefinition, VolumeDefinition)
+from seaworthy.events import ContainerExitedError
 from seaworthy.helpers import DockerHelper, fetch_images
+from seaworthy.pool import ContainerPool
 from seaworthy.stream.matchers import EqualsMatcher
 
 IMG_SCRIPT = 'alpine:latest'
@@ -163,7 +170,7 @@ class DefinitionTestMixin:
         self.addCleanup(self.definition.teardown)
         self.assertTrue(self.definition.created)
         labels = self.definition.inner().attrs['Labels']
-        self.assertEqual(labels, {'SETUP_KWARGS': 'working'})
+        self.assertEqual(labels['SETUP_KWARGS'], 'working')
 
     def test_setup_multiple_calls(self):
         """
@@ -732,6 +739,122 @@ class TestContainerDefinition(unittest.TestCase, DefinitionTestMixin):
         with self.assertRaises(TimeoutError):
             script.wait_for_logs_matching(EqualsMatcher('hello'), timeout=0.1)
 
+    def test_wait_for_logs_matching_since(self):
+        """
+        We can wait for logs after a mark, without matching older identical
+        lines.
+        """
+        script = self.run_logs_container([
+            'echo "ready"',
+            'echo "ready"',
+            'sleep 10',
+        ], delay=0.5, wait=False)
+
+        script.wait_for_logs_matching(EqualsMatcher('ready'))
+        mark = script.log_mark()
+        # Only the second line matches, after the delay.
+        start = time.monotonic()
+        script.wait_for_logs_matching(EqualsMatcher('ready'), since=mark)
+        self.assertGreater(time.monotonic() - start, 0.2)
+
+        mark = script.log_mark()
+        with self.assertRaises(TimeoutError):
+            script.wait_for_logs_matching(
+                EqualsMatcher('ready'), since=mark, timeout=0.5)
+
+    def test_wait_for_logs_matching_log_hub(self):
+        """
+        Waiting for logs many times reads from the same log hub, which is
+        closed on teardown.
+        """
+        script = self.run_logs_container([
+            'echo "hi"',
+            'echo "hello"',
+            'sleep 10',
+        ], delay=0.2, wait=False)
+
+        script.wait_for_logs_matching(EqualsMatcher('hi'))
+        hub = script.log_hub()
+        script.wait_for_logs_matching(EqualsMatcher('hello'))
+        script.wait_for_logs_matching(EqualsMatcher('hi'))
+        self.assertIs(script.log_hub(), hub)
+
+        script.teardown()
+        self.assertTrue(hub.finished)
+
+    def test_wait_for_logs_matching_log_hub_overflow(self):
+        """
+        When the log hub drops lines before we've read them, the rest of the
+        lines are read from a new stream and none of them are skipped.
+        """
+        script = self.with_cleanup(
+            ContainerDefinition('script', IMG_SCRIPT, helper=self.helper))
+        script.LOG_BUFFER_LINES = 5
+        script.run(fetch_image=False, command=[
+            'sh', '-c', 'echo start; sleep 0.2; seq 50; sleep 10'])
+
+        seen = []
+
+        def slow_matcher(line):
+            seen.append(line)
+            if line == 'start':
+                # Fall behind while the numbers are logged
+                time.sleep(1)
+            return line == '6'
+
+        self.assertEqual(
+            script.wait_for_logs_matching(slow_matcher, timeout=5), '6')
+        self.assertGreater(script.log_hub().first, 0)
+        self.assertEqual(seen, ['start'] + [str(i) for i in range(1, 7)])
+
+    def test_log_recorder(self):
+        """
+        With a log directory, the container's logs are recorded to a file
+        that is kept after teardown, and errors get the last few log lines
+        from the recording.
+        """
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        script = self.with_cleanup(ContainerDefinition(
+            'script', IMG_SCRIPT, helper=self.helper, log_dir=log_dir,
+            create_kwargs={'command': [
+                'sh', '-c', 'echo "hi"; echo "hello" >&2; sleep 10']}))
+        script.setup(fetch_image=False)
+        recorder = script.log_recorder
+        self.assertEqual(os.path.dirname(recorder.path), log_dir)
+
+        script.wait_for_logs_matching(EqualsMatcher('hello'))
+        with self.assertRaises(TimeoutError) as cm:
+            script.wait_for_logs_matching(
+                EqualsMatcher('goodbye'), timeout=0.5)
+        self.assertIn('hi\nhello\n', str(cm.exception))
+
+        script.teardown()
+        self.assertEqual(recorder.search('^h'), [b'hi', b'hello'])
+        self.assertEqual(recorder.tail(1), b'hello\n')
+
+    def test_log_recorder_shutdown_logs(self):
+        """
+        The logs that the container writes while it is stopped on teardown
+        are recorded, and binary output doesn't break error messages.
+        """
+        log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, log_dir)
+        script = self.with_cleanup(ContainerDefinition(
+            'script', IMG_SCRIPT, helper=self.helper, log_dir=log_dir,
+            create_kwargs={'command': ['sh', '-c', (
+                'trap "echo bye; exit 0" TERM; echo ready; '
+                'printf "\\377\\n"; while true; do sleep 0.1; done')]}))
+        script.setup(fetch_image=False)
+        recorder = script.log_recorder
+
+        script.wait_for_logs_matching(EqualsMatcher('ready'))
+        time.sleep(0.2)
+        self.assertEqual(script._last_log_lines(), 'ready\n\ufffd\n')
+
+        script.teardown()
+        self.assertEqual(recorder.tail(1), b'bye\n')
+
     def test_http_client(self):
         """
         We can get an HTTP client from the container object.
@@ -749,6 +872,100 @@ class TestContainerDefinition(unittest.TestCase, DefinitionTestMixin):
         # Client is cleaned up at the end.
         self.assertEqual(self.definition._http_clients, [])
 
+    def test_http_client_shared(self):
+        """
+        We can share an HTTP client for each port, which is created with the
+        given options and cleaned up at the end.
+        """
+        self.definition._create_kwargs = {
+            'ports': {'8000/tcp': ('127.0.0.1', '10701')},
+        }
+        with self.definition as base:
+            client = base.http_client(shared=True, pool_maxsize=20)
+            self.assertEqual(client._pool_maxsize, 20)
+            self.assertIs(base.http_client(shared=True), client)
+            self.assertIsNot(base.http_client(), client)
+            self.assertIsNot(base.http_client('8000/tcp', shared=True), client)
+            self.assertEqual(len(self.definition._http_clients), 3)
+        self.assertEqual(self.definition._http_clients, [])
+        self.assertEqual(self.definition._shared_http_clients, {})
+
+    def test_keep_alive(self):
+        """
+        A container that is kept alive is left running after teardown and is
+        reused by a later setup with the same parameters, even with a new
+        helper.
+        """
+        self.definition.setup(keep_alive=True)
+        container = self.definition.inner()
+        self.definition.teardown()
+        self.dh.teardown()
+        container.reload()
+        self.assertEqual(container.status, 'running')
+
+        dh = DockerHelper()
+        self.addCleanup(dh.teardown)
+        definition = self.with_cleanup(self.make_definition('test', dh))
+        definition.setup(keep_alive=True)
+        self.assertEqual(definition.inner().id, container.id)
+        definition.teardown()
+
+        # Different parameters mean a new container, and the outdated one is
+        # removed.
+        definition.setup(keep_alive=True, environment={'CHANGED': '1'})
+        self.addCleanup(definition.inner().remove, force=True)
+        self.assertNotEqual(definition.inner().id, container.id)
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+    def test_check_running(self):
+        """
+        We can check whether a container has exited using the helper's
+        events, without inspecting the container.
+        """
+        self.definition.setup()
+        self.definition.check_running()
+
+        script = ContainerDefinition(
+            'exits', IMG_SCRIPT, helper=self.dh,
+            create_kwargs={'command': ['sh', '-c', 'exit 3']})
+        self.with_cleanup(script).setup()
+        self.dh.events.wait_for(script.inner().id, ['die'], timeout=5)
+        with self.assertRaises(ContainerExitedError) as cm:
+            script.check_running()
+        self.assertEqual(
+            str(cm.exception), "Container 'test_exits' exited with code 3.")
+
+    def test_keep_alive_pool(self):
+        """
+        Pooled containers can't be kept alive.
+        """
+        definition = ContainerDefinition(
+            'pooled', IMG_WAIT, helper=self.dh, pool=ContainerPool())
+        with self.assertRaises(ValueError):
+            definition.setup(keep_alive=True)
+
+    def test_waiter_copy(self):
+        """
+        A copy of the definition for waiting for another container shares none
+        of the state for the definition's own container.
+        """
+        self.definition.setup()
+        self.definition.log_hub()
+        self.definition._http_clients.append('client')
+        self.definition._shared_http_clients[8080] = 'client'
+        other = self.dh.containers.create('other', IMG_WAIT)
+
+        waiter = self.definition._waiter_copy(other)
+        self.assertIs(waiter.inner(), other)
+        self.assertIs(waiter.helper, self.definition.helper)
+        self.assertEqual(waiter._http_clients, [])
+        self.assertEqual(waiter._shared_http_clients, {})
+        self.assertIsNone(waiter._log_hub)
+        self.assertIsNotNone(self.definition._log_hub)
+        self.assertEqual(self.definition._http_clients, ['client'])
+        self.definition._http_clients.clear()
+
 
 class TestNetworkDefinition(unittest.TestCase, DefinitionTestMixin):
     def setUp(self):
@@ -0,0 +1,155 @@
+import threading
+import time
+import unittest
+
+from stream.fake_stream import FakeStreamSource
+
+from seaworthy.events import (
+    ContainerExitedError, EventHub, MAX_EVENTS_PER_CONTAINER)
+
+
+def event(container_id, status, **attributes):
+    return {
+        'status': status,
+        'id': container_id,
+        'Type': 'container',
+        'Action': status,
+        'Actor': {'ID': container_id, 'Attributes': attributes},
+    }
+
+
+class FakeEventsClient(FakeStreamSource):
+    def events(self, filters=None, decode=False):
+        assert decode
+        self.filters = filters
+        return self.stream_items(0, {})
+
+
+class TestEventHub(unittest.TestCase):
+    def make_hub(self, events, **kwargs):
+        client = FakeEventsClient(events)
+        self.addCleanup(client.cleanup)
+        hub = EventHub(client, **kwargs)
+        self.addCleanup(hub.close)
+        return client, hub
+
+    def test_start(self):
+        """
+        The hub subscribes to container events with the given filters once,
+        however many times it is started.
+        """
+        client, hub = self.make_hub([], filters={'label': 'ns'})
+        self.assertFalse(hub.running)
+        hub.start()
+        stream = hub._stream
+        hub.start()
+        self.assertTrue(hub.running)
+        self.assertIs(hub._stream, stream)
+        self.assertEqual(client.filters, {'label': 'ns', 'type': 'container'})
+
+    def test_wait_for(self):
+        """
+        We can wait for events for a container, including events that happened
+        before we started waiting.
+        """
+        _, hub = self.make_hub([
+            (0.01, event('abc', 'start')),
+            (0.01, event('def', 'start')),
+            (0.05, event('abc', 'health_status: healthy')),
+        ])
+        hub.start()
+        healthy = hub.wait_for('abc', ['health_status: healthy'], timeout=1)
+        self.assertEqual(healthy['status'], 'health_status: healthy')
+        self.assertEqual(
+            hub.wait_for('abc', ['start'], timeout=0)['status'], 'start')
+        self.assertIsNone(hub.find('def', ['health_status: healthy']))
+        self.assertIsNone(hub.wait_for('def', ['die'], timeout=0.05))
+
+    def test_destroy(self):
+        """
+        The events for a container are dropped when it is destroyed.
+        """
+        _, hub = self.make_hub([
+            (0.01, event('abc', 'start')),
+            (0.01, event('abc', 'destroy')),
+            (0.01, event('def', 'start')),
+        ])
+        hub.start()
+        hub.wait_for('def', ['start'], timeout=1)
+        self.assertIsNone(hub.find('abc', ['start']))
+
+    def test_check_running(self):
+        """
+        A container that has died is reported as exited.
+        """
+        _, hub = self.make_hub([
+            (0.01, event('abc', 'start')),
+            (0.01, event('abc', 'die', exitCode='3')),
+        ])
+        hub.start()
+        hub.check_running('def')
+        hub.wait_for('abc', ['die'], timeout=1)
+        with self.assertRaises(ContainerExitedError) as cm:
+            hub.check_running('abc', 'test_abc')
+        self.assertEqual(
+            str(cm.exception), "Container 'test_abc' exited with code 3.")
+
+    def test_check_running_restarted(self):
+        """
+        A container that has died and then been started again is running.
+        """
+        _, hub = self.make_hub([
+            (0.01, event('c1', 'start')),
+            (0.01, event('c1', 'die', exitCode='0')),
+            (0.01, event('c1', 'start')),
+            (0.01, event('c2', 'start')),
+        ])
+        hub.start()
+        # Events are dispatched in order, so we've seen all of c1's by now
+        hub.wait_for('c2', ['start'], timeout=1)
+        hub.check_running('c1')
+        self.assertEqual(
+            [e['status'] for e in hub._events['c1']], ['start'])
+
+    def test_events_capped(self):
+        """
+        Only the most recent events for each container are kept.
+        """
+        execs = [(0, event('abc', 'exec_start: true {}'.format(i)))
+                 for i in range(MAX_EVENTS_PER_CONTAINER + 10)]
+        _, hub = self.make_hub(
+            [(0, event('abc', 'start'))] + execs +
+            [(0, event('def', 'start'))])
+        hub.start()
+        hub.wait_for('def', ['start'], timeout=1)
+        self.assertEqual(len(hub._events['abc']), MAX_EVENTS_PER_CONTAINER)
+        self.assertIsNone(hub.find('abc', ['start']))
+        last = execs[-1][1]['status']
+        self.assertEqual(hub.find('abc', [last])['status'], last)
+
+    def test_wait_for_stop(self):
+        """
+        Waiting stops as soon as the stop event is set.
+        """
+        _, hub = self.make_hub([])
+        hub.start()
+        stop = threading.Event()
+        threading.Timer(0.05, stop.set).start()
+        start = time.monotonic()
+        self.assertIsNone(hub.wait_for('abc', ['die'], timeout=5, stop=stop))
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_close(self):
+        """
+        Closing the hub stops anything that is waiting.
+        """
+        _, hub = self.make_hub([])
+        hub.start()
+        results = []
+        waiter = threading.Thread(
+            target=lambda: results.append(hub.wait_for('abc', ['die'])))
+        waiter.start()
+        hub.close()
+        waiter.join(timeout=1)
+        self.assertEqual(results, [None])
+        self.assertFalse(hub.running)
@@ -1,13 +1,18 @@
+import os
+import socket
 import tempfile
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import docker
 from docker import models
 
 from seaworthy.checks import docker_client, dockertest
 from seaworthy.helpers import (
-    ContainerHelper, DockerHelper, ImageHelper, NetworkHelper, VolumeHelper,
-    _parse_image_tag, fetch_images)
+    ContainerHelper, DockerHelper, ImageHelper, NetworkHelper, SESSION_ID,
+    TeardownError, VolumeHelper, _is_stale, _model_names, _parse_image_tag,
+    fetch_images)
 
 
 # We use this image to test with because it is a small (~7MB) image from
@@ -53,6 +58,104 @@ class TestParseImageTagFunc(unittest.TestCase):
                          _parse_image_tag('myregistry:5000/test'))
 
 
+def dead_pid():
+    """
+    Find a PID that doesn't belong to any running process.
+    """
+    pid = 99999
+    while True:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return pid
+        except PermissionError:  # pragma: no cover
+            pass
+        pid -= 1  # pragma: no cover
+
+
+def session_labels(session='other', pid=None, host=None, created=None):
+    return {
+        'seaworthy.namespace': 'test',
+        'seaworthy.session': session,
+        'seaworthy.pid': str(os.getpid() if pid is None else pid),
+        'seaworthy.host': socket.gethostname() if host is None else host,
+        'seaworthy.created': str(time.time() if created is None else created),
+    }
+
+
+class TestIsStaleFunc(unittest.TestCase):
+    def test_own_session(self):
+        """Resources from our own session are never stale."""
+        labels = session_labels(session=SESSION_ID, pid=dead_pid(), created=0)
+        self.assertFalse(_is_stale(labels, max_age=0))
+
+    def test_running_session(self):
+        """
+        Resources from another session that is still running are not stale
+        unless they are too old.
+        """
+        labels = session_labels(created=100)
+        self.assertFalse(_is_stale(labels))
+        self.assertFalse(_is_stale(labels, max_age=60, now=150))
+        self.assertTrue(_is_stale(labels, max_age=60, now=170))
+
+    def test_dead_session(self):
+        """
+        Resources from a session whose process has exited are stale.
+        """
+        self.assertTrue(_is_stale(session_labels(pid=dead_pid())))
+
+    def test_other_host(self):
+        """
+        We can't tell whether a session on another machine is still running,
+        so its resources are only stale if they are too old.
+        """
+        labels = session_labels(pid=dead_pid(), host='elsewhere', created=100)
+        self.assertFalse(_is_stale(labels))
+        self.assertTrue(_is_stale(labels, max_age=60, now=170))
+
+    def test_kept_alive(self):
+        """
+        Containers that are kept alive between sessions are never stale.
+        """
+        labels = session_labels(pid=dead_pid(), created=0)
+        labels['seaworthy.keep-alive'] = ''
+        self.assertFalse(_is_stale(labels))
+        self.assertFalse(_is_stale(labels, max_age=60))
+
+    def test_malformed_created(self):
+        """
+        Resources with a creation time we can't parse are not stale.
+        """
+        labels = session_labels(pid=dead_pid(), created='yesterday')
+        self.assertFalse(_is_stale(labels, max_age=60))
+
+
+class TestModelNamesFunc(unittest.TestCase):
+    def test_models(self):
+        """
+        Models are replaced with their names, or their IDs if they don't have
+        names, wherever they are in the structure.
+        """
+        network = models.networks.Network(
+            attrs={'Id': 'abc123', 'Name': 'test_net'})
+        volume = models.volumes.Volume(attrs={'Name': 'test_vol'})
+        image = models.images.Image(attrs={'Id': 'sha256:def456'})
+        self.assertEqual(_model_names({
+            'network': network,
+            'volumes': {volume: {'bind': '/vol'}, '/tmp': '/tmp:ro'},
+            'links': [(network, 'alias')],
+            'image': image,
+            'user': 'root',
+        }), {
+            'network': 'test_net',
+            'volumes': {'test_vol': {'bind': '/vol'}, '/tmp': '/tmp:ro'},
+            'links': [('test_net', 'alias')],
+            'image': 'sha256:def456',
+            'user': 'root',
+        })
+
+
 @dockertest()
 class TestImageHelper(unittest.TestCase):
     def setUp(self):
@@ -94,6 +197,39 @@ class TestImageHelper(unittest.TestCase):
             logs[0],
             r"Found image 'sha256:[a-f0-9]{64}' for tag 'busybox:latest'")
 
+    def test_fetch_cached(self):
+        """
+        Fetched images are cached until they expire or are invalidated.
+        """
+        ih = ImageHelper(self.client, cache_ttl=0.5)
+        image = ih.fetch(IMG)
+        self.assertIs(ih.fetch(IMG), image)
+
+        ih.invalidate(IMG)
+        image2 = ih.fetch(IMG)
+        self.assertIsNot(image2, image)
+        self.assertEqual(image2.id, image.id)
+        self.assertIs(ih.fetch(IMG), image2)
+
+        time.sleep(0.5)
+        self.assertIsNot(ih.fetch(IMG), image2)
+
+    def test_fetch_uncached(self):
+        """
+        Caching can be disabled.
+        """
+        ih = ImageHelper(self.client, cache_ttl=0)
+        self.assertIsNot(ih.fetch(IMG), ih.fetch(IMG))
+
+    def test_fetch_concurrent(self):
+        """
+        Concurrent fetches of the same tag share a single fetch.
+        """
+        ih = self.make_helper()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            images = list(executor.map(ih.fetch, [IMG] * 4))
+        self.assertEqual(len({id(image) for image in images}), 1)
+
 
 @dockertest()
 class TestNetworkHelper(unittest.TestCase):
@@ -292,7 +428,9 @@ class TestVolumeHelper(unittest.TestCase):
         vol_labels = vh.create('labels', labels={'foo': 'bar'})
         self.addCleanup(vh.remove, vol_labels)
         self.assertEqual(vol_labels.name, 'test_labels')
-        self.assertEqual(vol_labels.attrs['Labels'], {'foo': 'bar'})
+        self.assertEqual(vol_labels.attrs['Labels']['foo'], 'bar')
+        self.assertEqual(
+            vol_labels.attrs['Labels']['seaworthy.namespace'], 'test')
 
         # Copy tmpfs example from Docker docs:
         # https://docs.docker.com/engine/reference/commandline/volume_create/#driver-specific-options
@@ -348,6 +486,72 @@ class TestContainerHelper(unittest.TestCase):
         return filter_by_name(
             self.client.containers.list(*args, **kw), '{}_'.format(namespace))
 
+    def test_keep_alive(self):
+        """
+        A container created with a fingerprint and kept alive survives
+        teardown, detached from our networks, and can be reused by a later
+        helper with the same fingerprint.
+        """
+        namespace = 'keep{}'.format(os.getpid())
+        ch = self.make_helper(namespace)
+        fingerprint = ch.fingerprint(IMG)
+        self.assertEqual(fingerprint, ch.fingerprint(IMG))
+        self.assertNotEqual(fingerprint, ch.fingerprint(IMG, user='root'))
+
+        container = ch.create('kept', IMG, fingerprint=fingerprint)
+        container.start()
+        ch.keep_alive(container)
+        self.assertEqual(
+            container.labels['seaworthy.fingerprint'], fingerprint)
+
+        ch._teardown()
+        container.reload()
+        self.assertEqual(container.status, 'running')
+        self.assertEqual(container.attrs['NetworkSettings']['Networks'], {})
+
+        # A helper for a later session reuses the container and reconnects it
+        ch2 = self.make_helper(namespace)
+        reused = ch2.get_kept_alive('kept', fingerprint)
+        self.assertEqual(reused.id, container.id)
+        networks = reused.attrs['NetworkSettings']['Networks']
+        self.assertIn(self.nh.get_default(create=False).name, networks)
+        ch2._teardown()
+
+        # A different fingerprint means the container is outdated
+        self.assertIsNone(ch2.get_kept_alive('kept', 'other'))
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+    def test_fingerprint_models(self):
+        """
+        Fingerprints identify networks by name, so a network that is created
+        again with the same name in a later session gives the same
+        fingerprint.
+        """
+        ch = self.make_helper()
+        network = self.nh.create('fingerprint')
+        fingerprint = ch.fingerprint(IMG, network=network)
+        self.assertEqual(
+            fingerprint, ch.fingerprint(IMG, network=network.name))
+        self.nh.remove(network)
+
+        network = self.nh.create('fingerprint')
+        self.addCleanup(self.nh.remove, network)
+        self.assertEqual(fingerprint, ch.fingerprint(IMG, network=network))
+
+    def test_fingerprint_helper_volume(self):
+        """
+        Containers that mount volumes created by the helper can't be kept
+        alive, since the volumes are removed when the helper is torn down.
+        """
+        ch = self.make_helper()
+        volume = self.vh.create('fingerprint')
+        self.addCleanup(self.vh.remove, volume)
+        for vol in [volume, volume.name]:
+            with self.assertRaises(ValueError):
+                ch.fingerprint(IMG, volumes={vol: '/vol'})
+        ch.fingerprint(IMG, volumes={'/tmp': '/vol'})
+
     def test_teardown(self):
         """
         ContainerHelper._teardown() will remove any containers that were
@@ -392,6 +596,40 @@ class TestContainerHelper(unittest.TestCase):
         ])
         self.assertEqual([], self.list_containers(all=True))
 
+    def test_teardown_lists_once(self):
+        """
+        ContainerHelper._teardown() finds the containers that still exist with
+        a single listing rather than by fetching each container.
+        """
+        ch = self.make_helper()
+        for name in ['con1', 'con2', 'removed']:
+            ch.create(name, IMG)
+        # An ID that never belonged to any container is simply ignored.
+        ch._ids.add('0' * 64)
+        self.client.containers.get('test_removed').remove()
+
+        list_calls = []
+        real_list = ch.collection.list
+
+        def list_containers(*args, **kwargs):
+            list_calls.append(kwargs)
+            return real_list(*args, **kwargs)
+
+        def get_container(*args, **kwargs):
+            raise AssertionError('Unexpected get call')  # pragma: no cover
+
+        ch.collection.list = list_containers
+        ch.collection.get = get_container
+
+        with self.assertLogs('seaworthy', level='WARNING') as cm:
+            ch._teardown()
+        self.assertEqual(len(list_calls), 1)
+        self.assertEqual(sorted(rec.getMessage() for rec in cm.records), [
+            "Container 'test_con1' still existed during teardown",
+            "Container 'test_con2' still existed during teardown",
+        ])
+        self.assertEqual([], self.list_containers(all=True))
+
     def test_create(self):
         """
         We can create a container with various parameters without starting it.
@@ -429,8 +667,7 @@ class TestContainerHelper(unittest.TestCase):
         networks = con_network.attrs['NetworkSettings']['Networks']
         self.assertEqual(list(networks.keys()), [custom_network.name])
         network = networks[custom_network.name]
-        self.assertCountEqual(
-            network['Aliases'], [con_network.id[:12], 'network'])
+        self.assertEqual(network['Aliases'], ['network'])
 
         # When 'network_mode' is provided, the default network is not used
         con_mode = ch.create('mode', IMG, network_mode='none')
@@ -450,8 +687,31 @@ class TestContainerHelper(unittest.TestCase):
         networks = con_default.attrs['NetworkSettings']['Networks']
         self.assertEqual(list(networks.keys()), [default_network_name])
         network = networks[default_network_name]
-        self.assertCountEqual(
-            network['Aliases'], [con_default.id[:12], 'default'])
+        self.assertEqual(network['Aliases'], ['default'])
+
+    def test_network_aliases_started(self):
+        """
+        A container created on a network keeps its network alias when it is
+        started, when Docker adds its short ID as an alias too, and can be
+        reached by its alias from other containers on the network.
+        """
+        ch = self.make_helper()
+
+        network = self.nh.create('aliases')
+        self.addCleanup(self.nh.remove, network)
+        con = ch.create('aliased', IMG, network=network)
+        self.addCleanup(ch.remove, con)
+        con.start()
+        con.reload()
+        aliases = con.attrs['NetworkSettings']['Networks'][network.name][
+            'Aliases']
+        self.assertCountEqual(aliases, [con.id[:12], 'aliased'])
+
+        lookup = ch.create(
+            'lookup', IMG, network=network, command=['nslookup', 'aliased'])
+        self.addCleanup(ch.remove, lookup)
+        lookup.start()
+        self.assertEqual(lookup.wait(timeout=10)['StatusCode'], 0)
 
     def test_network_by_id(self):
         """
@@ -468,7 +728,7 @@ class TestContainerHelper(unittest.TestCase):
         networks = con_id.attrs['NetworkSettings']['Networks']
         self.assertEqual(list(networks.keys()), [net_id.name])
         network = networks[net_id.name]
-        self.assertCountEqual(network['Aliases'], [con_id.id[:12], 'id'])
+        self.assertEqual(network['Aliases'], ['id'])
 
     def test_network_by_short_id(self):
         """
@@ -486,8 +746,7 @@ class TestContainerHelper(unittest.TestCase):
         networks = con_short_id.attrs['NetworkSettings']['Networks']
         self.assertEqual(list(networks.keys()), [net_short_id.name])
         network = networks[net_short_id.name]
-        self.assertCountEqual(
-            network['Aliases'], [con_short_id.id[:12], 'short_id'])
+        self.assertEqual(network['Aliases'], ['short_id'])
 
     def test_network_by_name(self):
         """
@@ -504,7 +763,7 @@ class TestContainerHelper(unittest.TestCase):
         networks = con_name.attrs['NetworkSettings']['Networks']
         self.assertEqual(list(networks.keys()), [net_name.name])
         network = networks[net_name.name]
-        self.assertCountEqual(network['Aliases'], [con_name.id[:12], 'name'])
+        self.assertEqual(network['Aliases'], ['name'])
 
     def test_network_by_invalid_type(self):
         """
@@ -744,6 +1003,149 @@ class TestDockerHelper(unittest.TestCase):
         dh.teardown()
         dh.teardown()
 
+    def test_teardown_concurrent(self):
+        """
+        DockerHelper.teardown() can remove resources concurrently, in which
+        case it returns a record of every resource it removed.
+        """
+        dh = self.make_helper()
+        net = dh.networks.create('net')
+        vol = dh.volumes.create('vol')
+        for i in range(3):
+            con = dh.containers.create(
+                'con{}'.format(i), IMG, network=net,
+                volumes={vol: {'bind': '/vol', 'mode': 'rw'}})
+            con.start()
+
+        with self.assertLogs('seaworthy', level='WARNING'):
+            result = dh.teardown(max_workers=4)
+
+        self.assertEqual(result.failures, [])
+        self.assertEqual(sorted(r.name for r in result.records), [
+            'test_con0', 'test_con1', 'test_con2', 'test_net', 'test_vol'])
+        for record in result.records:
+            self.assertGreaterEqual(record.duration, 0)
+
+        self.assertEqual(
+            filter_by_name(self.client.containers.list(all=True), 'test_'),
+            [])
+        self.assertEqual(
+            filter_by_name(self.client.networks.list(), 'test_'), [])
+        self.assertEqual(
+            filter_by_name(self.client.volumes.list(), 'test_'), [])
+
+    def test_teardown_concurrent_failures(self):
+        """
+        When some resources can't be removed during a concurrent teardown, the
+        failures are reported in the result and the remaining resources are
+        still removed.
+        """
+        dh = self.make_helper(teardown_workers=2)
+        net = dh.networks.create('net')
+        vol = dh.volumes.create('vol')
+
+        # A container that the helper doesn't know about keeps the network in
+        # use, so it can't be removed.
+        outsider = self.client.containers.create(IMG, network=net.id)
+        self.addCleanup(net.remove)
+        self.addCleanup(outsider.remove, force=True)
+        outsider.start()
+
+        with self.assertLogs('seaworthy', level='WARNING'):
+            result = dh.teardown()
+
+        [failure] = result.failures
+        self.assertEqual(failure.name, 'test_net')
+        self.assertIsInstance(failure.error, docker.errors.APIError)
+        with self.assertRaises(TeardownError) as cm:
+            result.raise_for_failures()
+        self.assertIs(cm.exception.result, result)
+
+        with self.assertRaises(docker.errors.NotFound):
+            vol.reload()
+
+    def test_labels(self):
+        """
+        All resources created through the helper are labelled with the
+        namespace and details of the session that created them.
+        """
+        dh = self.make_helper(namespace='integ')
+        con = dh.containers.create('con', IMG, labels=['flag'])
+        net = dh.networks.create('net', labels={'foo': 'bar'})
+        vol = dh.volumes.create('vol')
+
+        for labels in [con.labels, net.attrs['Labels'], vol.attrs['Labels']]:
+            self.assertEqual(labels['seaworthy.namespace'], 'integ')
+            self.assertEqual(labels['seaworthy.session'], SESSION_ID)
+            self.assertEqual(labels['seaworthy.pid'], str(os.getpid()))
+            self.assertEqual(labels['seaworthy.host'], socket.gethostname())
+            self.assertLessEqual(
+                float(labels['seaworthy.created']), time.time())
+        self.assertEqual(con.labels['flag'], '')
+        self.assertEqual(net.attrs['Labels']['foo'], 'bar')
+
+    def test_reap(self):
+        """
+        DockerHelper.reap() removes resources from sessions that have ended,
+        but leaves resources from running sessions alone.
+        """
+        dh = self.make_helper()
+        ours = dh.containers.create('ours', IMG)
+
+        stale = session_labels(pid=dead_pid())
+        orphan_net = self.client.networks.create('test_orphan', labels=stale)
+        orphan_vol = self.client.volumes.create('test_orphan', labels=stale)
+        orphan_con = self.client.containers.create(
+            IMG, name='test_orphan', labels=stale, network=orphan_net.name,
+            volumes={orphan_vol.name: {'bind': '/vol', 'mode': 'rw'}})
+        orphan_con.start()
+
+        running = self.client.volumes.create(
+            'test_running', labels=session_labels())
+        self.addCleanup(running.remove)
+
+        result = dh.reap(namespace='test')
+        self.assertEqual(result.failures, [])
+        self.assertEqual(
+            [(r.model_name, r.name) for r in result.records], [
+                ('container', 'test_orphan'),
+                ('network', 'test_orphan'),
+                ('volume', 'test_orphan'),
+            ])
+
+        for resource in [orphan_con, orphan_net, orphan_vol]:
+            with self.assertRaises(docker.errors.NotFound):
+                resource.reload()
+        ours.reload()
+        running.reload()
+
+    def test_reap_kept_alive(self):
+        """
+        DockerHelper.reap() disconnects kept-alive containers from the stale
+        networks of a session that was killed before it could detach them,
+        so that the next session can create its network again.
+        """
+        dh = self.make_helper()
+
+        stale = session_labels(pid=dead_pid())
+        orphan_net = self.client.networks.create('test_orphan', labels=stale)
+        kept_labels = dict(stale, **{'seaworthy.keep-alive': ''})
+        kept = self.client.containers.create(
+            IMG, name='test_kept', labels=kept_labels,
+            network=orphan_net.name)
+        self.addCleanup(kept.remove, force=True)
+        kept.start()
+
+        result = dh.reap(namespace='test')
+        self.assertEqual(result.failures, [])
+        self.assertEqual(
+            [(r.model_name, r.name) for r in result.records],
+            [('network', 'test_orphan')])
+
+        kept.reload()
+        self.assertEqual(kept.status, 'running')
+        self.assertEqual(kept.attrs['NetworkSettings']['Networks'], {})
+
     def test_remove_network_connected_to_created_container(self):
         """
         We can remove a network when it is connected to a container if the
@@ -0,0 +1,215 @@
+import unittest
+
+import docker
+
+from seaworthy.checks import docker_client, dockertest
+from seaworthy.definitions import ContainerDefinition
+from seaworthy.helpers import DockerHelper, fetch_images
+from seaworthy.pool import ContainerPool
+
+
+IMG = 'nginx:alpine'
+
+
+@dockertest()
+def setUpModule():  # noqa: N802 (The camelCase is mandated by unittest.)
+    with docker_client() as client:
+        fetch_images(client, [IMG])
+
+
+class CleanableContainer(ContainerDefinition):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.clean_error = None
+        self.cleaned = 0
+
+    def clean(self):
+        self.cleaned += 1
+        if self.clean_error is not None:
+            raise self.clean_error
+
+
+@dockertest()
+class TestContainerPool(unittest.TestCase):
+    def setUp(self):
+        self.dh = DockerHelper()
+        self.addCleanup(self.dh.teardown)
+
+    def make_definition(self, pool, name='pooled', **kwargs):
+        definition = CleanableContainer(
+            name, IMG, helper=self.dh, pool=pool, **kwargs)
+        self.addCleanup(definition.teardown)
+        return definition
+
+    def aliases(self, container):
+        container.reload()
+        [network] = container.attrs['NetworkSettings']['Networks'].values()
+        return network['Aliases']
+
+    def test_reuse(self):
+        """
+        A container is cleaned and returned to the pool on teardown and reused
+        on the next setup.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+
+        definition.setup()
+        container = definition.inner()
+        self.assertEqual(container.status, 'running')
+        self.assertIn('pooled', self.aliases(container))
+
+        definition.teardown()
+        self.assertFalse(definition.created)
+        self.assertEqual(definition.cleaned, 1)
+        container.reload()
+        self.assertEqual(container.status, 'running')
+        self.assertNotIn('pooled', self.aliases(container))
+
+        definition.setup()
+        self.assertEqual(definition.inner().id, container.id)
+        self.assertIn('pooled', self.aliases(container))
+
+    def test_different_kwargs(self):
+        """
+        Containers are only reused for definitions with the same image and
+        creation parameters.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+        definition.setup()
+        container = definition.inner()
+        definition.teardown()
+
+        definition.setup(environment={'FOO': 'bar'})
+        self.assertNotEqual(definition.inner().id, container.id)
+        definition.teardown()
+
+        # Another definition with the same parameters can use the container.
+        other = self.make_definition(pool, name='other')
+        other.setup()
+        self.assertEqual(other.inner().id, container.id)
+        self.assertIn('other', self.aliases(container))
+
+    def test_clean_failure(self):
+        """
+        If a container can't be cleaned, it is removed rather than returned to
+        the pool, and a new container is created on the next setup.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+        definition.setup()
+        container = definition.inner()
+
+        definition.clean_error = RuntimeError('dirty')
+        with self.assertLogs('seaworthy', level='INFO') as cm:
+            definition.teardown()
+        self.assertIn('could not be cleaned', cm.output[0])
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+        definition.clean_error = None
+        definition.setup()
+        self.assertNotEqual(definition.inner().id, container.id)
+
+    def test_pool_full(self):
+        """
+        Containers are removed rather than returned to a pool that is full.
+        """
+        pool = ContainerPool(size=1)
+        first = self.make_definition(pool, name='first')
+        second = self.make_definition(pool, name='second')
+        first.setup()
+        second.setup()
+        first_container = first.inner()
+        second_container = second.inner()
+
+        first.teardown()
+        second.teardown()
+        first_container.reload()
+        with self.assertRaises(docker.errors.NotFound):
+            second_container.reload()
+
+    def test_prewarm(self):
+        """
+        Prewarming starts containers until the pool is full, and those
+        containers are handed out on setup.
+        """
+        pool = ContainerPool(size=2)
+        definition = self.make_definition(pool)
+        pool.prewarm(definition)
+
+        containers = [c for c in self.dh._client.containers.list()
+                      if c.name.startswith('test_pooled_pool')]
+        self.assertEqual(len(containers), 2)
+
+        definition.setup()
+        self.assertIn(definition.inner().id, [c.id for c in containers])
+
+        # The pool still has one idle container, so prewarming only starts one
+        # more.
+        pool.prewarm(definition)
+        containers = [c for c in self.dh._client.containers.list()
+                      if c.name.startswith('test_pooled_pool')]
+        self.assertEqual(len(containers), 3)
+
+    def test_removed_idle_container(self):
+        """
+        Idle containers that have been removed are skipped.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+        definition.setup()
+        container = definition.inner()
+        definition.teardown()
+        self.dh.containers.remove(container)
+
+        definition.setup()
+        self.assertNotEqual(definition.inner().id, container.id)
+
+    def test_stopped_idle_container(self):
+        """
+        Idle containers that have stopped are removed rather than reused.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+        definition.setup()
+        container = definition.inner()
+        definition.teardown()
+        container.stop(timeout=1)
+
+        definition.setup()
+        self.assertNotEqual(definition.inner().id, container.id)
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
+
+    def test_fetch_image(self):
+        """
+        The image is only fetched for new containers if fetch_image is True,
+        which is the default.
+        """
+        fetched = []
+        image_helper = self.dh.containers._image_helper
+        image_helper.fetch = lambda image: fetched.append(image)
+        pool = ContainerPool(size=2)
+        definition = self.make_definition(pool)
+
+        pool.prewarm(definition, fetch_image=False)
+        self.assertEqual(fetched, [])
+        pool.clear()
+        pool.prewarm(definition)
+        self.assertEqual(fetched, [IMG, IMG])
+
+    def test_clear(self):
+        """
+        Clearing the pool removes all the idle containers.
+        """
+        pool = ContainerPool()
+        definition = self.make_definition(pool)
+        definition.setup()
+        container = definition.inner()
+        definition.teardown()
+
+        pool.clear()
+        with self.assertRaises(docker.errors.NotFound):
+            container.reload()
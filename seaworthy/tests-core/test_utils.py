@@ -2,7 +2,7 @@ import unittest
 
 from docker.models.containers import ExecResult
 
-from seaworthy.utils import output_lines
+from seaworthy.utils import _backoff, _freeze, output_lines
 
 
 class TestOutputLinesFunc(unittest.TestCase):
@@ -18,3 +18,42 @@ class TestOutputLinesFunc(unittest.TestCase):
     def test_custom_encoding(self):
         """String lines can be parsed using a custom encoding."""
         self.assertEqual(output_lines(b'\xe1', encoding='latin1'), ['á'])
+
+
+class TestFreezeFunc(unittest.TestCase):
+    def test_equal_structures(self):
+        """
+        Equal structures freeze to equal, hashable values regardless of dict
+        ordering.
+        """
+        a = _freeze({'env': {'A': '1', 'B': '2'}, 'ports': [1, 2], 'x': None})
+        b = _freeze({'x': None, 'ports': [1, 2], 'env': {'B': '2', 'A': '1'}})
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+
+    def test_different_structures(self):
+        """
+        Different structures freeze to different values.
+        """
+        self.assertNotEqual(_freeze({'a': [1, 2]}), _freeze({'a': [2, 1]}))
+        self.assertNotEqual(_freeze({'a': [1]}), _freeze({'a': (1,)}))
+        self.assertNotEqual(_freeze({'a': {}}), _freeze({'a': []}))
+
+
+class TestBackoffFunc(unittest.TestCase):
+    def test_backoff(self):
+        """
+        The delays grow exponentially up to the maximum.
+        """
+        delays = _backoff(initial=1, maximum=20, factor=3)
+        self.assertEqual([next(delays) for _ in range(5)], [1, 3, 9, 20, 20])
+
+    def test_jitter(self):
+        """
+        With jitter, each delay is randomly reduced by up to that fraction.
+        """
+        delays = _backoff(initial=1, maximum=4, jitter=0.5)
+        for expected in [1, 2] + [4] * 20:
+            delay = next(delays)
+            self.assertGreater(delay, expected * 0.5)
+            self.assertLessEqual(delay, expected)
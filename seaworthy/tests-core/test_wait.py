@@ -0,0 +1,320 @@
+import socket
+import threading
+import time
+import unittest
+
+from seaworthy.checks import docker_client, dockertest
+from seaworthy.definitions import ContainerDefinition
+from seaworthy.events import ContainerExitedError
+from seaworthy.helpers import DockerHelper, fetch_images
+from seaworthy.wait import (
+    AllOf, AnyOf, HealthcheckWait, LogPatternWait, TcpPortWait, WaitStrategy)
+
+IMG = 'alpine:latest'
+
+
+class FakeWait(WaitStrategy):
+    def __init__(self, delay, error=None):
+        self.delay = delay
+        self.error = error
+        self.stopped = None
+
+    def wait(self, definition, timeout, stop=None):
+        self.stopped = stop.wait(self.delay)
+        if self.error is not None:
+            raise self.error
+
+
+class FakeContainer:
+    def __init__(self, *statuses):
+        self.id = 'abc'
+        self.name = 'test_fake'
+        self._statuses = list(statuses)
+        self.reload()
+
+    def reload(self):
+        status = self._statuses.pop(0) if self._statuses else None
+        health = None if status is None else {'Status': status}
+        self.attrs = {'State': {'Health': health}}
+
+
+class FakeHelper:
+    events = None
+
+
+class FakeEvents:
+    running = True
+
+    def wait_for(self, container_id, statuses, timeout, stop=None):
+        time.sleep(0.1)
+
+
+class FakeDefinition:
+    def __init__(self, container=None, exited=False, port=None,
+                 events=None):
+        self.container = container
+        self.exited = exited
+        self.port = port
+        self.helper = FakeHelper()
+        self.helper.events = events
+
+    def inner(self):
+        return self.container
+
+    def check_running(self):
+        if self.exited:
+            raise ContainerExitedError('exited')
+
+    def get_host_port(self, container_port):
+        return ('127.0.0.1', str(self.port))
+
+
+class TestCompositeWait(unittest.TestCase):
+    def test_all_of(self):
+        """
+        AllOf waits for all the strategies at the same time.
+        """
+        start = time.monotonic()
+        AllOf(FakeWait(0.1), FakeWait(0.1), FakeWait(0.1)).wait(None, 1)
+        self.assertLess(time.monotonic() - start, 0.25)
+
+    def test_all_of_error(self):
+        """
+        AllOf raises the first error without waiting for the other
+        strategies.
+        """
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            (FakeWait(0.01, TimeoutError()) & FakeWait(1)).wait(None, 1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_any_of(self):
+        """
+        AnyOf returns as soon as any strategy succeeds, even if others fail.
+        """
+        start = time.monotonic()
+        strategy = (FakeWait(0.01, RuntimeError()) | FakeWait(0.05) |
+                    FakeWait(1))
+        strategy.wait(None, 1)
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_any_of_error(self):
+        """
+        AnyOf raises the last error if all the strategies fail.
+        """
+        with self.assertRaises(TimeoutError):
+            AnyOf(FakeWait(0.01, RuntimeError()),
+                  FakeWait(0.05, TimeoutError())).wait(None, 1)
+
+    def assert_stopped(self, strategy):
+        deadline = time.monotonic() + 1
+        while strategy.stopped is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(strategy.stopped)
+
+    def test_any_of_stops_others(self):
+        """
+        AnyOf stops the other strategies as soon as one succeeds.
+        """
+        slow = FakeWait(10)
+        (FakeWait(0.01) | slow).wait(None, 10)
+        self.assert_stopped(slow)
+
+    def test_all_of_stops_others(self):
+        """
+        AllOf stops the other strategies as soon as one fails.
+        """
+        slow = FakeWait(10)
+        with self.assertRaises(TimeoutError):
+            (FakeWait(0.01, TimeoutError()) & slow).wait(None, 10)
+        self.assert_stopped(slow)
+
+    def test_nested_stop(self):
+        """
+        Stopping a composite strategy stops the strategies inside it.
+        """
+        slow = FakeWait(10)
+        (FakeWait(0.01) | (slow & FakeWait(10))).wait(None, 10)
+        self.assert_stopped(slow)
+
+
+class TestHealthcheckWait(unittest.TestCase):
+    def test_healthy(self):
+        """
+        We poll the container's health status until it's healthy.
+        """
+        container = FakeContainer('starting', 'starting', 'healthy')
+        HealthcheckWait().wait(FakeDefinition(container), 1)
+
+    def test_unhealthy(self):
+        """
+        An error is raised when the container becomes unhealthy.
+        """
+        container = FakeContainer('starting', 'unhealthy')
+        with self.assertRaises(RuntimeError) as cm:
+            HealthcheckWait().wait(FakeDefinition(container), 1)
+        self.assertEqual(
+            str(cm.exception), "Container 'test_fake' is unhealthy.")
+
+    def test_no_healthcheck(self):
+        """
+        An error is raised when the container has no healthcheck.
+        """
+        with self.assertRaises(RuntimeError) as cm:
+            HealthcheckWait().wait(FakeDefinition(FakeContainer()), 1)
+        self.assertEqual(
+            str(cm.exception), "Container 'test_fake' has no healthcheck.")
+
+    def test_timeout(self):
+        """
+        A TimeoutError is raised when the container isn't healthy in time.
+        """
+        container = FakeContainer(*(['starting'] * 100))
+        with self.assertRaises(TimeoutError) as cm:
+            HealthcheckWait().wait(FakeDefinition(container), 0.2)
+        self.assertEqual(
+            str(cm.exception),
+            'Timeout (0.2s) waiting for container to be healthy.')
+
+    def test_timeout_after_events(self):
+        """
+        The timeout in the error is the one we were given, even if we fell
+        back to polling after waiting for events.
+        """
+        container = FakeContainer(*(['starting'] * 100))
+        definition = FakeDefinition(container, events=FakeEvents())
+        with self.assertRaises(TimeoutError) as cm:
+            HealthcheckWait().wait(definition, 0.3)
+        self.assertEqual(
+            str(cm.exception),
+            'Timeout (0.3s) waiting for container to be healthy.')
+
+    def test_exited(self):
+        """
+        We stop waiting when the container exits.
+        """
+        container = FakeContainer(*(['starting'] * 100))
+        with self.assertRaises(ContainerExitedError):
+            HealthcheckWait().wait(FakeDefinition(container, exited=True), 1)
+
+    def test_stop(self):
+        """
+        We stop polling when the stop event is set.
+        """
+        container = FakeContainer(*(['starting'] * 100))
+        stop = threading.Event()
+        timer = threading.Timer(0.1, stop.set)
+        timer.start()
+        self.addCleanup(timer.cancel)
+        start = time.monotonic()
+        HealthcheckWait().wait(FakeDefinition(container), 10, stop=stop)
+        self.assertLess(time.monotonic() - start, 1)
+
+
+class TestTcpPortWait(unittest.TestCase):
+    def test_wait(self):
+        """
+        We wait until the port accepts connections.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            timer = threading.Timer(0.1, sock.listen)
+            timer.start()
+            self.addCleanup(timer.cancel)
+            TcpPortWait(8080).wait(FakeDefinition(port=port), 1)
+
+    def test_timeout(self):
+        """
+        A TimeoutError is raised when the port never accepts connections.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            with self.assertRaises(TimeoutError) as cm:
+                TcpPortWait(8080).wait(FakeDefinition(port=port), 0.2)
+        self.assertEqual(
+            str(cm.exception),
+            'Timeout (0.2s) waiting for port 8080 to accept connections.')
+
+    def test_stop(self):
+        """
+        We stop waiting when the stop event is set.
+        """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+            stop = threading.Event()
+            timer = threading.Timer(0.1, stop.set)
+            timer.start()
+            self.addCleanup(timer.cancel)
+            start = time.monotonic()
+            TcpPortWait(8080).wait(FakeDefinition(port=port), 10, stop=stop)
+            self.assertLess(time.monotonic() - start, 1.5)
+
+
+@dockertest()
+class TestWaitStrategies(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with docker_client() as client:
+            fetch_images(client, [IMG])
+
+    def setUp(self):
+        self.helper = DockerHelper()
+        self.addCleanup(self.helper.teardown)
+
+    def make_definition(self, healthcheck, wait_strategy):
+        definition = ContainerDefinition(
+            'test', IMG, wait_strategy=wait_strategy, wait_timeout=10,
+            create_kwargs={
+                'command': ['sh', '-c', 'sleep 0.5; touch /ready; sleep 60'],
+                'healthcheck': {
+                    'test': ['CMD-SHELL', healthcheck],
+                    'interval': 100 * 1000 * 1000,
+                },
+            },
+            helper=self.helper.containers)
+        self.addCleanup(definition.teardown)
+        return definition
+
+    def test_healthcheck(self):
+        """
+        We can wait for a container's healthcheck to pass.
+        """
+        definition = self.make_definition('test -f /ready', HealthcheckWait())
+        definition.setup()
+        definition.inner().reload()
+        health = definition.inner().attrs['State']['Health']
+        self.assertEqual(health['Status'], 'healthy')
+
+    def test_healthcheck_unhealthy(self):
+        """
+        Setup fails when the container becomes unhealthy.
+        """
+        definition = self.make_definition('false', HealthcheckWait())
+        with self.assertRaises(RuntimeError):
+            definition.setup()
+
+    def test_log_pattern(self):
+        """
+        We can combine strategies.
+        """
+        definition = ContainerDefinition(
+            'test', IMG, wait_timeout=10,
+            wait_strategy=LogPatternWait('hello') & LogPatternWait('world'),
+            create_kwargs={
+                'command': ['sh', '-c', 'echo hello; echo world; sleep 60'],
+            },
+            helper=self.helper.containers)
+        self.addCleanup(definition.teardown)
+        definition.setup()
+        self.assertTrue(definition.is_running())
+
+    def test_wait_patterns_and_strategy(self):
+        """
+        We can't use both wait_patterns and wait_strategy.
+        """
+        with self.assertRaises(ValueError):
+            ContainerDefinition('test', IMG, wait_patterns=['hello'],
+                                wait_strategy=HealthcheckWait())
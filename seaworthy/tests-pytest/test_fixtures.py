@@ -116,6 +116,17 @@ class TestResourceFixtureFunc:
         # Can't assert dependent fixture teardown--only happens once test
         # method returns
 
+    def test_keep_alive_not_container(self):
+        """
+        Only container definitions can be kept alive, which is checked when
+        the fixture is created.
+        """
+        for definition in [NetworkDefinition('net'), VolumeDefinition('vol')]:
+            with pytest.raises(ValueError) as e:
+                resource_fixture(definition, 'kept', keep_alive=True)
+            assert str(e.value) == (
+                'keep_alive is only supported for container definitions')
+
 
 @dockertest()
 class TestCleanContainerFixturesFunc:
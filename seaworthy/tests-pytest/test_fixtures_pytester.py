@@ -5,9 +5,14 @@ and these new processes. For this reason, these tests have been separated from
 the others. Note that these tests produce no coverage data.
 https://docs.pytest.org/en/3.2.1/writing_plugins.html#testing-plugins
 """
+import re
+import threading
+import time
+
 from seaworthy.checks import docker_client
 from seaworthy.helpers import fetch_images
 from seaworthy.pytest.checks import dockertest
+from seaworthy.pytest.prefetch import image_lock
 
 
 IMG = 'nginx:alpine'
@@ -166,3 +171,69 @@ class TestCleanContainerFixturesFunc:
 
         result = testdir.runpytest()
         result.assert_outcomes(passed=2)
+
+
+@dockertest()
+class TestPrefetchWorkersOption:
+    # The tests are run in a subprocess so that the resource fixtures they
+    # register don't end up in the registry for the other tests.
+
+    def make_tests(self, testdir):
+        testdir.makeconftest("""
+            from seaworthy.definitions import ContainerDefinition
+
+            fixture = (ContainerDefinition(name='test', image='{}')
+                       .pytest_fixture('container'))
+        """.format(IMG))
+
+        testdir.makepyfile("""
+            def test_container(container):
+                pass
+        """)
+
+    def test_prefetch(self, testdir):
+        """
+        When the ``--seaworthy-prefetch-workers`` option is given, the images
+        used by the collected tests are fetched after collection.
+        """
+        self.make_tests(testdir)
+        result = testdir.runpytest_subprocess(
+            '--collect-only', '--seaworthy-prefetch-workers=2')
+        result.stdout.fnmatch_lines([
+            'seaworthy: Fetching 1 image(s)...',
+            "seaworthy: Fetched image '{}' (1/1, *s)".format(IMG),
+        ])
+
+    def test_no_prefetch(self, testdir):
+        """
+        Images are not fetched after collection without the option.
+        """
+        self.make_tests(testdir)
+        result = testdir.runpytest_subprocess('--collect-only')
+        assert 'seaworthy:' not in result.stdout.str()
+
+    def test_image_lock(self, testdir):
+        """
+        An image is only fetched once another process holding its lock, such
+        as another pytest-xdist worker, has released it.
+        """
+        self.make_tests(testdir)
+        locked = threading.Event()
+
+        def hold_lock():
+            with image_lock(IMG):
+                locked.set()
+                time.sleep(3)
+
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        locked.wait()
+        try:
+            result = testdir.runpytest_subprocess(
+                '--collect-only', '--seaworthy-prefetch-workers=2')
+        finally:
+            thread.join()
+
+        [duration] = re.findall(
+            r"Fetched image '.*' \(1/1, ([0-9.]+)s\)", result.stdout.str())
+        assert float(duration) >= 1
@@ -0,0 +1,125 @@
+"""
+These tests use the ``pytester`` plugin to check the plugin's command line
+options by running tests in a separate process. The resources are registered
+in a global registry, so each run needs a process of its own.
+
+Unlike the tests in ``test_fixtures_pytester.py``, these tests don't need
+Docker: the resource fixtures use stand-in definitions and the
+``docker_helper`` fixture is overridden.
+"""
+
+FAKE_RESOURCES = """
+    import threading
+
+    import pytest
+
+    from seaworthy.pytest.fixtures import resource_fixture
+
+    log = []
+
+
+    class FakeDefinition:
+        def __init__(self, name, barrier=None, error=None):
+            self.name = name
+            self.barrier = barrier
+            self.error = error
+            self.created = False
+
+        def setup(self, helper=None, **kwargs):
+            if self.created:
+                return
+            if self.barrier is not None:
+                self.barrier.wait(timeout=5)
+            if self.error is not None:
+                raise self.error
+            self.created = True
+            log.append(self.name)
+
+        def teardown(self):
+            if self.created:
+                self.created = False
+                log.append('-{}'.format(self.name))
+
+
+    @pytest.fixture(scope='module')
+    def docker_helper():
+        return 'helper'
+"""
+
+
+class TestStartupWorkersOption:
+    def test_option(self, testdir):
+        """
+        The ``--seaworthy-startup-workers`` option sets the number of workers
+        for the startup scheduler, which is only used for more than one
+        worker.
+        """
+        testdir.makepyfile("""
+            def test_option(request):
+                assert request.config.getoption(
+                    'seaworthy_startup_workers') == 3
+                scheduler = request.config._seaworthy_scheduler
+                assert scheduler.max_workers == 3
+        """)
+        result = testdir.runpytest_subprocess('--seaworthy-startup-workers=3')
+        result.assert_outcomes(passed=1)
+
+        testdir.makepyfile("""
+            def test_option(request):
+                assert request.config.getoption(
+                    'seaworthy_startup_workers') == 1
+                assert not hasattr(request.config, '_seaworthy_scheduler')
+        """)
+        result = testdir.runpytest_subprocess()
+        result.assert_outcomes(passed=1)
+
+    def test_dependencies(self, testdir):
+        """
+        The dependencies of a resource fixture are set up at the same time,
+        and the resource itself once they are ready. Each is torn down once.
+        """
+        testdir.makepyfile(FAKE_RESOURCES + """
+    # The barrier only lets the setups through if both run at once
+    barrier = threading.Barrier(2)
+    db_fixture = resource_fixture(FakeDefinition('db', barrier), 'db')
+    cache_fixture = resource_fixture(
+        FakeDefinition('cache', barrier), 'cache')
+    app_fixture = resource_fixture(
+        FakeDefinition('app'), 'app', dependencies=('db', 'cache'))
+
+
+    def test_app(app, db, cache):
+        assert sorted(log[:2]) == ['cache', 'db']
+        assert log[2:] == ['app']
+
+
+    def test_teardown():
+        assert log[3] == '-app'
+        assert sorted(log[4:]) == ['-cache', '-db']
+        """)
+        result = testdir.runpytest_subprocess('--seaworthy-startup-workers=2')
+        result.assert_outcomes(passed=2)
+
+    def test_failure(self, testdir):
+        """
+        If a dependency fails to set up, the error is reported for the test
+        and the dependencies that were set up are torn down.
+        """
+        testdir.makepyfile(FAKE_RESOURCES + """
+    ok_fixture = resource_fixture(FakeDefinition('ok'), 'ok')
+    broken_fixture = resource_fixture(
+        FakeDefinition('broken', error=RuntimeError('broken')), 'broken')
+    app_fixture = resource_fixture(
+        FakeDefinition('app'), 'app', dependencies=('ok', 'broken'))
+
+
+    def test_app(app):
+        pass
+
+
+    def test_teardown():
+        assert log == ['ok', '-ok']
+        """)
+        result = testdir.runpytest_subprocess('--seaworthy-startup-workers=2')
+        result.stdout.fnmatch_lines(
+            ['*RuntimeError: broken', '*1 passed, 1 error*'])
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import docker
+
+from seaworthy.definitions import ContainerDefinition, VolumeDefinition
+from seaworthy.pytest.prefetch import find_images, image_lock, prefetch_images
+from seaworthy.pytest.scheduler import ResourceRegistry
+
+
+class FakeItem:
+    def __init__(self, *fixturenames):
+        self.fixturenames = list(fixturenames)
+
+
+class TestFindImagesFunc:
+    def test_find_images(self):
+        """
+        We find the images for the resource and image fetch fixtures that the
+        items use, including resource dependencies, without duplicates.
+        """
+        registry = ResourceRegistry()
+        registry.register('db', ContainerDefinition('db', 'postgres:10'))
+        registry.register('vol', VolumeDefinition('vol'))
+        registry.register(
+            'app', ContainerDefinition('app', 'nginx:alpine'), ('db', 'vol'))
+        registry.register('unused', ContainerDefinition('unused', 'redis'))
+        registry.register_image('img', 'alpine:latest')
+        registry.register_image('nginx_img', 'nginx:alpine')
+
+        items = [FakeItem('app', 'tmpdir'), FakeItem('img', 'nginx_img')]
+        assert find_images(items, registry) == [
+            'nginx:alpine', 'postgres:10', 'alpine:latest']
+
+    def test_no_items(self):
+        """
+        Items without fixtures need no images.
+        """
+        assert find_images([object()], ResourceRegistry()) == []
+
+
+class TestImageLockFunc:
+    def test_lock(self, tmpdir):
+        """
+        Only one holder of an image's lock runs at a time, but other images
+        can be locked at the same time.
+        """
+        events = []
+
+        def locked(image):
+            with image_lock(image, str(tmpdir)):
+                events.append(('start', image))
+                time.sleep(0.1)
+                events.append(('end', image))
+
+        threads = [threading.Thread(target=locked, args=(image,))
+                   for image in ['a', 'a', 'b']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        a_events = [event for event, image in events if image == 'a']
+        assert a_events == ['start', 'end', 'start', 'end']
+        assert len(tmpdir.listdir()) == 2
+
+
+class TestPrefetchImagesFunc:
+    def test_prefetch(self, tmpdir, monkeypatch):
+        """
+        Images are fetched concurrently, and errors and progress are reported.
+        """
+        fetched = []
+
+        def fetch_image(client, image):
+            if image == 'broken':
+                raise docker.errors.NotFound(image)
+            fetched.append(image)
+
+        monkeypatch.setattr(
+            'seaworthy.pytest.prefetch.fetch_image', fetch_image)
+        messages = []
+        errors = prefetch_images(
+            'client', ['nginx:alpine', 'redis:5', 'broken'], max_workers=2,
+            report=messages.append, lock_dir=str(tmpdir))
+
+        assert sorted(fetched) == ['nginx:alpine', 'redis:5']
+        assert list(errors) == ['broken']
+        assert len(messages) == 3
+        assert any(m.startswith("Failed to fetch image 'broken'")
+                   for m in messages)
+        assert all(m.endswith('s)') for m in messages
+                   if not m.startswith('Failed'))
@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+from seaworthy.pytest.scheduler import ResourceRegistry, StartupScheduler
+
+
+class FakeDefinition:
+    """
+    A stand-in for a resource definition that records the order in which
+    definitions are set up and can wait for other definitions to be set up
+    at the same time.
+    """
+    def __init__(self, name, log, barrier=None, error=None):
+        self.name = name
+        self.log = log
+        self.barrier = barrier
+        self.error = error
+        self.created = False
+        self.helper = None
+        self.setup_kwargs = None
+
+    def setup(self, helper=None, **kwargs):
+        if self.barrier is not None:
+            self.barrier.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        self.helper = helper
+        self.setup_kwargs = kwargs
+        self.created = True
+        self.log.append(self.name)
+
+    def teardown(self):
+        self.created = False
+        self.log.append('-{}'.format(self.name))
+
+
+class FakeRequest:
+    def __init__(self, log):
+        self.log = log
+
+    def getfixturevalue(self, name):
+        self.log.append('fixture:{}'.format(name))
+
+
+def make_scheduler(resources, max_workers=4):
+    registry = ResourceRegistry()
+    for name, definition, dependencies in resources:
+        registry.register(name, definition, dependencies)
+    return StartupScheduler(max_workers, registry=registry)
+
+
+class TestResourceRegistry:
+    def test_lookup(self):
+        """
+        We can look up registered resources by fixture name, but not those
+        with ambiguous names.
+        """
+        registry = ResourceRegistry()
+        registry.register('one', 'def1', ('two',), {'keep_alive': True})
+        registry.register('dup', 'def2')
+        registry.register('dup', 'def3')
+
+        resource = registry.lookup('one')
+        assert resource.definition == 'def1'
+        assert resource.dependencies == ('two',)
+        assert resource.setup_kwargs == {'keep_alive': True}
+        assert registry.lookup('dup') is None
+        assert registry.lookup('other') is None
+        assert sorted(registry.get_definitions()) == ['def1', 'def2', 'def3']
+
+
+class TestStartupScheduler:
+    def test_plan(self):
+        """
+        The plan includes the resources needed indirectly, each after its
+        dependencies, and the other fixtures that they need.
+        """
+        log = []
+        db, cache, app = [
+            FakeDefinition(name, log) for name in ['db', 'cache', 'app']]
+        scheduler = make_scheduler([
+            ('db', db, ('settings',)),
+            ('cache', cache, ()),
+            ('app', app, ('db', 'cache', 'settings')),
+        ])
+
+        resources, others = scheduler.plan(['app', 'tmpdir'])
+        assert [r.name for r in resources] == ['db', 'cache', 'app']
+        assert others == ['settings', 'tmpdir']
+
+    def test_start_concurrently(self):
+        """
+        Independent resources are set up at the same time, and resources are
+        only set up once their dependencies are ready.
+        """
+        log = []
+        barrier = threading.Barrier(3)
+        defs = [FakeDefinition(n, log, barrier) for n in 'abc']
+        app = FakeDefinition('app', log)
+        scheduler = make_scheduler([
+            ('a', defs[0], ()),
+            ('b', defs[1], ()),
+            ('c', defs[2], ()),
+            ('app', app, ('a', 'b', 'c')),
+        ])
+
+        # The barrier only lets the setups through if all three run at once
+        scheduler.start(FakeRequest(log), 'helper', ['app', 'other'])
+        assert log[0] == 'fixture:other'
+        assert sorted(log[1:4]) == ['a', 'b', 'c']
+        assert log[4] == 'app'
+        assert all(d.helper == 'helper' for d in defs + [app])
+
+    def test_start_skips_created(self):
+        """
+        Resources that have already been set up are not set up again.
+        """
+        log = []
+        a, b = FakeDefinition('a', log), FakeDefinition('b', log)
+        a.created = True
+        scheduler = make_scheduler([('a', a, ()), ('b', b, ('a',))])
+
+        scheduler.start(FakeRequest(log), 'helper', ['b'])
+        assert log == ['b']
+
+    def test_start_failure(self):
+        """
+        If a resource fails to set up, the resources that were set up are torn
+        down and the error is raised.
+        """
+        log = []
+        error = RuntimeError('broken')
+        ok = FakeDefinition('ok', log)
+        broken = FakeDefinition('broken', log, error=error)
+        after = FakeDefinition('after', log)
+        scheduler = make_scheduler([
+            ('ok', ok, ()),
+            ('broken', broken, ()),
+            ('after', after, ('ok', 'broken')),
+        ])
+
+        with pytest.raises(RuntimeError) as e:
+            scheduler.start(FakeRequest(log), 'helper', ['after'])
+        assert e.value is error
+        assert log == ['ok', '-ok']
+        assert not after.created
+
+    def test_start_cycle(self):
+        """
+        Resources in a dependency cycle are left for pytest to report.
+        """
+        log = []
+        a, b = FakeDefinition('a', log), FakeDefinition('b', log)
+        scheduler = make_scheduler([('a', a, ('b',)), ('b', b, ('a',))])
+
+        scheduler.start(FakeRequest(log), 'helper', ['a'])
+        assert log == []
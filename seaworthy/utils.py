@@ -1,3 +1,7 @@
+import random
+import threading
+import time
+
 from docker.models.containers import ExecResult
 
 
@@ -18,3 +22,57 @@ def output_lines(output, encoding='utf-8'):
         _, output = output
 
     return output.decode(encoding).splitlines()
+
+
+def _freeze(obj):
+    """
+    Turn a (possibly nested) structure of dicts, lists, and sets into a
+    hashable value that compares equal for equal structures.
+    """
+    if isinstance(obj, dict):
+        return ('dict', tuple(sorted(
+            ((_freeze(k), _freeze(v)) for k, v in obj.items()), key=repr)))
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__, tuple(_freeze(o) for o in obj))
+    if isinstance(obj, (set, frozenset)):
+        return ('set', tuple(sorted((_freeze(o) for o in obj), key=repr)))
+    return obj
+
+
+def _backoff(initial=0.05, maximum=1.0, factor=2, jitter=0):
+    """
+    Generate the delays for retrying an operation with exponential backoff.
+
+    :param jitter:
+        The largest fraction of each delay to randomly take off it, so that
+        many callers retrying at once don't all retry at the same time.
+    """
+    delay = initial
+    while True:
+        yield delay * (1 - jitter * random.random())
+        delay = min(delay * factor, maximum)
+
+
+def _sleep(delay, stop=None):
+    """
+    Sleep for ``delay`` seconds, or until the ``stop`` event is set.
+    """
+    if stop is None:
+        time.sleep(delay)
+    else:
+        stop.wait(delay)
+
+
+def _call_when_set(event, callback, timeout=None):
+    """
+    Call ``callback`` in a background thread as soon as ``event`` is set,
+    unless ``timeout`` seconds pass first. This is for interrupting blocking
+    waits when a :class:`threading.Event` used to stop them is set.
+    """
+    def run():
+        if event.wait(timeout):
+            callback()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,266 @@
+"""
+Strategies for waiting for a container to be ready, for use with
+:class:`~seaworthy.definitions.ContainerDefinition`.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from seaworthy.client import wait_for_port, wait_for_response
+from seaworthy.stream.matchers import RegexMatcher, UnorderedMatcher
+from seaworthy.utils import _backoff, _call_when_set, _sleep
+
+
+class WaitStrategy:
+    """
+    Base class for strategies that wait for a container to be ready.
+    Strategies can be combined with ``&`` (see :class:`AllOf`) and ``|`` (see
+    :class:`AnyOf`).
+    """
+
+    def wait(self, definition, timeout, stop=None):
+        """
+        Wait for the container to be ready.
+
+        :param definition:
+            The :class:`~seaworthy.definitions.ContainerDefinition` of the
+            container, which must have been created.
+        :param timeout: The maximum number of seconds to wait.
+        :param threading.Event stop:
+            An event that is set when the result is no longer needed, for
+            example because another strategy of an :class:`AnyOf` has
+            succeeded. Strategies should stop waiting soon after it is set,
+            and whatever they return or raise then is ignored.
+
+        :raises TimeoutError:
+            If the container isn't ready before the timeout.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def __and__(self, other):
+        return AllOf(self, other)
+
+    def __or__(self, other):
+        return AnyOf(self, other)
+
+
+def _stopped(stop):
+    return stop is not None and stop.is_set()
+
+
+def _poll(ready, definition, timeout, message, stop=None):
+    """
+    Call ``ready`` with backoff until it returns True, checking that the
+    container is still running in between. We give up without an error if
+    ``stop`` is set.
+    """
+    deadline = time.monotonic() + timeout
+    for delay in _backoff():
+        if _stopped(stop) or ready():
+            return
+        definition.check_running()
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            raise TimeoutError(message)
+        _sleep(min(delay, time_left), stop)
+
+
+class LogPatternWait(WaitStrategy):
+    """
+    Wait for log lines that match all of the given regex patterns, in any
+    order. This is what the ``wait_patterns`` parameter of
+    :class:`~seaworthy.definitions.ContainerDefinition` does.
+    """
+
+    def __init__(self, *patterns):
+        self.matchers = [RegexMatcher(p) for p in patterns]
+
+    def wait(self, definition, timeout, stop=None):
+        matcher = UnorderedMatcher(*self.matchers)
+        try:
+            definition.wait_for_logs_matching(
+                matcher, timeout=timeout, stop=stop)
+        except RuntimeError:
+            # The logs end early when we're stopped
+            if not _stopped(stop):
+                raise
+
+
+class HealthcheckWait(WaitStrategy):
+    """
+    Wait for the container's Docker ``HEALTHCHECK`` to report that it is
+    healthy.
+
+    If the helper is watching Docker events, we wait for a health status
+    event. Otherwise, we inspect the container with exponential backoff.
+    """
+
+    def wait(self, definition, timeout, stop=None):
+        deadline = time.monotonic() + timeout
+        message = 'Timeout ({}s) waiting for container to be healthy.'.format(
+            timeout)
+        container = definition.inner()
+        if self._check_health(container, reload=False):
+            return
+
+        events = definition.helper.events
+        if events is not None and events.running:
+            statuses = ['health_status: healthy', 'health_status: unhealthy',
+                        'die']
+            events.wait_for(container.id, statuses, timeout, stop=stop)
+            if _stopped(stop):
+                return
+            definition.check_running()
+            if self._check_health(container):
+                return
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                raise TimeoutError(message)
+            # The event may have been missed if the container was created
+            # before the helper started watching events, so fall back to
+            # polling for whatever is left of the timeout.
+            timeout = time_left
+
+        _poll(lambda: self._check_health(container), definition, timeout,
+              message, stop=stop)
+
+    def _check_health(self, container, reload=True):
+        if reload:
+            container.reload()
+        health = container.attrs['State'].get('Health')
+        if health is None:
+            raise RuntimeError(
+                "Container '{}' has no healthcheck.".format(container.name))
+        if health['Status'] == 'unhealthy':
+            raise RuntimeError(
+                "Container '{}' is unhealthy.".format(container.name))
+        return health['Status'] == 'healthy'
+
+
+class HttpWait(WaitStrategy):
+    """
+    Wait for the container to respond to an HTTP request. Requests are only
+    made once the port accepts TCP connections.
+    """
+
+    def __init__(self, port=None, path='/', expected_status=None):
+        """
+        :param port:
+            The container port to make the request to. Defaults to the first
+            published port. See
+            :meth:`~seaworthy.definitions.ContainerDefinition.http_client`.
+        :param path: The path to request.
+        :param expected_status:
+            A collection of status codes to wait for. By default, any
+            response will do.
+        """
+        self.port = port
+        self.path = path
+        self.expected_status = expected_status
+
+    def wait(self, definition, timeout, stop=None):
+        client = definition.http_client(port=self.port)
+        wait_for_response(client, timeout, path=self.path,
+                          check=definition.check_running,
+                          expected_status=self.expected_status, tcp_first=True,
+                          stop=stop)
+
+
+class TcpPortWait(WaitStrategy):
+    """
+    Wait for a published container port to accept TCP connections. See
+    :func:`~seaworthy.client.wait_for_port`.
+
+    .. note::
+
+        When Docker publishes ports with its userland proxy (``docker-proxy``,
+        which is the default), the proxy accepts connections on the host port
+        as soon as the container has started, whether or not anything in the
+        container is listening yet. This strategy then succeeds straight away,
+        so use :class:`HttpWait` or :class:`LogPatternWait` to wait for the
+        service itself.
+    """
+
+    def __init__(self, port=None):
+        """
+        :param port:
+            The container port, which must be published. Defaults to the
+            first published port.
+        """
+        self.port = port
+
+    def wait(self, definition, timeout, stop=None):
+        if self.port is None:
+            host, port = definition.get_first_host_port()
+        else:
+            host, port = definition.get_host_port(self.port)
+        message = 'Timeout ({}s) waiting for port {} to accept connections.'
+        wait_for_port(host, port, timeout, check=definition.check_running,
+                      timeout_msg=message.format(timeout, self.port or port),
+                      stop=stop)
+
+
+class _CompositeWait(WaitStrategy):
+    def __init__(self, *strategies):
+        self.strategies = strategies
+
+    def _wait(self, definition, timeout, stop, until_done):
+        """
+        Run the strategies at the same time, each in its own thread, and pass
+        each future to ``until_done`` as it finishes until that returns
+        ``True``. The strategies that are still going are then stopped.
+        """
+        inner_stop = threading.Event()
+        if stop is not None:
+            # Stop our strategies if we're stopped ourselves
+            _call_when_set(stop, inner_stop.set, timeout)
+        executor = ThreadPoolExecutor(max_workers=len(self.strategies))
+        pending = [executor.submit(s.wait, definition, timeout, inner_stop)
+                   for s in self.strategies]
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if until_done(future):
+                        return
+        finally:
+            inner_stop.set()
+            # The stopped strategies finish on their own soon enough, so we
+            # don't wait for them.
+            executor.shutdown(wait=False)
+
+
+class AllOf(_CompositeWait):
+    """
+    Wait for all of the given strategies at the same time. The first error
+    from any of them is raised, and the others are stopped.
+    """
+
+    def wait(self, definition, timeout, stop=None):
+        def until_done(future):
+            future.result()
+            return False
+
+        self._wait(definition, timeout, stop, until_done)
+
+
+class AnyOf(_CompositeWait):
+    """
+    Wait for any of the given strategies at the same time, and stop the
+    others as soon as one succeeds. If they all fail, the last error is
+    raised.
+    """
+
+    def wait(self, definition, timeout, stop=None):
+        errors = []
+
+        def until_done(future):
+            if future.exception() is None:
+                return True
+            errors.append(future.exception())
+            return False
+
+        self._wait(definition, timeout, stop, until_done)
+        if len(errors) == len(self.strategies):
+            raise errors[-1]
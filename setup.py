@@ -38,6 +38,9 @@ setup(
         'requests',
     ],
     extras_require={
+        'aio': [
+            'aiohttp>=3.3',
+        ],
         'pytest': [
             'pytest>=3.0.0',
         ],
@@ -45,11 +48,13 @@ setup(
             'testtools',
         ],
         'test': [
+            'aiohttp>=3.3; python_version >= "3.5"',
             'pytest>=3.0.0',
             'responses',
             'testtools',
         ],
         'test-core': [
+            'aiohttp>=3.3; python_version >= "3.5"',
             'responses',
         ],
         'docstest': [
@@ -80,6 +85,7 @@ setup(
         'Topic :: Software Development :: Testing',
     ],
     entry_points={
+        'console_scripts': ['seaworthy = seaworthy.cli:main'],
         'pytest11': ['seaworthy = seaworthy.pytest'],
     },
 )